@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# Throughput of bulk_upsert vs. a naive per-row ORM merge loop on a file-backed SQLite database.
+import datetime
+import os
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+from src.database import db
+from src.models.copri_models import User, PlatformConnection, TrelloCard
+from src.services.bulk_upsert import bulk_upsert
+
+
+def make_app(db_path):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{db_path}"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    return app
+
+
+def card_rows(n, connection_id, version=0, changed_every=0):
+    base = datetime.datetime(2025, 1, 1)
+    for i in range(n):
+        bumped = changed_every and i % changed_every == 0
+        yield {
+            "trello_card_id": f"card-{i:08d}",
+            "connection_id": connection_id,
+            "trello_board_id": f"board-{i % 20}",
+            "trello_list_id": f"list-{i % 200}",
+            "name": f"Card {i}" + (f" v{version}" if bumped else ""),
+            "description": "Lorem ipsum dolor sit amet " * 4,
+            "due_date": base + datetime.timedelta(hours=i % 5000),
+            "labels": [{"id": "l1", "name": "urgent", "color": "red"}] if i % 3 == 0 else [],
+            "members_trello_ids": ["m1"],
+            "last_activity_date": base + datetime.timedelta(minutes=i + (version if bumped else 0)),
+        }
+
+
+def timed(label, n, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {n:>7} rows in {elapsed:7.2f}s ({n / elapsed:>9,.0f} rows/s) {result or ''}")
+
+
+def main(n=100_000, naive_n=5_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, "bench.db"))
+        with app.app_context():
+            db.create_all()
+            user = User(username="bench", hashed_password="x")
+            db.session.add(user)
+            db.session.flush()
+            connection = PlatformConnection(user_id=user.user_id, platform_name="Trello", access_token="x")
+            db.session.add(connection)
+            db.session.commit()
+            connection_id = connection.connection_id
+
+            def naive():
+                for row in card_rows(naive_n, connection_id):
+                    card = TrelloCard.query.filter_by(trello_card_id=row["trello_card_id"]).first()
+                    if card is None:
+                        db.session.add(TrelloCard(**row))
+                    else:
+                        for column, value in row.items():
+                            setattr(card, column, value)
+                    db.session.commit()
+            timed("naive ORM select+add, commit per row", naive_n, naive)
+            TrelloCard.query.delete()
+            db.session.commit()
+
+            timed("bulk_upsert initial import", n, lambda: bulk_upsert(TrelloCard, card_rows(n, connection_id)))
+            timed("bulk_upsert resync, nothing changed", n, lambda: bulk_upsert(TrelloCard, card_rows(n, connection_id)))
+            timed("bulk_upsert resync, 10% changed", n, lambda: bulk_upsert(TrelloCard, card_rows(n, connection_id, version=1, changed_every=10)))
+            print(f"rows stored: {TrelloCard.query.count()}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# Query counts and latency of lazy relationship access vs. load_coaching_context(), checked with assert_max_queries.
+import datetime
+import os
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+from src.database import db, QueryCounter, assert_max_queries
+from src.models.copri_models import User, PlatformConnection, Project, CoachingInteraction, FinancialNote, ApplicationTracking
+from src.services.coaching_context import load_coaching_context, load_coaching_contexts, CONTEXT_QUERY_COUNT
+
+
+def seed(username, projects, notes_per_project, applications, interactions):
+    user = User(username=username, hashed_password="x")
+    db.session.add(user)
+    db.session.flush()
+    for platform in ("Trello", "Gmail", "GoogleCalendar", "GitHub", "X", "LinkedIn"):
+        db.session.add(PlatformConnection(user_id=user.user_id, platform_name=platform, access_token="t" * 512))
+    project_rows = [Project(user_id=user.user_id, name=f"Project {i}", description="d" * 2000, priority_copri=i % 5 + 1) for i in range(projects)]
+    db.session.add_all(project_rows)
+    db.session.flush()
+    db.session.bulk_insert_mappings(FinancialNote, [
+        {"user_id": user.user_id, "project_id": project.project_id, "description": f"Note {i}", "amount": 100 + i, "notes": "n" * 1000}
+        for project in project_rows for i in range(notes_per_project)
+    ])
+    db.session.bulk_insert_mappings(ApplicationTracking, [{"user_id": user.user_id, "name_of_program": f"Program {i}", "notes": "n" * 1000} for i in range(applications)])
+    now = datetime.datetime(2025, 6, 1)
+    db.session.bulk_insert_mappings(CoachingInteraction, [
+        {"user_id": user.user_id, "interaction_type": "ask_priority", "question_asked": "Q?", "user_response": "A" * 200, "timestamp": now - datetime.timedelta(minutes=i)}
+        for i in range(interactions)
+    ])
+    db.session.commit()
+    return user.user_id
+
+
+def lazy_pass(user_id):
+    """What coaching code did before: get the user, then walk its lazy relationships."""
+    user = db.session.get(User, user_id)
+    platforms = sorted({connection.platform_name for connection in user.connections})
+    spend_by_project = {project.project_id: 0 for project in user.projects}
+    for note in user.financial_notes:
+        if note.project_id in spend_by_project:
+            spend_by_project[note.project_id] += float(note.amount or 0)
+    open_applications = [application for application in user.applications if not application.submitted_date]
+    recent = sorted(user.coaching_interactions, key=lambda interaction: interaction.timestamp, reverse=True)[:20]
+    return platforms, len(spend_by_project), len(open_applications), len(recent)
+
+
+def eager_pass(user_id):
+    context = load_coaching_context(user_id)
+    spend_by_project = {project.project_id: 0 for project in context.projects}
+    for note in context.financial_notes:
+        if note.project_id in spend_by_project:
+            spend_by_project[note.project_id] += float(note.amount or 0)
+    open_applications = [application for application in context.applications if not application.submitted_date]
+    return context.active_platforms, len(spend_by_project), len(open_applications), len(context.recent_interactions)
+
+
+def measure(label, fn, argument):
+    db.session.expunge_all() # Start from an empty identity map, like a fresh request
+    with QueryCounter() as counter:
+        started = time.perf_counter()
+        result = fn(argument)
+        elapsed = time.perf_counter() - started
+    print(f"  {label:<28} {counter.count:>4} queries {elapsed * 1e3:8.2f}ms -> {result}")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        db.init_app(app)
+        with app.app_context():
+            db.create_all()
+            sizes = {"small": (5, 2, 3, 50), "large": (300, 20, 200, 50_000)}
+            for name, (projects, notes, applications, interactions) in sizes.items():
+                user_id = seed(name, projects, notes, applications, interactions)
+                print(f"{name}: {projects} projects, {projects * notes} notes, {applications} applications, {interactions} interactions")
+                measure("lazy relationships", lazy_pass, user_id)
+                measure("load_coaching_context", eager_pass, user_id)
+                db.session.expunge_all()
+                with assert_max_queries(CONTEXT_QUERY_COUNT, label=f"coaching context ({name})"):
+                    eager_pass(user_id)
+            print(f"load_coaching_context stayed within {CONTEXT_QUERY_COUNT} queries at both sizes.")
+
+            # A batch pass (e.g. daily digests) is where lazy loading turns into N+1.
+            user_ids = [seed(f"digest-{i}", 5, 2, 3, 50) for i in range(50)]
+            print(f"batch of {len(user_ids)} users:")
+            measure("lazy, user by user", lambda ids: sum(lazy_pass(user_id)[1] for user_id in ids), user_ids)
+            measure("load_coaching_contexts", lambda ids: sum(len(context.projects) for context in load_coaching_contexts(ids).values()), user_ids)
+            db.session.expunge_all()
+            with assert_max_queries(CONTEXT_QUERY_COUNT, label="coaching contexts (batch)"):
+                load_coaching_contexts(user_ids)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# Full-data export of one user: peak Python memory and throughput of the streaming exporter vs. loading every relationship and serializing at once.
+import datetime
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import insert
+
+from src import migrations
+from src.database import db
+from src.models.copri_models import User, PlatformConnection, Email
+from src.services import data_export
+
+NOW = datetime.datetime(2025, 6, 1, 12, 0)
+
+def add_emails(connection_id, start, stop):
+    for first in range(start, stop, 20_000):
+        db.session.execute(insert(Email.__table__), [
+            {"gmail_message_id": f"msg-{i}", "gmail_thread_id": f"thread-{i // 4}", "connection_id": connection_id, "sender": "someone@example.com",
+             "subject": f"Subject line for message {i}", "snippet": "A typical preview of the first hundred or so characters of the message body " * 2,
+             "received_date": NOW - datetime.timedelta(minutes=i), "labels_gmail": ["INBOX", "CATEGORY_UPDATES"], "is_read": i % 3 == 0}
+            for i in range(first, min(stop, first + 20_000))
+        ])
+    db.session.commit()
+
+def naive_export(user_id):
+    """The old way: walk the User relationships and serialize one document."""
+    def columns(obj):
+        return {column.name: data_export._plain(getattr(obj, column.name)) for column in obj.__table__.columns}
+    user = db.session.get(User, user_id)
+    document = {
+        "user": columns(user),
+        "connections": [{**columns(connection), "emails": [columns(email) for email in connection.emails],
+                         "trello_cards": [columns(card) for card in connection.trello_cards],
+                         "calendar_events": [columns(event) for event in connection.calendar_events]} for connection in user.connections],
+        "coaching_interactions": [columns(row) for row in user.coaching_interactions],
+        "financial_notes": [columns(row) for row in user.financial_notes],
+    }
+    size = len(json.dumps(document, default=data_export._plain).encode("utf-8"))
+    db.session.remove()
+    return size
+
+def streaming_export(user_id, compress=False):
+    return sum(len(chunk) for chunk in data_export.export_chunks(user_id, compress=compress))
+
+def measure(function, *args):
+    """(seconds, peak traced bytes, output bytes). Timed and traced in separate runs: tracemalloc slows allocation-heavy code several times over."""
+    started = time.perf_counter()
+    size = function(*args)
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    function(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, size
+
+def main(sizes=(100_000, 300_000, 1_000_000), naive_limit=300_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        db.init_app(app)
+        with app.app_context():
+            migrations.upgrade(db.engine, metadata=db.metadata)
+            db.session.add(User(user_id=1, username="user-1", hashed_password="x"))
+            db.session.add(PlatformConnection(connection_id=1, user_id=1, platform_name="Gmail", access_token="t"))
+            db.session.commit()
+            print("Peak traced Python memory (tracemalloc) while exporting one user's data:")
+            print(f"  {'emails':>10} {'method':<22} {'time':>8} {'peak memory':>12} {'output':>10}")
+            seeded = 0
+            for size in sizes:
+                add_emails(1, seeded, size)
+                seeded = size
+                runs = [("streaming NDJSON", streaming_export, (1,)), ("streaming NDJSON+gzip", streaming_export, (1, True))]
+                if size <= naive_limit:
+                    runs.append(("load all + json.dumps", naive_export, (1,)))
+                for label, function, args in runs:
+                    elapsed, peak, output = measure(function, *args)
+                    print(f"  {size:>10,} {label:<22} {elapsed:>7.1f}s {peak / 2**20:>10.1f}MB {output / 2**20:>8.1f}MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# Free/busy query latency at 100k calendar events: interval index vs. SQL overlap query vs. linear scan.
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+from src.database import db
+from src.models.copri_models import User, PlatformConnection, CalendarEvent
+from src.services.bulk_upsert import bulk_upsert
+from src.services.free_busy_index import FreeBusyIndex
+
+BASE = datetime.datetime(2020, 1, 1)
+HISTORY_DAYS = 6 * 365
+
+
+def event_rows(n, connection_id, rng):
+    for i in range(n):
+        start = BASE + datetime.timedelta(minutes=rng.randrange(0, HISTORY_DAYS * 24 * 60, 15))
+        length = rng.choice([15, 30, 30, 45, 60, 60, 90, 120, 24 * 60])
+        yield {
+            "gcal_event_id": f"evt-{i:08d}", "gcal_calendar_id": "primary", "connection_id": connection_id,
+            "summary": f"Event {i}", "start_time": start, "end_time": start + datetime.timedelta(minutes=length),
+            "is_all_day": length == 24 * 60, "attendees": [], "status_gcal": "confirmed",
+        }
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return f"p50={statistics.median(samples) * 1e3:7.3f}ms p95={samples[int(len(samples) * 0.95)] * 1e3:7.3f}ms"
+
+
+def timed_queries(label, windows, fn):
+    samples = []
+    for window_start, window_end in windows:
+        started = time.perf_counter()
+        fn(window_start, window_end)
+        samples.append(time.perf_counter() - started)
+    print(f"{label:<44} {percentiles(samples)}")
+
+
+def main(n=100_000, queries=500):
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        db.init_app(app)
+        with app.app_context():
+            db.create_all()
+            user = User(username="bench", hashed_password="x")
+            db.session.add(user)
+            db.session.flush()
+            connection = PlatformConnection(user_id=user.user_id, platform_name="GoogleCalendar", access_token="fake")
+            db.session.add(connection)
+            db.session.commit()
+            bulk_upsert(CalendarEvent, event_rows(n, connection.connection_id, rng))
+
+            started = time.perf_counter()
+            index = FreeBusyIndex.load(user.user_id)
+            print(f"Lazy build of {len(index):,} events: {time.perf_counter() - started:.2f}s")
+
+            weeks = []
+            for _ in range(queries):
+                window_start = BASE + datetime.timedelta(days=rng.randrange(0, HISTORY_DAYS - 7))
+                weeks.append((window_start, window_start + datetime.timedelta(days=7)))
+            hours = [(start + datetime.timedelta(hours=10), start + datetime.timedelta(hours=11)) for start, _ in weeks]
+
+            timed_queries("index: conflicts (1h window)", hours, index.conflicts)
+            timed_queries("index: free slots (1 week, 9-17h)", weeks, lambda a, b: index.free_slots(a, b, working_hours=(9, 17)))
+            timed_queries("index: utilization (1 week)", weeks, index.utilization)
+
+            def sql_conflicts(window_start, window_end):
+                return (
+                    CalendarEvent.query.with_entities(CalendarEvent.gcal_event_id, CalendarEvent.start_time, CalendarEvent.end_time)
+                    .join(PlatformConnection, PlatformConnection.connection_id == CalendarEvent.connection_id)
+                    .filter(PlatformConnection.user_id == user.user_id, CalendarEvent.start_time < window_end, CalendarEvent.end_time > window_start)
+                    .all()
+                )
+            timed_queries("sql: overlap query (1h window)", hours[:100], sql_conflicts)
+
+            intervals = [(row["start_time"], row["end_time"], row["gcal_event_id"]) for row in event_rows(n, 0, random.Random(7))]
+            timed_queries("linear scan (1h window)", hours[:100], lambda a, b: [i for i in intervals if i[0] < b and i[1] > a])
+
+            rows = list(event_rows(1000, connection.connection_id, random.Random(99)))
+            for i, row in enumerate(rows):
+                row["gcal_event_id"] = f"new-{i:05d}"
+            started = time.perf_counter()
+            index.apply(rows, deleted_ids=[f"evt-{i:08d}" for i in range(1000)])
+            print(f"Incremental apply of 1,000 upserts + 1,000 deletes: {(time.perf_counter() - started) * 1e3:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
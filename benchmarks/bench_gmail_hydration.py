@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# Gmail hydration against a local fake Gmail API: one format=full GET per message vs. metadata batches.
+import os
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+from benchmarks import fake_apis
+from benchmarks.stub_server import StubServer
+from src.database import db
+from src.integrations.gmail_integration import GmailIntegration
+from src.integrations.http_transport import HttpTransport
+from src.integrations.rate_limiter import RateLimitScheduler
+from src.models.copri_models import User, PlatformConnection, Email
+from src.services.gmail_sync_service import GmailSyncService, email_row_from_metadata
+from src.services.bulk_upsert import bulk_upsert
+
+
+def main(messages=2000, latency=0.005):
+    with StubServer(fake_apis.gmail_api(messages), latency=latency) as stub, tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        db.init_app(app)
+        transport = HttpTransport(rate_limiter=RateLimitScheduler(limits={"Gmail": (1e6, 1e6)}))
+        gmail = GmailIntegration(credentials_info={"token": "fake"}, transport=transport, base_url=f"{stub.url}/gmail/v1")
+        with app.app_context():
+            db.create_all()
+            user = User(username="bench", hashed_password="x")
+            db.session.add(user)
+            db.session.flush()
+            connection = PlatformConnection(user_id=user.user_id, platform_name="Gmail", access_token="fake")
+            db.session.add(connection)
+            db.session.commit()
+
+            start_requests = stub.requests_served
+            start = time.perf_counter()
+            ids = [message["id"] for message in gmail.iter_message_ids()]
+            rows = []
+            for message_id in ids:
+                full = gmail.get_message_details(message_id)
+                rows.append(email_row_from_metadata(full, connection.connection_id))
+            bulk_upsert(Email, rows)
+            elapsed = time.perf_counter() - start
+            print(f"per-message format=full : {len(ids)} emails in {elapsed:.2f}s, {stub.requests_served - start_requests} HTTP requests")
+
+            Email.query.delete()
+            db.session.commit()
+            start_requests = stub.requests_served
+            start = time.perf_counter()
+            stats = GmailSyncService(connection, gmail_client=gmail).full_import()
+            elapsed = time.perf_counter() - start
+            print(f"batched metadata hydrate: {stats['inserted']} emails in {elapsed:.2f}s, {stub.requests_served - start_requests} HTTP requests")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
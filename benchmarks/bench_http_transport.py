@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# Compares one-shot requests.get calls against the pooled HttpTransport on a local stub server.
+import os
+import sys
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from benchmarks.stub_server import StubServer
+from src.integrations.http_transport import HttpTransport
+from src.integrations.rate_limiter import RateLimitScheduler
+from src.integrations.trello_integration import TrelloIntegration
+
+CARD_PAYLOAD = [{"id": f"card{i}", "name": f"Card {i}", "desc": "x" * 200, "due": None} for i in range(50)]
+
+
+def handler(method, path, query, headers, body):
+    return 200, {}, CARD_PAYLOAD
+
+
+def run(label, fetch, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        fetch()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {n} requests in {elapsed:.3f}s ({n / elapsed:.0f} req/s)")
+
+
+def main(n=500):
+    with StubServer(handler) as stub:
+        url = f"{stub.url}/lists/abc/cards"
+        run("requests.get (no pooling)", lambda: requests.get(url, timeout=5).json(), n)
+        fresh_connections = stub.connections_opened
+
+        # Lift Trello's quota so the benchmark measures the transport, not the rate limiter.
+        transport = HttpTransport(rate_limiter=RateLimitScheduler(limits={"Trello": (1e6, 1e6)}))
+        trello = TrelloIntegration(api_key="k", token="t", transport=transport, base_url=stub.url)
+        run("HttpTransport via Trello", lambda: trello.get_cards_for_list("abc"), n)
+        print(f"TCP connections opened: unpooled={fresh_connections}, pooled={stub.connections_opened - fresh_connections}")
+        transport.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
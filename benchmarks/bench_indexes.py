@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# Query plans and latency of the per-user hot queries before and after the composite indexes (migration 0001).
+import datetime
+import os
+import statistics
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import event, insert
+
+from src.database import db
+from src import migrations
+from src.migrations import m0001_hot_path_indexes
+from src.models.copri_models import User, PlatformConnection, TrelloCard, Email, CalendarEvent, Project, CoachingInteraction, ApplicationTracking
+from src.services import prioritization_engine as engine
+
+NOW = datetime.datetime(2025, 6, 1, 12, 0)
+TODAY = NOW.date()
+
+
+def seed(users, emails, cards, events, interactions):
+    """Spreads the rows evenly over users, each with Trello, Gmail and Calendar connections."""
+    session = db.session
+    session.execute(insert(User.__table__), [{"user_id": u + 1, "username": f"user-{u}", "hashed_password": "x"} for u in range(users)])
+    platforms = ("Trello", "Gmail", "GoogleCalendar", "GitHub")
+    session.execute(insert(PlatformConnection.__table__), [
+        {"connection_id": u * len(platforms) + p + 1, "user_id": u + 1, "platform_name": name, "access_token": "t", "is_active": True}
+        for u in range(users) for p, name in enumerate(platforms)
+    ])
+
+    def connection(index, platform):
+        return (index % users) * len(platforms) + platforms.index(platform) + 1
+
+    def batches(total, make, size=20_000):
+        for start in range(0, total, size):
+            yield [make(i) for i in range(start, min(total, start + size))]
+
+    for batch in batches(emails, lambda i: {
+        "gmail_message_id": f"msg-{i}", "gmail_thread_id": f"thr-{i // 4}", "connection_id": connection(i, "Gmail"), "subject": f"Subject {i}",
+        "received_date": NOW - datetime.timedelta(minutes=i % 500_000), "is_read": i % 3 != 0, "is_important": i % 17 == 0,
+        "follow_up_status": "needs_reply" if (i // users) % 40 == 0 else None,
+    }):
+        session.execute(insert(Email.__table__), batch)
+    for batch in batches(cards, lambda i: {
+        "trello_card_id": f"card-{i}", "connection_id": connection(i, "Trello"), "trello_board_id": f"board-{i % 7}", "trello_list_id": "l",
+        "name": f"Card {i}", "due_date": NOW + datetime.timedelta(hours=(i * 37) % 4000 - 2000) if i % 4 else None,
+    }):
+        session.execute(insert(TrelloCard.__table__), batch)
+    for batch in batches(events, lambda i: {
+        "gcal_event_id": f"evt-{i}", "gcal_calendar_id": "primary", "connection_id": connection(i, "GoogleCalendar"), "summary": f"Event {i}",
+        "start_time": NOW + datetime.timedelta(hours=(i * 13) % 8000 - 4000), "end_time": NOW + datetime.timedelta(hours=(i * 13) % 8000 - 3999),
+    }):
+        session.execute(insert(CalendarEvent.__table__), batch)
+    for batch in batches(interactions, lambda i: {
+        "user_id": i % users + 1, "interaction_type": "ask_priority", "question_asked": "Q?", "timestamp": NOW - datetime.timedelta(minutes=i),
+    }):
+        session.execute(insert(CoachingInteraction.__table__), batch)
+    session.execute(insert(Project.__table__), [{"user_id": i % users + 1, "name": f"Project {i}", "status": "active" if i % 3 else "done"} for i in range(users * 20)])
+    session.execute(insert(ApplicationTracking.__table__), [
+        {"user_id": i % users + 1, "name_of_program": f"Program {i}", "submission_deadline": TODAY + datetime.timedelta(days=(i // users) * 5 - 100)} for i in range(users * 40)
+    ])
+    session.commit()
+
+
+def hot_queries(user_id):
+    """The access patterns the indexes were designed for, as the services and views issue them."""
+    gmail_id = PlatformConnection.query.filter_by(user_id=user_id, platform_name="Gmail", is_active=True).one().connection_id
+    user_connections = PlatformConnection.query.with_entities(PlatformConnection.connection_id).filter(PlatformConnection.user_id == user_id)
+    return {
+        "inbox timeline (latest 50)": lambda: Email.query.with_entities(Email.email_id_pk, Email.subject, Email.received_date)
+            .filter(Email.connection_id == gmail_id).order_by(Email.received_date.desc()).limit(50).all(),
+        "follow-up queue": lambda: Email.query.with_entities(Email.email_id_pk, Email.received_date)
+            .filter(Email.connection_id == gmail_id, Email.follow_up_status == "needs_reply").order_by(Email.received_date).all(),
+        "Trello due this week": lambda: TrelloCard.query.with_entities(TrelloCard.card_id_pk, TrelloCard.due_date)
+            .filter(TrelloCard.connection_id.in_(user_connections), TrelloCard.due_date.between(NOW, NOW + datetime.timedelta(days=7))).all(),
+        "calendar busy blocks (week)": lambda: CalendarEvent.query.with_entities(CalendarEvent.start_time, CalendarEvent.end_time)
+            .filter(CalendarEvent.connection_id.in_(user_connections), CalendarEvent.start_time < NOW + datetime.timedelta(days=7),
+                    CalendarEvent.start_time >= NOW - datetime.timedelta(days=1), CalendarEvent.end_time > NOW).all(),
+        "recent coaching interactions": lambda: CoachingInteraction.query.with_entities(CoachingInteraction.interaction_id, CoachingInteraction.timestamp)
+            .filter(CoachingInteraction.user_id == user_id).order_by(CoachingInteraction.timestamp.desc()).limit(20).all(),
+        "upcoming application deadlines": lambda: ApplicationTracking.query.with_entities(ApplicationTracking.application_id, ApplicationTracking.submission_deadline)
+            .filter(ApplicationTracking.user_id == user_id, ApplicationTracking.submission_deadline >= TODAY).order_by(ApplicationTracking.submission_deadline).all(),
+        "prioritization: email candidates": lambda: engine.CANDIDATE_SOURCES[engine.EMAIL](user_id, NOW.timestamp()),
+    }
+
+
+class StatementCapture:
+    """Keeps the last statement (and its parameters) a query ran, so it can be EXPLAINed."""
+
+    def __init__(self):
+        self.last = None
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.last = (statement, parameters)
+
+
+def plan(statement, parameters):
+    rows = db.session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    return "; ".join(row[-1] for row in rows)
+
+
+def run(label, queries, capture, repeat=20):
+    print(f"{label}:")
+    for name, query in queries.items():
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = query()
+            samples.append(time.perf_counter() - started)
+        rows = len(result[1]) if isinstance(result, tuple) else len(result)
+        print(f"  {name:<34} median={statistics.median(samples) * 1e3:8.2f}ms rows={rows:<6} plan: {plan(*capture.last)}")
+
+
+def main(users=200, emails=400_000, cards=150_000, events=100_000, interactions=100_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        db.init_app(app)
+        with app.app_context():
+            migrations.upgrade(db.engine, metadata=db.metadata)
+            context = migrations.MigrationContext(db.engine)
+            m0001_hot_path_indexes.downgrade(context) # Start from the pre-0001 indexes
+            started = time.perf_counter()
+            seed(users, emails, cards, events, interactions)
+            print(f"seeded {users} users, {emails:,} emails, {cards:,} cards, {events:,} events, {interactions:,} interactions in {time.perf_counter() - started:.1f}s")
+            db.session.execute(db.text("ANALYZE"))
+            db.session.commit()
+
+            capture = StatementCapture()
+            event.listen(db.engine, "before_cursor_execute", capture)
+            queries = hot_queries(user_id=users // 2)
+            run("before (primary keys and unique platform IDs only)", queries, capture)
+
+            started = time.perf_counter()
+            m0001_hot_path_indexes.upgrade(context)
+            db.session.execute(db.text("ANALYZE"))
+            db.session.commit()
+            print(f"migration 0001 built {len(m0001_hot_path_indexes.INDEX_NAMES)} indexes in {time.perf_counter() - started:.1f}s")
+            db.session.remove()
+            db.engine.dispose() # Pooled connections keep prepared statements planned against the old schema
+            run("after", queries, capture)
+            event.remove(db.engine, "before_cursor_execute", capture)
+
+
+if __name__ == "__main__":
+    main()
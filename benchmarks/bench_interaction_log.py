@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# CoachingInteraction writes: one commit per interaction vs. the write-behind InteractionLog, plus crash recovery from the spool.
+import datetime
+import os
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+from src.database import db
+from src.models.copri_models import User, CoachingInteraction
+from src.services.interaction_log import InteractionLog
+
+
+def interaction(user_id, i):
+    return CoachingInteraction(user_id=user_id, interaction_type="ask_priority", question_asked=f"Question {i}?", timestamp=datetime.datetime.utcnow())
+
+
+def main(n=5_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        db.init_app(app)
+        with app.app_context():
+            db.create_all()
+            user = User(username="bench", hashed_password="x")
+            db.session.add(user)
+            db.session.commit()
+            user_id = user.user_id
+
+            started = time.perf_counter()
+            for i in range(n):
+                db.session.add(interaction(user_id, i))
+                db.session.commit()
+            elapsed = time.perf_counter() - started
+            print(f"commit per interaction     {n} writes: {elapsed:6.2f}s total, {elapsed / n * 1e3:7.3f}ms per caller")
+
+            log = InteractionLog(app=app, max_batch=500, flush_interval=0.5)
+            started = time.perf_counter()
+            handles = [log.record(interaction(user_id, i)) for i in range(n)]
+            caller = time.perf_counter() - started
+            for index, handle in enumerate(handles[:200]):
+                log.respond(handle, user_id, f"Answer {index}")
+            handles[-1].wait(timeout=30)
+            log.close()
+            durable = time.perf_counter() - started
+            print(f"write-behind InteractionLog {n} writes: {durable:6.2f}s until durable, {caller / n * 1e3:7.3f}ms per caller, {log.flushes} flush(es)")
+            answered = CoachingInteraction.query.filter(CoachingInteraction.user_response.isnot(None)).count()
+            print(f"rows: {CoachingInteraction.query.count()} (expected {2 * n}), responses: {answered} (expected 200)")
+
+            # Crash recovery: queue writes with a spool file, abandon the log without flushing, start a new one.
+            spool = os.path.join(tmp, "interactions.spool")
+            crashed = InteractionLog(app=app, max_batch=10 ** 9, flush_interval=3600, spool_path=spool)
+            for i in range(100):
+                crashed.record(interaction(user_id, i))
+            crashed._closed = True # Simulates the process dying: nothing is flushed
+            before = CoachingInteraction.query.count()
+            recovered = InteractionLog(app=app, flush_interval=0.1, spool_path=spool)
+            recovered.close()
+            print(f"recovered from spool after simulated crash: {CoachingInteraction.query.count() - before} of 100 rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# Migration framework: startup cost of the version check vs. create_all(), upgrading a pre-framework database,
+# and writer stalls during a batched backfill vs. one big UPDATE.
+import datetime
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import create_engine, insert
+
+from src import migrations
+from src.database import db
+from src.migrations import m0001_hot_path_indexes, m0002_connection_sync_state
+from src.models.copri_models import User, PlatformConnection, Email
+
+NOW = datetime.datetime(2025, 6, 1, 12, 0)
+
+
+def timed(label, fn, repeat=20):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    print(f"  {label:<40} median={statistics.median(samples) * 1e3:8.2f}ms")
+
+
+def seed_emails(n, connection_id):
+    for start in range(0, n, 20_000):
+        db.session.execute(insert(Email.__table__), [
+            {"gmail_message_id": f"msg-{i}", "gmail_thread_id": f"thr-{i}", "connection_id": connection_id, "received_date": NOW - datetime.timedelta(minutes=i)}
+            for i in range(start, min(n, start + 20_000))
+        ])
+    db.session.commit()
+
+
+class Writer(threading.Thread):
+    """Inserts one email every few milliseconds on its own connection and records how long each insert waited."""
+
+    def __init__(self, url, connection_id, prefix):
+        super().__init__(daemon=True)
+        self.prefix = prefix
+        self.engine = create_engine(url, connect_args={"timeout": 60})
+        self.connection_id = connection_id
+        self.latencies = []
+        self.stop = threading.Event()
+
+    def run(self):
+        i = 0
+        while not self.stop.is_set():
+            started = time.perf_counter()
+            with self.engine.begin() as connection:
+                connection.execute(insert(Email.__table__).values(
+                    gmail_message_id=f"{self.prefix}-{i}", gmail_thread_id="live", connection_id=self.connection_id, received_date=NOW,
+                ))
+            self.latencies.append(time.perf_counter() - started)
+            i += 1
+            time.sleep(0.005)
+
+
+def under_writer(label, url, connection_id, fn):
+    writer = Writer(url, connection_id, prefix=label)
+    writer.start()
+    time.sleep(0.2)
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    writer.stop.set()
+    writer.join()
+    latencies = sorted(writer.latencies)
+    print(f"  {label:<40} {elapsed:6.2f}s; concurrent writer: {len(latencies)} inserts, "
+          f"p50={latencies[len(latencies) // 2] * 1e3:.1f}ms max={latencies[-1] * 1e3:.1f}ms")
+
+
+def main(emails=400_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        app = Flask(__name__)
+        app.config["SQLALCHEMY_DATABASE_URI"] = url
+        app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        db.init_app(app)
+        with app.app_context():
+            # A database from before the framework: no schema_version, no sync_state, no composite indexes.
+            db.create_all()
+            context = migrations.MigrationContext(db.engine)
+            m0001_hot_path_indexes.downgrade(context)
+            m0002_connection_sync_state.downgrade(context)
+            user = User(username="bench", hashed_password="x")
+            db.session.add(user)
+            db.session.flush()
+            connection_id = db.session.execute(insert(PlatformConnection.__table__).values(user_id=user.user_id, platform_name="Gmail", access_token="t")).inserted_primary_key[0]
+            db.session.commit()
+            seed_emails(emails, connection_id)
+            db.session.remove()
+
+            print(f"upgrading a pre-framework database with {emails:,} emails:")
+            started = time.perf_counter()
+            version = migrations.upgrade(db.engine, metadata=db.metadata)
+            print(f"  reached version {version} in {time.perf_counter() - started:.1f}s")
+
+            print("startup cost on an up-to-date database:")
+            timed("migrations.upgrade() (version check)", lambda: migrations.upgrade(db.engine, metadata=db.metadata))
+            timed("db.create_all() (metadata walk)", db.create_all)
+
+            table = Email.__table__
+            print(f"backfilling {emails:,} rows while another connection keeps inserting:")
+            under_writer("one UPDATE statement", url, connection_id, lambda: context.execute(
+                table.update().where(table.c.follow_up_status.is_(None)).values(follow_up_status="none")
+            ))
+            context.execute(table.update().values(follow_up_status=None))
+            under_writer("MigrationContext.backfill (5000/batch)", url, connection_id, lambda: context.backfill(
+                table, {"follow_up_status": "none"}, where=table.c.follow_up_status.is_(None), batch_size=5000,
+            ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# Ranking latency of the NumPy prioritization engine vs. a per-object Python loop, plus end-to-end rank() from SQLite.
+import datetime
+import math
+import os
+import statistics
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from flask import Flask
+
+from src.database import db
+from src.models.copri_models import User, PlatformConnection, TrelloCard, Email, Project, ApplicationTracking
+from src.services import prioritization_engine as engine
+from src.services.bulk_upsert import bulk_upsert
+
+NOW = datetime.datetime(2025, 6, 1, 12, 0)
+NOW_SECONDS = (NOW - datetime.datetime(1970, 1, 1)).total_seconds()
+
+
+def synthetic_candidates(n, seed=3):
+    rng = np.random.default_rng(seed)
+    item_type = rng.choice([engine.TRELLO_CARD, engine.EMAIL, engine.CALENDAR_EVENT, engine.PROJECT, engine.APPLICATION], n, p=[0.4, 0.5, 0.05, 0.02, 0.03])
+    deadline = NOW_SECONDS + rng.normal(0, 20 * engine.DAY, n)
+    deadline[(item_type == engine.EMAIL) | (rng.random(n) < 0.3)] = np.nan
+    is_email = item_type == engine.EMAIL
+    sentiment = np.where(is_email & (rng.random(n) < 0.5), rng.uniform(-1, 1, n), np.nan)
+    return engine.PriorityCandidates(
+        item_type, np.arange(n), deadline, NOW_SECONDS - rng.exponential(10 * engine.DAY, n),
+        (rng.random(n) < 0.1).astype(float), np.where(item_type == engine.PROJECT, 1.0 / rng.integers(1, 6, n), 0.0),
+        (is_email & (rng.random(n) < 0.2)).astype(float), (is_email & (rng.random(n) < 0.6)).astype(float), sentiment,
+    )
+
+
+def python_rank(items, k):
+    """The same scoring written as a loop over per-item dicts, then a full sort."""
+    weights = engine.DEFAULT_WEIGHTS
+    scored = []
+    for item in items:
+        deadline = 0.0
+        if not math.isnan(item["deadline"]):
+            remaining = item["deadline"] - NOW_SECONDS
+            deadline = engine.DEADLINE_HORIZON / (engine.DEADLINE_HORIZON + remaining) if remaining >= 0 else math.exp(remaining / engine.OVERDUE_STALE_AFTER)
+        recency = 0.0 if math.isnan(item["activity"]) else 2 ** (-max(NOW_SECONDS - item["activity"], 0.0) / engine.RECENCY_HALF_LIFE)
+        sentiment = 0.0 if math.isnan(item["sentiment"]) else min(max(-item["sentiment"], 0.0), 1.0)
+        score = (engine.TYPE_BASE[item["item_type"]] + weights["deadline"] * deadline + weights["importance"] * item["importance"]
+                 + weights["project_priority"] * item["project_priority"] + weights["follow_up"] * item["follow_up"]
+                 + weights["unread"] * item["unread"] + weights["negative_sentiment"] * sentiment + weights["recency"] * recency)
+        scored.append((score, item["item_pk"]))
+    scored.sort(reverse=True)
+    return scored[:k]
+
+
+def timed(label, fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    print(f"{label:<48} median={statistics.median(samples) * 1e3:8.2f}ms min={min(samples) * 1e3:8.2f}ms")
+    return result
+
+
+def bench_in_memory(n=100_000, k=10):
+    candidates = synthetic_candidates(n)
+    print(f"In-memory ranking of {n:,} candidates (top {k}):")
+
+    def numpy_rank():
+        scores, _ = engine.score(candidates, NOW_SECONDS)
+        return [int(candidates.item_pk[i]) for i in engine.top_k_indices(scores, k)]
+    fast = timed("  numpy: vectorized score + argpartition", numpy_rank, 20)
+
+    items = [{field: getattr(candidates, field)[i].item() for field in engine.PriorityCandidates.FIELDS} for i in range(n)]
+    slow = timed("  python: per-item loop + full sort", lambda: [pk for _, pk in python_rank(items, k)], 3)
+    print(f"  same top {k}: {fast == slow}")
+
+
+def bench_end_to_end(cards=40_000, emails=58_000, projects=500, applications=1_500, k=10):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        db.init_app(app)
+        with app.app_context():
+            db.create_all()
+            user = User(username="bench", hashed_password="x")
+            db.session.add(user)
+            db.session.flush()
+            trello = PlatformConnection(user_id=user.user_id, platform_name="Trello", access_token="fake")
+            gmail = PlatformConnection(user_id=user.user_id, platform_name="Gmail", access_token="fake")
+            db.session.add_all([trello, gmail])
+            db.session.commit()
+            bulk_upsert(TrelloCard, ({
+                "trello_card_id": f"card-{i}", "connection_id": trello.connection_id, "trello_board_id": "b", "trello_list_id": "l",
+                "name": f"Card {i}", "due_date": NOW + datetime.timedelta(hours=i % 2000 - 500) if i % 3 else None,
+                "labels": [{"name": "urgent", "color": "red"}] if i % 11 == 0 else [], "last_activity_date": NOW - datetime.timedelta(minutes=i),
+            } for i in range(cards)))
+            bulk_upsert(Email, ({
+                "gmail_message_id": f"msg-{i}", "gmail_thread_id": f"thr-{i // 3}", "connection_id": gmail.connection_id,
+                "subject": f"Subject {i}", "received_date": NOW - datetime.timedelta(minutes=i), "is_read": i % 4 != 0,
+                "is_important": i % 10 == 0, "follow_up_status": "needs_follow_up" if i % 7 == 0 else None,
+                "sentiment_score": (i % 21 - 10) / 10.0,
+            } for i in range(emails)))
+            db.session.bulk_insert_mappings(Project, [{"user_id": user.user_id, "name": f"Project {i}", "priority_copri": i % 5 + 1, "end_date": (NOW + datetime.timedelta(days=i % 90)).date()} for i in range(projects)])
+            db.session.bulk_insert_mappings(ApplicationTracking, [{"user_id": user.user_id, "name_of_program": f"Program {i}", "submission_deadline": (NOW + datetime.timedelta(days=i % 60)).date()} for i in range(applications)])
+            db.session.commit()
+
+            print(f"End-to-end rank() from SQLite ({cards + emails + projects + applications:,} rows):")
+            candidates = timed("  load candidates (column projections)", lambda: engine.load_candidates(user.user_id, NOW_SECONDS), 3)
+            print(f"  {len(candidates):,} candidates loaded")
+            ranked = timed("  score + top-k + titles", lambda: engine.PrioritizationEngine().rank(user.user_id, k=k, now_seconds=NOW_SECONDS, candidates=candidates), 10)
+            for item in ranked[:3]:
+                print(f"    {item['score']:.3f} {item['item_type']:<20} {item['title']!r}: {item['reason']}")
+
+
+if __name__ == "__main__":
+    bench_in_memory()
+    bench_end_to_end()
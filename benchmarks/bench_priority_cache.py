@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# Cached priority scores: cold build, warm O(K) reads, dirty-set refresh and scheduled decay vs. re-ranking from scratch.
+import datetime
+import os
+import statistics
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+from src.database import db
+from src.models.copri_models import User, PlatformConnection, TrelloCard, Email
+from src.services import prioritization_engine as engine
+from src.services.bulk_upsert import bulk_upsert
+from src.services.priority_cache import PriorityScoreCache
+
+NOW = datetime.datetime.utcnow().replace(microsecond=0)
+
+
+def card_rows(n, connection_id, version=0, start=0):
+    for i in range(start, start + n):
+        yield {
+            "trello_card_id": f"card-{i}", "connection_id": connection_id, "trello_board_id": "b", "trello_list_id": "l",
+            "name": f"Card {i} v{version}", "due_date": NOW + datetime.timedelta(hours=(i * 7 + version * 13) % 3000 - 500) if i % 3 else None,
+            "labels": [{"name": "urgent", "color": "red"}] if (i + version) % 11 == 0 else [], "last_activity_date": NOW - datetime.timedelta(minutes=i),
+        }
+
+
+def timed(label, fn, repeat=1):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    print(f"{label:<52} median={statistics.median(samples) * 1e3:9.2f}ms")
+    return result
+
+
+def main(cards=50_000, emails=50_000, changed=50, k=10):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        db.init_app(app)
+        with app.app_context():
+            db.create_all()
+            user = User(username="bench", hashed_password="x")
+            db.session.add(user)
+            db.session.flush()
+            trello = PlatformConnection(user_id=user.user_id, platform_name="Trello", access_token="fake")
+            gmail = PlatformConnection(user_id=user.user_id, platform_name="Gmail", access_token="fake")
+            db.session.add_all([trello, gmail])
+            db.session.commit()
+            bulk_upsert(TrelloCard, card_rows(cards, trello.connection_id))
+            bulk_upsert(Email, ({
+                "gmail_message_id": f"msg-{i}", "gmail_thread_id": f"thr-{i // 3}", "connection_id": gmail.connection_id,
+                "subject": f"Subject {i}", "received_date": NOW - datetime.timedelta(minutes=i), "is_read": i % 2 == 0,
+                "is_important": i % 10 == 0, "sentiment_score": (i % 21 - 10) / 10.0,
+            } for i in range(emails)))
+            user_id = user.user_id
+
+            cache = PriorityScoreCache(decay_interval=3600) # Decay refresh is also driven by hand below
+            print(f"{cards + emails:,} rows, top {k}:")
+            timed("uncached: PrioritizationEngine.rank (load + score)", lambda: engine.PrioritizationEngine().rank(user_id, k=k), 3)
+            timed("cached: cold build + read", lambda: cache.ranked(user_id, k))
+            timed("cached: warm read (slice + titles)", lambda: cache.ranked(user_id, k), 50)
+
+            changed_ids = set()
+            bulk_upsert(TrelloCard, card_rows(changed, trello.connection_id, version=1, start=1000), changed_keys=changed_ids)
+            cache.mark_dirty(user_id, engine.TRELLO_CARD, changed_ids)
+            timed(f"cached: read after {len(changed_ids)} dirty cards", lambda: cache.ranked(user_id, k))
+            timed("cached: scheduled decay refresh (all users)", cache.refresh_decay, 5)
+
+            cached = [(item["item_type"], item["item_pk"]) for item in cache.ranked(user_id, k)]
+            fresh = [(item["item_type"], item["item_pk"]) for item in engine.PrioritizationEngine().rank(user_id, k=k, now_seconds=cache._entries[user_id].scored_at)]
+            print(f"cached ranking matches a full re-rank: {cached == fresh}")
+
+
+if __name__ == "__main__":
+    main()
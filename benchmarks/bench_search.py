@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# Full-text search latency: the search index (FTS5 on SQLite) vs. LIKE '%term%' over the source tables.
+import datetime
+import itertools
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import and_, func, insert, or_, select
+
+from src import migrations
+from src.database import db
+from src.models.copri_models import User, PlatformConnection, TrelloCard, Email
+from src.services import search_index
+
+NOW = datetime.datetime(2025, 6, 1, 12, 0)
+
+def vocabulary(size=20_000, seed=7):
+    """Pseudo-words with Zipf-distributed frequencies, so a few terms are common and most are rare."""
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = sorted({"".join(rng.choice(letters) for _ in range(rng.randint(3, 9))) for _ in range(size)})
+    rng.shuffle(words)
+    return words, list(itertools.accumulate(1 / rank for rank in range(1, len(words) + 1)))
+
+def seed(users, emails_per_user, cards_per_user, words, cum_weights):
+    rng = random.Random(11)
+    sentence = lambda n: " ".join(rng.choices(words, cum_weights=cum_weights, k=n))
+    for user_id in range(1, users + 1):
+        db.session.add(User(user_id=user_id, username=f"user-{user_id}", hashed_password="x"))
+        db.session.add_all([PlatformConnection(user_id=user_id, platform_name=name, access_token="t") for name in ("Trello", "Gmail")])
+    db.session.commit()
+    for user_id in range(1, users + 1):
+        ids = {row.platform_name: row.connection_id for row in PlatformConnection.query.filter_by(user_id=user_id)}
+        for start in range(0, emails_per_user, 20_000):
+            db.session.execute(insert(Email.__table__), [
+                {"gmail_message_id": f"msg-{user_id}-{i}", "gmail_thread_id": "t", "connection_id": ids["Gmail"], "subject": sentence(6),
+                 "snippet": sentence(25), "received_date": NOW - datetime.timedelta(minutes=i)}
+                for i in range(start, min(emails_per_user, start + 20_000))
+            ])
+        db.session.execute(insert(TrelloCard.__table__), [
+            {"trello_card_id": f"card-{user_id}-{i}", "connection_id": ids["Trello"], "trello_board_id": "b", "trello_list_id": "l",
+             "name": sentence(5), "description": sentence(20), "last_activity_date": NOW - datetime.timedelta(hours=i)}
+            for i in range(cards_per_user)
+        ])
+        db.session.commit()
+
+def like_search(user_id, words, limit=20):
+    """The naive approach: every word must appear somewhere in the subject or snippet."""
+    connection_ids = select(PlatformConnection.connection_id).where(PlatformConnection.user_id == user_id)
+    matches = [or_(func.lower(Email.subject).like(f"%{word}%"), func.lower(Email.snippet).like(f"%{word}%")) for word in words]
+    statement = (
+        select(Email.email_id_pk).where(Email.connection_id.in_(connection_ids), and_(*matches))
+        .order_by(Email.received_date.desc()).limit(limit)
+    )
+    return db.session.execute(statement).all()
+
+def timed(function, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - started) * 1e3)
+    samples.sort()
+    return statistics.median(samples), samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+def main(users=50, emails_per_user=18_000, cards_per_user=2_000, runs=50, like_runs=5):
+    words, cum_weights = vocabulary()
+    common, mid, rare = words[3], words[200], words[5000]
+    queries = [
+        ("single common term", common, {}),
+        ("single rare term", rare, {}),
+        ("two terms", f"{common} {mid}", {}),
+        ("prefix", mid[:3] + "*", {}),
+        ("phrase", f'"{words[0]} {words[1]}"', {}),
+        ("cards only", mid, {"types": ["trello_card"]}),
+        ("search-as-you-type", f"{common} {mid[:4]}", {"prefix_last": True}),
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        db.init_app(app)
+        with app.app_context():
+            migrations.upgrade(db.engine, metadata=db.metadata)
+            started = time.perf_counter()
+            seed(users, emails_per_user, cards_per_user, words, cum_weights)
+            documents = users * (emails_per_user + cards_per_user)
+            print(f"Seeded {documents:,} documents for {users} users in {time.perf_counter() - started:.1f}s.")
+            started = time.perf_counter()
+            search_index.rebuild()
+            print(f"search_index.rebuild(): {time.perf_counter() - started:.1f}s")
+
+            rng = random.Random(3)
+            print(f"  {'query':<20} {'p50':>9} {'p95':>9} {'hits':>5}")
+            for label, query, options in queries:
+                p50, p95 = timed(lambda: search_index.search(rng.randint(1, users), query, **options), runs)
+                hits = len(search_index.search(1, query, **options))
+                print(f"  {label:<20} {p50:>7.2f}ms {p95:>7.2f}ms {hits:>5}")
+
+            # An unranked LIKE on a common term stops at the first 20 hits; rare terms scan every email the user has.
+            for label, query_words in (("LIKE, common term", [common]), ("LIKE, rare term", [rare]), ("LIKE, two terms", [common, mid])):
+                p50, p95 = timed(lambda: like_search(rng.randint(1, users), query_words), like_runs)
+                print(f"  {label:<20} {p50:>7.2f}ms {p95:>7.2f}ms   (emails only, no ranking)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# Mixed read/write load on SQLite: dashboard readers alongside ingestion writers, default engine vs. init_database()
+# (WAL, tuned pragmas, single-writer gate).
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import insert
+from sqlalchemy.exc import OperationalError
+
+from src import migrations
+from src.database import db, init_database
+from src.models.copri_models import User, PlatformConnection, Email, CoachingInteraction
+from src.services.bulk_upsert import bulk_upsert
+
+NOW = datetime.datetime(2025, 6, 1, 12, 0)
+USERS = 20
+
+
+def seed(emails):
+    db.session.execute(insert(User.__table__), [{"user_id": u + 1, "username": f"user-{u}", "hashed_password": "x"} for u in range(USERS)])
+    db.session.execute(insert(PlatformConnection.__table__), [
+        {"connection_id": u + 1, "user_id": u + 1, "platform_name": "Gmail", "access_token": "t", "is_active": True} for u in range(USERS)
+    ])
+    for start in range(0, emails, 20_000):
+        db.session.execute(insert(Email.__table__), [email_row(i) for i in range(start, min(emails, start + 20_000))])
+    db.session.commit()
+
+
+def email_row(i, version=0):
+    return {
+        "gmail_message_id": f"msg-{i}", "gmail_thread_id": f"thr-{i // 3}", "connection_id": i % USERS + 1, "subject": f"Subject {i} v{version}",
+        "snippet": "s" * 200, "received_date": NOW - datetime.timedelta(minutes=i), "is_read": (i + version) % 2 == 0,
+    }
+
+
+class Load:
+    def __init__(self):
+        self.samples = {"read": [], "ingest": [], "interaction": []}
+        self.errors = {"read": 0, "ingest": 0, "interaction": 0}
+        self.lock = threading.Lock()
+        self.stop = threading.Event()
+
+    def record(self, kind, elapsed=None):
+        with self.lock:
+            if elapsed is None:
+                self.errors[kind] += 1
+            else:
+                self.samples[kind].append(elapsed)
+
+
+def worker(app, load, kind, operation):
+    rng = random.Random(hash(threading.current_thread().name))
+    with app.app_context():
+        while not load.stop.is_set():
+            started = time.perf_counter()
+            try:
+                operation(rng)
+                load.record(kind, time.perf_counter() - started)
+            except OperationalError:
+                db.session.rollback()
+                load.record(kind) # "database is locked"
+
+
+def read_dashboard(rng):
+    connection_id = rng.randrange(USERS) + 1
+    Email.query.with_entities(Email.email_id_pk, Email.subject, Email.received_date).filter(Email.connection_id == connection_id) \
+        .order_by(Email.received_date.desc()).limit(50).all()
+    Email.query.filter(Email.connection_id == connection_id, Email.is_read.is_(False)).count()
+    db.session.rollback() # End the read transaction, as a request teardown would
+
+
+def make_ingest(emails):
+    version = [0]
+
+    def ingest(rng):
+        version[0] += 1
+        start = rng.randrange(emails)
+        bulk_upsert(Email, [email_row(i % emails, version[0]) for i in range(start, start + 500)], commit=True)
+    return ingest
+
+
+def record_interaction(rng):
+    db.session.add(CoachingInteraction(user_id=rng.randrange(USERS) + 1, interaction_type="ask_priority", question_asked="Q?"))
+    db.session.commit()
+
+
+def run(label, configure, emails, readers, ingesters, interaction_writers, seconds):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        configure(app)
+        with app.app_context():
+            migrations.upgrade(db.engine, metadata=db.metadata)
+            seed(emails)
+            journal = db.session.execute(db.text("PRAGMA journal_mode")).scalar()
+            db.session.remove()
+        load = Load()
+        threads = (
+            [threading.Thread(target=worker, args=(app, load, "read", read_dashboard), name=f"reader-{i}") for i in range(readers)]
+            + [threading.Thread(target=worker, args=(app, load, "ingest", make_ingest(emails)), name=f"ingest-{i}") for i in range(ingesters)]
+            + [threading.Thread(target=worker, args=(app, load, "interaction", record_interaction), name=f"interaction-{i}") for i in range(interaction_writers)]
+        )
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        load.stop.set()
+        for thread in threads:
+            thread.join()
+        print(f"{label} (journal_mode={journal}):")
+        for kind, samples in load.samples.items():
+            samples.sort()
+            p95 = samples[int(len(samples) * 0.95)] * 1e3 if samples else float("nan")
+            p50 = statistics.median(samples) * 1e3 if samples else float("nan")
+            print(f"  {kind:<12} {len(samples) / seconds:8.1f} ops/s  p50={p50:8.2f}ms  p95={p95:8.2f}ms  errors={load.errors[kind]}")
+        gate = app.extensions.get("copri_write_gate")
+        if gate is not None:
+            print(f"  write gate: {gate.acquired} acquisitions, {gate.waited} queued, longest wait {gate.max_wait * 1e3:.1f}ms")
+
+
+def main(emails=100_000, readers=8, ingesters=2, interaction_writers=2, seconds=8):
+    print(f"{emails:,} emails, {readers} readers, {ingesters} bulk-ingest writers, {interaction_writers} single-row writers, {seconds}s each")
+    run("default engine (db.init_app)", db.init_app, emails, readers, ingesters, interaction_writers, seconds)
+    run("init_database (WAL + pragmas + write gate)", init_database, emails, readers, ingesters, interaction_writers, seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# End-to-end multi-platform sync against local fake APIs: sequential vs. concurrent wall-clock time.
+import os
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+from benchmarks import fake_apis
+from benchmarks.stub_server import StubServer
+from src.database import db
+from src.models.copri_models import User, PlatformConnection
+from src.services.sync_orchestrator import SyncOrchestrator
+
+# Platform -> (fake API factory, path prefix of the real base URL, simulated per-request latency)
+FAKES = {
+    "Trello": (fake_apis.trello_api, "/1", 0.15),
+    "Gmail": (fake_apis.gmail_api, "/gmail/v1", 0.25),
+    "GoogleCalendar": (fake_apis.calendar_api, "/calendar/v3", 0.2),
+    "GitHub": (fake_apis.github_api, "", 0.3),
+    "X": (fake_apis.x_api, "/2", 0.1),
+    "LinkedIn": (fake_apis.linkedin_api, "/v2", 0.1),
+}
+
+
+def main():
+    servers = {name: StubServer(factory(), latency=latency).start() for name, (factory, _, latency) in FAKES.items()}
+    base_urls = {name: servers[name].url + FAKES[name][1] for name in FAKES}
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            app = Flask(__name__)
+            app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+            app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+            db.init_app(app)
+            with app.app_context():
+                db.create_all()
+                user = User(username="bench", hashed_password="x")
+                db.session.add(user)
+                db.session.flush()
+                for name in FAKES:
+                    db.session.add(PlatformConnection(user_id=user.user_id, platform_name=name, access_token="fake", platform_user_id="42"))
+                db.session.commit()
+                user_id = user.user_id
+
+                for label, workers in (("sequential (1 worker)", 1), ("concurrent", 12)):
+                    PlatformConnection.query.update({"last_sync_time": None, "sync_state": None})
+                    db.session.commit()
+                    start = time.perf_counter()
+                    results = SyncOrchestrator(app=app, max_workers=workers, base_urls=base_urls).sync_user(user_id)
+                    elapsed = time.perf_counter() - start
+                    slowest = max(r.get("duration_s", 0) for r in results.values())
+                    total = sum(r.get("duration_s", 0) for r in results.values())
+                    statuses = sorted({r["status"] for r in results.values()})
+                    print(f"{label:<22} wall={elapsed:.2f}s sum-of-platforms={total:.2f}s slowest-platform={slowest:.2f}s statuses={statuses}")
+    finally:
+        for server in servers.values():
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# Activity timeline page latency by scroll depth: keyset cursors (timeline_page) vs. UNION ALL + OFFSET.
+import datetime
+import os
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import insert, literal, select, union_all
+
+from src import migrations
+from src.database import db
+from src.models.copri_models import User, PlatformConnection, TrelloCard, Email, CalendarEvent, CoachingInteraction, FinancialNote
+from src.services.activity_timeline import SOURCES, timeline_page
+
+NOW = datetime.datetime(2025, 6, 1, 12, 0)
+
+
+def seed(user_id, trello_id, gmail_id, calendar_id, emails, cards, events, interactions, notes):
+    def batches(total, make, size=20_000):
+        for start in range(0, total, size):
+            yield [make(i) for i in range(start, min(total, start + size))]
+
+    # Timestamps repeat on purpose (whole minutes), so ties across and within sources are exercised.
+    for batch in batches(emails, lambda i: {"gmail_message_id": f"msg-{user_id}-{i}", "gmail_thread_id": "t", "connection_id": gmail_id,
+                                            "subject": f"Subject {i}", "received_date": NOW - datetime.timedelta(minutes=i // 2)}):
+        db.session.execute(insert(Email.__table__), batch)
+    for batch in batches(cards, lambda i: {"trello_card_id": f"card-{user_id}-{i}", "connection_id": trello_id, "trello_board_id": "b", "trello_list_id": "l",
+                                           "name": f"Card {i}", "last_activity_date": NOW - datetime.timedelta(minutes=i * 4)}):
+        db.session.execute(insert(TrelloCard.__table__), batch)
+    for batch in batches(events, lambda i: {"gcal_event_id": f"evt-{user_id}-{i}", "gcal_calendar_id": "primary", "connection_id": calendar_id,
+                                            "summary": f"Event {i}", "start_time": NOW - datetime.timedelta(minutes=i * 10)}):
+        db.session.execute(insert(CalendarEvent.__table__), batch)
+    for batch in batches(interactions, lambda i: {"user_id": user_id, "interaction_type": "ask_priority", "question_asked": f"Q{i}?",
+                                                  "timestamp": NOW - datetime.timedelta(minutes=i * 3)}):
+        db.session.execute(insert(CoachingInteraction.__table__), batch)
+    for batch in batches(notes, lambda i: {"user_id": user_id, "description": f"Note {i}", "amount": i, "created_at": NOW - datetime.timedelta(minutes=i * 20)}):
+        db.session.execute(insert(FinancialNote.__table__), batch)
+    db.session.commit()
+
+
+def union_offset_page(user_id, connection_ids, offset, limit):
+    """The naive approach: UNION ALL every source, sort, and skip offset rows."""
+    parts = []
+    for rank, source in enumerate(SOURCES):
+        owner = source.model.user_id == user_id if source.platform is None else source.model.connection_id.in_(connection_ids)
+        parts.append(select(source.timestamp.label("ts"), literal(rank).label("rank"), source.pk.label("pk")).where(owner, source.timestamp.isnot(None)))
+    timeline = union_all(*parts).subquery()
+    statement = select(timeline).order_by(timeline.c.ts.desc(), timeline.c.rank.desc(), timeline.c.pk.desc()).offset(offset).limit(limit)
+    return db.session.execute(statement).all()
+
+
+def main(emails=300_000, cards=50_000, events=20_000, interactions=50_000, notes=10_000, limit=50, depths=(1, 10, 100, 1000, 3000)):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        db.init_app(app)
+        with app.app_context():
+            migrations.upgrade(db.engine, metadata=db.metadata)
+            for user_id in (1, 2): # A second user's rows share the tables, as in production
+                db.session.add(User(user_id=user_id, username=f"user-{user_id}", hashed_password="x"))
+                db.session.add_all([PlatformConnection(user_id=user_id, platform_name=name, access_token="t") for name in ("Trello", "Gmail", "GoogleCalendar")])
+            db.session.commit()
+            for user_id in (1, 2):
+                ids = {row.platform_name: row.connection_id for row in PlatformConnection.query.filter_by(user_id=user_id)}
+                seed(user_id, ids["Trello"], ids["Gmail"], ids["GoogleCalendar"], emails, cards, events, interactions, notes)
+            connection_ids = [row.connection_id for row in PlatformConnection.query.filter_by(user_id=1)]
+            print(f"{emails + cards + events + interactions + notes:,} timeline rows per user, {limit} items per page:")
+            print(f"  {'page':>6} {'keyset (timeline_page)':>24} {'UNION ALL + OFFSET':>20}")
+
+            cursor = None
+            keyset_order = []
+            for page in range(1, max(depths) + 1):
+                started = time.perf_counter()
+                result = timeline_page(1, cursor=cursor, limit=limit)
+                keyset_elapsed = time.perf_counter() - started
+                keyset_order.extend((item["type"], item["pk"]) for item in result["items"])
+                if page in depths:
+                    started = time.perf_counter()
+                    rows = union_offset_page(1, connection_ids, (page - 1) * limit, limit)
+                    union_elapsed = time.perf_counter() - started
+                    same = [(SOURCES[row.rank].name, row.pk) for row in rows] == keyset_order[-limit:]
+                    print(f"  {page:>6} {keyset_elapsed * 1e3:>22.2f}ms {union_elapsed * 1e3:>18.2f}ms   same items: {same}")
+                cursor = result["next_cursor"]
+                if cursor is None:
+                    break
+
+            started = time.perf_counter()
+            emails_only = timeline_page(1, limit=limit, types=["email"])
+            print(f"  email-only first page: {(time.perf_counter() - started) * 1e3:.2f}ms, {len(emails_only['items'])} items")
+
+
+if __name__ == "__main__":
+    main()
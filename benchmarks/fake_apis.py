@@ -0,0 +1,171 @@
+# Minimal fake platform APIs served by StubServer; just enough surface for the sync benchmarks.
+import datetime
+import json
+
+
+def _iso(dt):
+    return dt.replace(microsecond=0).isoformat() + "Z"
+
+
+def trello_api(boards=3, cards_per_board=50):
+    now = datetime.datetime.utcnow()
+    board_ids = [f"{0x5f000000 + b:08x}board{b:04d}" for b in range(boards)]
+
+    def card(board_id, i):
+        return {
+            "id": f"{0x5f000000 + i:08x}{board_id[-8:]}c{i:04d}", "idBoard": board_id, "idList": f"{board_id}-list",
+            "name": f"Card {i}", "desc": "", "due": None, "idLabels": [], "idMembers": [],
+            "url": None, "dateLastActivity": _iso(now - datetime.timedelta(days=1)), "closed": False,
+        }
+
+    def handler(method, path, query, headers, body):
+        if path == "/1/members/me/boards":
+            return 200, {}, [{"id": b, "name": b, "url": None, "dateLastActivity": _iso(now - datetime.timedelta(days=1))} for b in board_ids]
+        if path == "/1/batch":
+            out = []
+            for url in query["urls"][0].split(","):
+                board_id = url.split("?")[0].split("/")[2]
+                out.append({"200": {"id": board_id, "name": board_id, "lists": [{"id": f"{board_id}-list", "name": "To Do"}],
+                                    "labels": [], "members": [], "cards": [card(board_id, i) for i in range(cards_per_board)]}})
+            return 200, {}, out
+        return 404, {}, {"error": "not found"}
+    return handler
+
+
+def gmail_message(i, now=None):
+    now = now or datetime.datetime(2025, 5, 1)
+    return {
+        "id": f"msg{i:07d}", "threadId": f"thr{i // 3:07d}",
+        "labelIds": ["INBOX"] + (["UNREAD"] if i % 4 == 0 else []) + (["IMPORTANT"] if i % 10 == 0 else []),
+        "snippet": f"Snippet for message {i}",
+        "internalDate": str(int((now - datetime.timedelta(minutes=i)).timestamp() * 1000)),
+        "payload": {
+            "headers": [
+                {"name": "Subject", "value": f"Subject {i}"},
+                {"name": "From", "value": f"sender{i % 50}@example.com"},
+                {"name": "To", "value": "me@example.com"},
+            ],
+            # Only sent for format=full: stands in for the body we avoid downloading.
+            "body": {"data": "x" * 4000},
+        },
+    }
+
+
+def gmail_api(messages=200, history=None):
+    """history: optional mutable list of users.history records, served after historyId 1000."""
+    history = history if history is not None else []
+
+    def get_message(message_id, fmt):
+        index = int(message_id[3:]) if message_id.startswith("msg") and message_id[3:].isdigit() else -1
+        if not 0 <= index < messages:
+            return 404, {"error": {"code": 404, "message": "Not Found"}}
+        message = gmail_message(index)
+        if fmt != "full":
+            message = {**message, "payload": {"headers": message["payload"]["headers"]}}
+        return 200, message
+
+    def handler(method, path, query, headers, body):
+        if method == "GET" and path == "/gmail/v1/users/me/messages":
+            size = int(query.get("maxResults", ["100"])[0])
+            start = int(query.get("pageToken", ["0"])[0])
+            page = {"messages": [{"id": f"msg{i:07d}", "threadId": f"thr{i // 3:07d}"} for i in range(start, min(messages, start + size))]}
+            if start + size < messages:
+                page["nextPageToken"] = str(start + size)
+            return 200, {}, page
+        if method == "GET" and path == "/gmail/v1/users/me/profile":
+            return 200, {}, {"emailAddress": "me@example.com", "historyId": str(1000 + len(history))}
+        if method == "GET" and path == "/gmail/v1/users/me/history":
+            start = int(query["startHistoryId"][0])
+            if start < 1000:
+                return 404, {}, {"error": {"code": 404, "message": "Requested entity was not found."}}
+            return 200, {}, {"history": history[start - 1000:], "historyId": str(1000 + len(history))}
+        if method == "GET" and path.startswith("/gmail/v1/users/me/messages/"):
+            status, payload = get_message(path.rsplit("/", 1)[1], query.get("format", ["full"])[0])
+            return status, {}, payload
+        if method == "POST" and path == "/batch/gmail/v1":
+            boundary = headers["Content-Type"].split("boundary=")[1]
+            out_boundary = "batch_response"
+            parts = []
+            for part in body.decode("utf-8").split(f"--{boundary}")[1:]:
+                if part.startswith("--"):
+                    break
+                content_id = part.split("Content-ID: <", 1)[1].split(">", 1)[0]
+                request_line = part.split("\r\n\r\n", 1)[1].strip().split("\r\n")[0]
+                target = request_line.split(" ")[1]
+                fmt = "metadata" if "format=metadata" in target else "full"
+                status, payload = get_message(target.split("?")[0].rsplit("/", 1)[1], fmt)
+                parts.append(
+                    f"--{out_boundary}\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n"
+                    f"HTTP/1.1 {status} OK\r\nContent-Type: application/json\r\n\r\n{json.dumps(payload)}\r\n"
+                )
+            return 200, {"Content-Type": f"multipart/mixed; boundary={out_boundary}"}, "".join(parts) + f"--{out_boundary}--\r\n"
+        return 404, {}, {"error": "not found"}
+    return handler
+
+
+def calendar_api(events=50, changes=None):
+    """changes: optional mutable list of changed event dicts, returned to syncToken requests.
+    Every fifth event is a daily recurring series, expanded when singleEvents=true."""
+    start = datetime.datetime.utcnow().replace(minute=0, second=0, microsecond=0) + datetime.timedelta(hours=1)
+    changes = changes if changes is not None else []
+
+    def event(i):
+        item = {"id": f"evt{i}", "summary": f"Event {i}", "status": "confirmed",
+                "start": {"dateTime": _iso(start + datetime.timedelta(hours=i))},
+                "end": {"dateTime": _iso(start + datetime.timedelta(hours=i, minutes=30))}}
+        if i % 5 == 0:
+            item["recurrence"] = ["RRULE:FREQ=DAILY"]
+        return item
+
+    def instances(item, time_min, time_max):
+        first = datetime.datetime.fromisoformat(item["start"]["dateTime"].rstrip("Z"))
+        days = range(0, 60) if "recurrence" in item else range(1)
+        for day in days:
+            begin = first + datetime.timedelta(days=day)
+            if time_min <= begin < time_max:
+                yield {**item, "id": f"{item['id']}_{begin:%Y%m%dT%H%M%SZ}", "recurringEventId": item["id"] if "recurrence" in item else None,
+                       "start": {"dateTime": _iso(begin)}, "end": {"dateTime": _iso(begin + datetime.timedelta(minutes=30))}}
+
+    def handler(method, path, query, headers, body):
+        if path == "/calendar/v3/calendars/primary/events":
+            sync_token = query.get("syncToken", [None])[0]
+            if sync_token is not None:
+                if not sync_token.startswith("sync-") or int(sync_token[5:]) > len(changes):
+                    return 410, {}, {"error": {"code": 410, "message": "Sync token is no longer valid."}}
+                return 200, {}, {"items": changes[int(sync_token[5:]):], "nextSyncToken": f"sync-{len(changes)}"}
+            if query.get("singleEvents", ["false"])[0] == "true":
+                time_min = datetime.datetime.fromisoformat(query["timeMin"][0].rstrip("Z"))
+                time_max = datetime.datetime.fromisoformat(query["timeMax"][0].rstrip("Z"))
+                items = [instance for i in range(events) for instance in instances(event(i), time_min, time_max)]
+                return 200, {}, {"items": sorted(items, key=lambda item: item["start"]["dateTime"])}
+            return 200, {}, {"items": [event(i) for i in range(events)], "nextSyncToken": f"sync-{len(changes)}"}
+        return 404, {}, {"error": "not found"}
+    return handler
+
+
+def github_api(repos=30):
+    def handler(method, path, query, headers, body):
+        if path == "/user/repos":
+            return 200, {}, [{"id": i, "name": f"repo{i}", "full_name": f"me/repo{i}"} for i in range(repos)]
+        return 404, {}, {"message": "Not Found"}
+    return handler
+
+
+def x_api():
+    def handler(method, path, query, headers, body):
+        if path.startswith("/2/users/by/username/"):
+            username = path.rsplit("/", 1)[1]
+            return 200, {}, {"data": {"id": "42", "username": username, "name": username}}
+        if path.startswith("/2/users/"):
+            user_id = path.rsplit("/", 1)[1]
+            return 200, {}, {"data": {"id": user_id, "username": f"user{user_id}", "name": f"User {user_id}"}}
+        return 404, {}, {"title": "Not Found"}
+    return handler
+
+
+def linkedin_api():
+    def handler(method, path, query, headers, body):
+        if path == "/v2/me":
+            return 200, {}, {"id": "li-1", "firstName": {"localized": {"en_US": "Fake"}}}
+        return 404, {}, {"message": "Not Found"}
+    return handler
@@ -0,0 +1,86 @@
+# Local stub HTTP server used by the benchmarks to stand in for platform APIs.
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+
+class StubServer:
+    """Threaded HTTP/1.1 server that answers every request through a handler callable.
+
+    handler(method, path, query, headers, body) -> (status, response_headers, payload)
+    payload may be bytes, str or any JSON-serialisable object.
+    """
+
+    def __init__(self, handler, host="127.0.0.1", port=0, latency=0.0):
+        self.handler = handler
+        self.latency = latency # Simulated server-side latency in seconds
+        self.connections_opened = 0
+        self.requests_served = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class _RequestHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" # Required for keep-alive
+            disable_nagle_algorithm = True # Avoid delayed-ACK stalls between header and body writes
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections_opened += 1
+
+            def log_message(self, format, *args):
+                pass
+
+            def _dispatch(self):
+                split = urlsplit(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                if stub.latency:
+                    threading.Event().wait(stub.latency)
+                status, headers, payload = stub.handler(self.command, split.path, parse_qs(split.query), self.headers, body)
+                headers = dict(headers or {})
+                if isinstance(payload, (bytes, bytearray)):
+                    data = bytes(payload)
+                elif isinstance(payload, str):
+                    data = payload.encode("utf-8")
+                elif payload is None:
+                    data = b""
+                else:
+                    data = json.dumps(payload).encode("utf-8")
+                    headers.setdefault("Content-Type", "application/json")
+                if data and "gzip" in (self.headers.get("Accept-Encoding") or ""):
+                    data = gzip.compress(data, compresslevel=1)
+                    headers["Content-Encoding"] = "gzip"
+                with stub._lock:
+                    stub.requests_served += 1
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(data)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = do_HEAD = _dispatch
+
+        self.server = ThreadingHTTPServer((host, port), _RequestHandler)
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
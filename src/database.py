@@ -1,6 +1,200 @@
 # This is /home/ubuntu/copri_app/src/database.py
+import collections
+import contextlib
+import os
+import threading
+import time
+
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import JSON, event
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.engine import make_url
 
 # Initialize SQLAlchemy without an app instance initially
 db = SQLAlchemy()
 
+# JSON column type for every backend: JSONB on PostgreSQL (GIN-indexable), native JSON on MySQL, JSON-in-TEXT on SQLite.
+PortableJSON = JSON().with_variant(JSONB(), "postgresql")
+
+# Server backends (PostgreSQL/MySQL) share one QueuePool per process; see server_engine_options().
+DB_POOL_SIZE = int(os.getenv("COPRI_DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("COPRI_DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(os.getenv("COPRI_DB_POOL_TIMEOUT", "30"))   # Seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("COPRI_DB_POOL_RECYCLE", "1800")) # Below MySQL's wait_timeout and typical proxy idle limits
+
+SQLITE_BUSY_TIMEOUT = float(os.getenv("COPRI_SQLITE_BUSY_TIMEOUT", "30")) # Seconds a writer waits for the lock before "database is locked"
+SQLITE_POOL_SIZE = int(os.getenv("COPRI_SQLITE_POOL_SIZE", "16"))         # WAL readers run in parallel, so allow plenty
+# Applied to every new SQLite connection. WAL lets readers run alongside the (single) writer;
+# synchronous=NORMAL is durable across application crashes in WAL mode and only fsyncs at checkpoints.
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("COPRI_SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("COPRI_SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": int(SQLITE_BUSY_TIMEOUT * 1000),
+    "cache_size": -int(os.getenv("COPRI_SQLITE_CACHE_KB", "65536")),   # Negative = KiB, per connection
+    "mmap_size": int(os.getenv("COPRI_SQLITE_MMAP_BYTES", str(256 * 1024 * 1024))),
+    "temp_store": "MEMORY",
+    "wal_autocheckpoint": 1000, # Pages; keeps the -wal file from growing without bound under steady ingestion
+}
+WRITE_PREFIXES = ("INSERT", "UPDATE", "DELETE", "REPLACE", "CREATE", "DROP", "ALTER")
+
+class WriteGate:
+    """FIFO queue of SQLite connections waiting to write; at most one holds the gate.
+
+    SQLite allows one writer at a time, and its busy handler makes waiting writers poll and
+    back off, so under load they starve each other and hit "database is locked". The gate
+    queues writers in-process instead. A connection takes it on its first write statement and
+    gives it back when its transaction ends, so reads never wait for it.
+    """
+
+    def __init__(self, timeout=SQLITE_BUSY_TIMEOUT):
+        self.timeout = timeout
+        self._condition = threading.Condition()
+        self._owner = None
+        self._queue = collections.deque()
+        self.acquired = 0
+        self.waited = 0
+        self.max_wait = 0.0
+
+    def acquire(self, token):
+        """Waits for the gate on behalf of token (one per pooled connection). On timeout, returns False and leaves the wait to SQLite's busy handler."""
+        with self._condition:
+            if self._owner == token:
+                return True
+            if self._owner is None and not self._queue:
+                self._owner = token
+                self.acquired += 1
+                return True
+            self._queue.append(token)
+            started = time.monotonic()
+            granted = self._condition.wait_for(lambda: self._owner is None and self._queue[0] == token, self.timeout)
+            self._queue.remove(token)
+            if granted:
+                self._owner = token
+                self.acquired += 1
+                self.waited += 1
+                self.max_wait = max(self.max_wait, time.monotonic() - started)
+            self._condition.notify_all()
+            return granted
+
+    def release(self, token):
+        with self._condition:
+            if self._owner == token:
+                self._owner = None
+                self._condition.notify_all()
+
+def sqlite_engine_options():
+    """SQLALCHEMY_ENGINE_OPTIONS for a file-based SQLite database shared by request and sync threads."""
+    return {
+        "connect_args": {"timeout": SQLITE_BUSY_TIMEOUT, "check_same_thread": False},
+        "pool_size": SQLITE_POOL_SIZE,
+        "max_overflow": SQLITE_POOL_SIZE,
+    }
+
+def configure_sqlite(engine, pragmas=None, write_gate=True):
+    """Applies SQLITE_PRAGMAS to every connection of engine and, optionally, serializes writers through a WriteGate.
+
+    Call before the engine hands out its first connection. Returns the WriteGate (or None).
+    """
+    pragmas = {**SQLITE_PRAGMAS, **(pragmas or {})}
+
+    @event.listens_for(engine, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    if not write_gate:
+        return None
+    gate = WriteGate()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _take_gate(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip()[:7].upper().startswith(WRITE_PREFIXES) and not conn.info.get("holds_write_gate"):
+            conn.info["holds_write_gate"] = gate.acquire(id(conn.info))
+
+    def _return_gate(info):
+        if info.pop("holds_write_gate", False):
+            gate.release(id(info))
+
+    # commit/rollback fire as the transaction ends; checkin also covers connections that are returned mid-transaction.
+    event.listen(engine, "commit", lambda conn: _return_gate(conn.info))
+    event.listen(engine, "rollback", lambda conn: _return_gate(conn.info))
+    event.listen(engine, "checkin", lambda dbapi_connection, connection_record: _return_gate(connection_record.info))
+    engine.pool.dispose() # Connections opened before this point would miss the pragmas
+    return gate
+
+def server_engine_options(uri):
+    """SQLALCHEMY_ENGINE_OPTIONS for PostgreSQL/MySQL: a sized QueuePool that checks and recycles connections."""
+    options = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True, # Replaces connections the server closed while they sat in the pool
+        "connect_args": {"connect_timeout": 10},
+    }
+    if make_url(uri).get_backend_name() in ("mysql", "mariadb"):
+        options["connect_args"]["charset"] = "utf8mb4"
+    return options
+
+def database_uri(default):
+    """The configured database URL (COPRI_DATABASE_URL), or default.
+
+    postgres:// and mysql:// shorthands are mapped to the drivers in requirements.txt.
+    """
+    uri = os.getenv("COPRI_DATABASE_URL") or default
+    if uri.startswith("postgres://"):
+        uri = "postgresql://" + uri[len("postgres://"):]
+    elif uri.startswith("mysql://"):
+        uri = "mysql+pymysql://" + uri[len("mysql://"):]
+    return uri
+
+def init_database(app):
+    """db.init_app(app) with the engine profile for the configured backend.
+
+    File-based SQLite gets WAL, tuned pragmas and the write gate; PostgreSQL and MySQL get a pooled engine.
+    """
+    uri = app.config.get("SQLALCHEMY_DATABASE_URI", "")
+    backend = make_url(uri).get_backend_name()
+    is_sqlite_file = backend == "sqlite" and ":memory:" not in uri and uri not in ("sqlite://", "sqlite:///")
+    if is_sqlite_file:
+        app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", sqlite_engine_options())
+    elif backend in ("postgresql", "mysql", "mariadb"):
+        app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", server_engine_options(uri))
+    db.init_app(app)
+    if is_sqlite_file:
+        with app.app_context():
+            app.extensions["copri_write_gate"] = configure_sqlite(db.engine)
+
+class QueryCounter:
+    """Records every SQL statement executed on an engine while active (use as a context manager)."""
+
+    def __init__(self, engine=None):
+        self.engine = engine
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        self.engine = self.engine or db.engine
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+        return False
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+@contextlib.contextmanager
+def assert_max_queries(limit, label="block", engine=None):
+    """Fails with the offending statements if the block runs more than limit queries (catches N+1 regressions)."""
+    with QueryCounter(engine) as counter:
+        yield counter
+    if counter.count > limit:
+        listing = "\n".join(f"  {index + 1}. {' '.join(statement.split())[:200]}" for index, statement in enumerate(counter.statements))
+        raise AssertionError(f"{label} ran {counter.count} queries, expected at most {limit}:\n{listing}")
@@ -2,15 +2,32 @@
 import requests
 import json
 import base64 # For encoding file content for GitHub API
+from concurrent.futures import ThreadPoolExecutor
+
+from src.integrations.http_transport import get_shared_transport
+from src.integrations.rate_limiter import credential_key
 
 GITHUB_API_BASE_URL = "https://api.github.com"
+GITHUB_MAX_PER_PAGE = 100 # Largest page size the REST API allows
+BLOB_UPLOAD_WORKERS = 8 # Concurrent blob uploads in commit_files()
+
+class GitHubPaginationError(Exception):
+    """A page of a paginated listing failed, so the items already yielded are not the full set."""
+
+    def __init__(self, description, pages_fetched, items_fetched, cause):
+        super().__init__(f"Fetching {description} failed on page {pages_fetched + 1} after {items_fetched} item(s): {cause}")
+        self.pages_fetched = pages_fetched
+        self.items_fetched = items_fetched
 
 class GitHubIntegration:
-    def __init__(self, token=None):
+    def __init__(self, token=None, transport=None, base_url=GITHUB_API_BASE_URL):
         """Initializes the GitHub client.
         token: Personal Access Token for authentication.
+        transport: Optional HttpTransport; defaults to the process-wide pooled transport.
         """
         self.token = token
+        self.http = (transport or get_shared_transport()).bind(rate_limit_key=credential_key("GitHub", token))
+        self.base_url = base_url
         self.headers = {
             "Accept": "application/vnd.github.v3+json",
             "X-GitHub-Api-Version": "2022-11-28" # Recommended by GitHub
@@ -23,9 +40,9 @@ class GitHubIntegration:
         if not self.token:
             print("[GitHubIntegration] Token not provided. Cannot fetch authenticated user info.")
             return None
-        url = f"{GITHUB_API_BASE_URL}/user"
+        url = f"{self.base_url}/user"
         try:
-            response = requests.get(url, headers=self.headers)
+            response = self.http.get(url, headers=self.headers)
             response.raise_for_status()
             print("[GitHubIntegration] Successfully fetched authenticated user info.")
             return response.json()
@@ -42,7 +59,7 @@ class GitHubIntegration:
             print("[GitHubIntegration] Token not provided. Cannot create repository.")
             return None
         
-        url = f"{GITHUB_API_BASE_URL}/user/repos"
+        url = f"{self.base_url}/user/repos"
         payload = {
             "name": repo_name,
             "description": description,
@@ -50,7 +67,7 @@ class GitHubIntegration:
             "auto_init": auto_init 
         }
         try:
-            response = requests.post(url, headers=self.headers, json=payload)
+            response = self.http.post(url, headers=self.headers, json=payload)
             response.raise_for_status()
             print(f"[GitHubIntegration] Successfully created repository: {response.json().get('html_url')}")
             return response.json()
@@ -65,9 +82,9 @@ class GitHubIntegration:
         if not self.token:
             print("[GitHubIntegration] Token not provided. Cannot get file SHA.")
             return None
-        url = f"{GITHUB_API_BASE_URL}/repos/{owner}/{repo}/contents/{file_path}?ref={branch}"
+        url = f"{self.base_url}/repos/{owner}/{repo}/contents/{file_path}?ref={branch}"
         try:
-            response = requests.get(url, headers=self.headers)
+            response = self.http.get(url, headers=self.headers, use_cache=True)
             if response.status_code == 404:
                 return None # File not found
             response.raise_for_status()
@@ -77,12 +94,14 @@ class GitHubIntegration:
             return None
 
     def upload_or_update_file(self, owner, repo, file_path, file_content_str, commit_message, branch="main"):
-        """Uploads a new file or updates an existing file in a repository."""
+        """Uploads a new file or updates an existing file in a repository.
+        Costs two requests and one commit per file; use commit_files() for several files.
+        """
         if not self.token:
             print("[GitHubIntegration] Token not provided. Cannot upload/update file.")
             return None
 
-        url = f"{GITHUB_API_BASE_URL}/repos/{owner}/{repo}/contents/{file_path}"
+        url = f"{self.base_url}/repos/{owner}/{repo}/contents/{file_path}"
         
         encoded_content = base64.b64encode(file_content_str.encode("utf-8")).decode("utf-8")
         
@@ -100,7 +119,7 @@ class GitHubIntegration:
             print(f"[GitHubIntegration] Creating new file: {file_path} in {owner}/{repo}")
 
         try:
-            response = requests.put(url, headers=self.headers, json=payload)
+            response = self.http.put(url, headers=self.headers, json=payload)
             response.raise_for_status()
             print(f"[GitHubIntegration] Successfully uploaded/updated file: {file_path}. Commit: {response.json()['commit']['sha']}")
             return response.json()
@@ -110,36 +129,126 @@ class GitHubIntegration:
                 print(f"Response status: {response.status_code}, Response content: {response.text}")
             return None
 
-    def get_user_repos(self, username=None):
-        """Fetches repositories for the authenticated user or a specified user."""
-        if username:
-            url = f"{GITHUB_API_BASE_URL}/users/{username}/repos"
-        else:
-            if not self.token: 
-                print("[GitHubIntegration] Token required to fetch authenticated user's repos.")
-                return []
-            url = f"{GITHUB_API_BASE_URL}/user/repos"
-        
-        params = {"type": "owner", "sort": "updated", "per_page": 10}
+    def _create_blob(self, owner, repo, content):
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        url = f"{self.base_url}/repos/{owner}/{repo}/git/blobs"
+        payload = {"content": base64.b64encode(content).decode("ascii"), "encoding": "base64"}
+        response = self.http.post(url, headers=self.headers, json=payload)
+        response.raise_for_status()
+        return response.json()["sha"]
+
+    def commit_files(self, owner, repo, files, commit_message, branch="main"):
+        """Commits several files in one atomic commit through the Git Data API.
+
+        files maps repository paths to new contents (str or bytes), or to None to delete the path.
+        The branch head lookup runs alongside the concurrent blob uploads, followed by one tree,
+        one commit and one fast-forward ref update: N + 4 requests and exactly one commit for N
+        files. Returns the new commit payload, or None if any step fails (including the branch
+        having moved in the meantime, in which case nothing is changed).
+        """
+        if not self.token:
+            print("[GitHubIntegration] Token not provided. Cannot commit files.")
+            return None
+        if not files:
+            print("[GitHubIntegration] No files given to commit.")
+            return None
+        repo_url = f"{self.base_url}/repos/{owner}/{repo}"
+        uploads = {path: content for path, content in files.items() if content is not None}
         try:
-            response = requests.get(url, headers=self.headers, params=params)
+            with ThreadPoolExecutor(max_workers=BLOB_UPLOAD_WORKERS, thread_name_prefix="github-blob") as executor:
+                head_future = executor.submit(self.http.get, f"{repo_url}/branches/{branch}", headers=self.headers)
+                blob_futures = {path: executor.submit(self._create_blob, owner, repo, content) for path, content in uploads.items()}
+                head = head_future.result()
+                head.raise_for_status()
+                blob_shas = {path: future.result() for path, future in blob_futures.items()}
+            head_commit = head.json()["commit"]
+            parent_sha = head_commit["sha"]
+            base_tree_sha = head_commit["commit"]["tree"]["sha"]
+
+            tree = [
+                {"path": path, "mode": "100644", "type": "blob", "sha": blob_shas.get(path)} # sha None deletes the path
+                for path in files
+            ]
+            response = self.http.post(f"{repo_url}/git/trees", headers=self.headers, json={"base_tree": base_tree_sha, "tree": tree})
             response.raise_for_status()
-            print(f"[GitHubIntegration] Fetched repositories for {	'authenticated user' if not username else username}.")
-            return response.json()
+            tree_sha = response.json()["sha"]
+
+            response = self.http.post(f"{repo_url}/git/commits", headers=self.headers, json={"message": commit_message, "tree": tree_sha, "parents": [parent_sha]})
+            response.raise_for_status()
+            new_commit = response.json()
+
+            # Fast-forward only: if someone pushed since we read the head, GitHub rejects this with 422.
+            response = self.http.patch(f"{repo_url}/git/refs/heads/{branch}", headers=self.headers, json={"sha": new_commit["sha"], "force": False})
+            response.raise_for_status()
+            print(f"[GitHubIntegration] Committed {len(files)} file(s) to {owner}/{repo}@{branch}. Commit: {new_commit['sha']}")
+            return new_commit
         except requests.exceptions.RequestException as e:
-            print(f"Error fetching GitHub repositories: {e}")
-            return []
+            print(f"Error committing {len(files)} file(s) to {owner}/{repo}@{branch}: {e}")
+            if getattr(e, "response", None) is not None:
+                print(f"Response status: {e.response.status_code}, Response content: {e.response.text}")
+            return None
 
-    def get_repo_issues(self, owner, repo, state="open"):
-        """Fetches issues for a specific repository."""
-        url = f"{GITHUB_API_BASE_URL}/repos/{owner}/{repo}/issues"
-        params = {"state": state, "per_page": 10}
+    def _fetch_page(self, url, params=None):
+        """Fetches one page and returns (items, next_page_url or None)."""
+        response = self.http.get(url, headers=self.headers, params=params, use_cache=True)
+        response.raise_for_status()
+        return response.json(), response.links.get("next", {}).get("url")
+
+    def _paginate(self, url, params, description, prefetch=False):
+        """Yields items across every page by following Link: rel="next".
+        Only the current page (plus the next one, when prefetch=True) is held in memory.
+        Raises GitHubPaginationError if any page fails; the items yielded so far are incomplete.
+        """
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="github-prefetch") if prefetch else None
+        pages = 0
+        items = 0
         try:
-            response = requests.get(url, headers=self.headers, params=params)
-            response.raise_for_status()
-            print(f"[GitHubIntegration] Fetched issues for {owner}/{repo}.")
-            return response.json()
+            page, next_url = self._fetch_page(url, params)
+            while True:
+                pages += 1
+                # Start downloading the next page while the caller consumes this one.
+                pending = executor.submit(self._fetch_page, next_url) if executor and next_url else None
+                items += len(page)
+                yield from page
+                if not next_url:
+                    break
+                page, next_url = pending.result() if pending else self._fetch_page(next_url)
+            print(f"[GitHubIntegration] Fetched {pages} page(s) of {description}.")
         except requests.exceptions.RequestException as e:
-            print(f"Error fetching issues for {owner}/{repo}: {e}")
-            return []
+            print(f"Error fetching {description} (page {pages + 1}): {e}")
+            raise GitHubPaginationError(description, pages, items, e) from e
+        finally:
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    def iter_user_repos(self, username=None, prefetch=False):
+        """Lazily yields every repository of the authenticated user or a specified user. Raises GitHubPaginationError if a page fails."""
+        if username:
+            url = f"{self.base_url}/users/{username}/repos"
+        else:
+            if not self.token:
+                print("[GitHubIntegration] Token required to fetch authenticated user's repos.")
+                return
+            url = f"{self.base_url}/user/repos"
+        params = {"type": "owner", "sort": "updated", "per_page": GITHUB_MAX_PER_PAGE}
+        yield from self._paginate(url, params, f"repositories for {'authenticated user' if not username else username}", prefetch)
 
+    def iter_repo_issues(self, owner, repo, state="open", prefetch=False):
+        """Lazily yields every issue of a repository. Raises GitHubPaginationError if a page fails."""
+        url = f"{self.base_url}/repos/{owner}/{repo}/issues"
+        params = {"state": state, "per_page": GITHUB_MAX_PER_PAGE}
+        yield from self._paginate(url, params, f"issues for {owner}/{repo}", prefetch)
+
+    def get_user_repos(self, username=None):
+        """Fetches all repositories for the authenticated user or a specified user.
+        Use iter_user_repos() to stream large result sets. Raises GitHubPaginationError rather
+        than returning a partial list.
+        """
+        return list(self.iter_user_repos(username))
+
+    def get_repo_issues(self, owner, repo, state="open"):
+        """Fetches all issues for a specific repository. Use iter_repo_issues() to stream them.
+        Raises GitHubPaginationError rather than returning a partial list.
+        """
+        return list(self.iter_repo_issues(owner, repo, state))
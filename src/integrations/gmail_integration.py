@@ -1,18 +1,56 @@
 # This is /home/ubuntu/copri_app/src/integrations/gmail_integration.py
 import requests
 import json
+import random
+import time
+import uuid
+from urllib.parse import urlencode, urlsplit
+
+from src.integrations.http_transport import get_shared_transport
+from src.integrations.rate_limiter import BACKOFF_BASE_SECONDS, BACKOFF_MAX_SECONDS, credential_key
 
 # Placeholder for Google API Client Library usage
 # from google.oauth2.credentials import Credentials
 # from googleapiclient.discovery import build
 
+GMAIL_API_BASE_URL = "https://gmail.googleapis.com/gmail/v1"
+GMAIL_BATCH_MAX_REQUESTS = 100 # Hard limit of calls per multipart batch request
+GMAIL_LIST_PAGE_SIZE = 500 # Maximum page size for users.messages.list
+# Only what the Email model stores: no bodies, only the headers we read.
+METADATA_HEADERS = ("Subject", "From", "To", "Cc", "Date")
+METADATA_FIELDS = "id,threadId,labelIds,snippet,internalDate,payload/headers"
+RETRYABLE_BATCH_STATUSES = {429, 500, 502, 503, 504}
+HISTORY_TYPES = ("messageAdded", "messageDeleted", "labelAdded", "labelRemoved")
+
+class GmailHistoryExpired(Exception):
+    """The stored startHistoryId is too old (HTTP 404); a full resync is required."""
+
+class GmailFetchIncomplete(Exception):
+    """A listing or hydration did not cover every message; raised after everything that did succeed was yielded.
+    message_ids holds the IDs that could not be fetched (empty when the listing itself failed).
+    """
+
+    def __init__(self, message, message_ids=()):
+        super().__init__(message)
+        self.message_ids = list(message_ids)
+
 class GmailIntegration:
-    def __init__(self, credentials_info):
+    def __init__(self, credentials_info, transport=None, base_url=GMAIL_API_BASE_URL):
         """Initializes the Gmail client.
         credentials_info might be a path to a credentials file or a dictionary with token info.
+        When it carries an OAuth access token ({"token": ...}), calls go straight to the Gmail
+        REST API through the pooled transport.
         """
         self.credentials_info = credentials_info
         self.service = None
+        self.base_url = base_url
+        # The batch endpoint lives at /batch/<api path>, e.g. /batch/gmail/v1
+        split = urlsplit(base_url)
+        self.api_path = split.path
+        self.batch_url = f"{split.scheme}://{split.netloc}/batch{split.path}"
+        self.access_token = credentials_info.get("token") if isinstance(credentials_info, dict) else None
+        self.http = (transport or get_shared_transport()).bind(rate_limit_key=credential_key("Gmail", self.access_token))
+        self.headers = {"Authorization": f"Bearer {self.access_token}"} if self.access_token else {}
         # self._build_service()
         print("[GmailIntegration] Initialized. Service not yet built.")
 
@@ -29,45 +67,182 @@ class GmailIntegration:
 
     def list_messages(self, user_id="me", query="", max_results=10):
         """Lists messages in the user_s mailbox."""
-        if not self.service:
-            print("[GmailIntegration] Gmail service not available. Cannot list messages.")
+        if not self.access_token:
+            print("[GmailIntegration] Gmail credentials not available. Cannot list messages.")
             return []
+        url = f"{self.base_url}/users/{user_id}/messages"
+        params = {"q": query, "maxResults": max_results}
         try:
-            # response = self.service.users().messages().list(userId=user_id, q=query, maxResults=max_results).execute()
-            # messages = response.get("messages", [])
-            # print(f"[GmailIntegration] Fetched {len(messages)} message(s) headers.")
-            # return messages
-            print(f"[GmailIntegration] Simulating fetching messages for query: 	{query}")
-            return [{"id": "sim_msg_1", "threadId": "sim_thread_1"}, {"id": "sim_msg_2", "threadId": "sim_thread_2"}]
-        except Exception as e:
+            response = self.http.get(url, headers=self.headers, params=params)
+            response.raise_for_status()
+            messages = response.json().get("messages", [])
+            print(f"[GmailIntegration] Fetched {len(messages)} message(s) headers.")
+            return messages
+        except requests.exceptions.RequestException as e:
             print(f"Error listing Gmail messages: {e}")
             return []
 
     def get_message_details(self, message_id, user_id="me"):
         """Gets the full details of a specific message."""
-        if not self.service:
-            print("[GmailIntegration] Gmail service not available. Cannot get message details.")
+        if not self.access_token:
+            print("[GmailIntegration] Gmail credentials not available. Cannot get message details.")
             return None
+        url = f"{self.base_url}/users/{user_id}/messages/{message_id}"
         try:
-            # message = self.service.users().messages().get(userId=user_id, id=message_id, format="full").execute()
-            # print(f"[GmailIntegration] Fetched details for message: {message_id}")
-            # return message
-            print(f"[GmailIntegration] Simulating fetching details for message: {message_id}")
-            return {
-                "id": message_id,
-                "snippet": "This is a simulated email snippet.",
-                "payload": {
-                    "headers": [
-                        {"name": "Subject", "value": "Simulated Subject"},
-                        {"name": "From", "value": "sender@example.com"},
-                        {"name": "To", "value": "recipient@example.com"}
-                    ]
-                }
-            }
-        except Exception as e:
+            response = self.http.get(url, headers=self.headers, params={"format": "full"})
+            response.raise_for_status()
+            print(f"[GmailIntegration] Fetched details for message: {message_id}")
+            return response.json()
+        except requests.exceptions.RequestException as e:
             print(f"Error getting Gmail message details for {message_id}: {e}")
             return None
 
+    def iter_message_ids(self, user_id="me", query="", page_size=GMAIL_LIST_PAGE_SIZE):
+        """Yields {"id", "threadId"} for every message matching query, following nextPageToken.
+        Raises GmailFetchIncomplete if a page fails, so callers never mistake a cut-off listing for the whole mailbox.
+        """
+        if not self.access_token:
+            print("[GmailIntegration] Gmail credentials not available. Cannot list messages.")
+            return
+        url = f"{self.base_url}/users/{user_id}/messages"
+        params = {"q": query, "maxResults": page_size, "fields": "messages(id,threadId),nextPageToken"}
+        listed = 0
+        while True:
+            try:
+                response = self.http.get(url, headers=self.headers, params=params)
+                response.raise_for_status()
+            except requests.exceptions.RequestException as e:
+                print(f"Error listing Gmail messages: {e}")
+                raise GmailFetchIncomplete(f"Listing Gmail messages failed after {listed} message(s): {e}") from e
+            page = response.json()
+            messages = page.get("messages", [])
+            listed += len(messages)
+            yield from messages
+            if not page.get("nextPageToken"):
+                return
+            params = {**params, "pageToken": page["nextPageToken"]}
+
+    def get_profile(self, user_id="me"):
+        """Fetches the mailbox profile, including the current historyId."""
+        url = f"{self.base_url}/users/{user_id}/profile"
+        response = self.http.get(url, headers=self.headers)
+        response.raise_for_status()
+        return response.json()
+
+    def list_history(self, start_history_id, user_id="me"):
+        """Returns (history records, latest historyId) for every change after start_history_id.
+        Raises GmailHistoryExpired when Gmail no longer has history that far back.
+        """
+        url = f"{self.base_url}/users/{user_id}/history"
+        params = {"startHistoryId": start_history_id, "historyTypes": list(HISTORY_TYPES), "maxResults": GMAIL_LIST_PAGE_SIZE}
+        records = []
+        while True:
+            response = self.http.get(url, headers=self.headers, params=params)
+            if response.status_code == 404:
+                raise GmailHistoryExpired(f"History {start_history_id} is no longer available.")
+            response.raise_for_status()
+            page = response.json()
+            records.extend(page.get("history", []))
+            if not page.get("nextPageToken"):
+                return records, page.get("historyId", start_history_id)
+            params = {**params, "pageToken": page["nextPageToken"]}
+
+    def batch_get_message_metadata(self, message_ids, user_id="me", batch_size=GMAIL_BATCH_MAX_REQUESTS, max_attempts=3):
+        """Yields metadata-only message resources, fetching up to batch_size messages per HTTP call.
+
+        Uses the multipart batch endpoint with format=metadata and a field mask, so each message
+        costs a fraction of a request and no bodies are downloaded. Items throttled inside a
+        batch (429/5xx) are retried in a later batch after an exponential backoff, up to
+        max_attempts times. Messages that no longer exist (404) are skipped. Anything else that
+        could not be fetched is reported by raising GmailFetchIncomplete at the end.
+        """
+        if not self.access_token:
+            print("[GmailIntegration] Gmail credentials not available. Cannot fetch messages.")
+            return
+        query = urlencode([("format", "metadata"), *[("metadataHeaders", name) for name in METADATA_HEADERS], ("fields", METADATA_FIELDS)])
+        pending = list(message_ids)
+        failed = []
+        for attempt in range(max_attempts):
+            if attempt:
+                # Full-jitter backoff, so throttled items are not re-sent straight into the same limit.
+                time.sleep(random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** (attempt - 1)))))
+            retry = []
+            for start in range(0, len(pending), batch_size):
+                chunk = pending[start:start + batch_size]
+                paths = [f"{self.api_path}/users/{user_id}/messages/{message_id}?{query}" for message_id in chunk]
+                try:
+                    results = self._execute_batch(paths)
+                except requests.exceptions.RequestException as e:
+                    print(f"Error executing Gmail batch of {len(chunk)} message(s): {e}")
+                    retry.extend(chunk)
+                    continue
+                for message_id, (status, payload) in zip(chunk, results):
+                    if status == 200:
+                        yield payload
+                    elif status in RETRYABLE_BATCH_STATUSES or status is None:
+                        retry.append(message_id)
+                    elif status == 404:
+                        print(f"[GmailIntegration] Skipping message {message_id}: deleted since it was listed.")
+                    else:
+                        print(f"[GmailIntegration] Could not fetch message {message_id}: batch item returned {status}.")
+                        failed.append(message_id)
+            pending = retry
+            if not pending:
+                break
+        if pending:
+            print(f"[GmailIntegration] Gave up on {len(pending)} message(s) after {max_attempts} batch attempts.")
+        failed.extend(pending)
+        if failed:
+            raise GmailFetchIncomplete(f"{len(failed)} message(s) could not be fetched.", failed)
+
+    def _execute_batch(self, paths):
+        """Sends GET paths as one multipart/mixed batch. Returns [(status, json payload)] in path order."""
+        boundary = f"batch_{uuid.uuid4().hex}"
+        parts = []
+        for index, path in enumerate(paths):
+            parts.append(
+                f"--{boundary}\r\n"
+                "Content-Type: application/http\r\n"
+                f"Content-ID: <item{index}>\r\n\r\n"
+                f"GET {path}\r\n\r\n"
+            )
+        body = "".join(parts) + f"--{boundary}--\r\n"
+        headers = {**self.headers, "Content-Type": f"multipart/mixed; boundary={boundary}"}
+        response = self.http.post(self.batch_url, headers=headers, data=body.encode("utf-8"))
+        response.raise_for_status()
+        results = [(None, None)] * len(paths)
+        for content_id, status, payload in _parse_batch_response(response):
+            if content_id is not None and 0 <= content_id < len(paths):
+                results[content_id] = (status, payload)
+        return results
+
+def _parse_batch_response(response):
+    """Yields (item index, status, parsed JSON body) from a multipart/mixed batch response."""
+    content_type = response.headers.get("Content-Type", "")
+    boundary = next((param.split("=", 1)[1].strip('"') for param in content_type.split(";") if param.strip().startswith("boundary=")), None)
+    if not boundary:
+        raise requests.exceptions.RequestException(f"Batch response without multipart boundary: {content_type}")
+    for part in response.content.split(f"--{boundary}".encode("utf-8"))[1:]:
+        if part.startswith(b"--"):
+            break # Closing delimiter
+        part_headers, _, http_message = part.strip(b"\r\n").partition(b"\r\n\r\n")
+        content_id = None
+        for line in part_headers.split(b"\r\n"):
+            name, _, value = line.partition(b":")
+            if name.strip().lower() == b"content-id":
+                # <response-itemN>
+                digits = value.strip().strip(b"<>").rsplit(b"item", 1)[-1]
+                content_id = int(digits) if digits.isdigit() else None
+        status_line, _, rest = http_message.partition(b"\r\n")
+        _, _, body = rest.partition(b"\r\n\r\n")
+        status_fields = status_line.split()
+        status = int(status_fields[1]) if len(status_fields) > 1 and status_fields[1].isdigit() else None
+        try:
+            payload = json.loads(body) if body.strip() else None
+        except ValueError:
+            payload = None
+        yield content_id, status, payload
+
 # Example usage (for testing)
 # if __name__ == "__main__":
 #     # This would require OAuth setup and a valid credentials file/token
@@ -3,17 +3,45 @@ import requests
 import json
 import datetime
 
+from src.integrations.http_transport import get_shared_transport
+from src.integrations.rate_limiter import credential_key
+
 # Placeholder for Google API Client Library usage
 # from google.oauth2.credentials import Credentials
 # from googleapiclient.discovery import build
 
+GOOGLE_CALENDAR_API_BASE_URL = "https://www.googleapis.com/calendar/v3"
+CALENDAR_PAGE_SIZE = 2500 # Maximum maxResults for events.list
+
+class CalendarSyncTokenExpired(Exception):
+    """Google answered 410 Gone: the stored syncToken is invalid and a full sync is required."""
+
+def parse_calendar_time(value):
+    """Parses an event start/end ({"dateTime": ...} or {"date": ...}) into (naive UTC datetime, is_all_day)."""
+    if not value:
+        return None, None
+    if value.get("dateTime"):
+        parsed = datetime.datetime.fromisoformat(value["dateTime"].replace("Z", "+00:00"))
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        return parsed, False
+    if value.get("date"):
+        return datetime.datetime.fromisoformat(value["date"]), True
+    return None, None
+
 class GoogleCalendarIntegration:
-    def __init__(self, credentials_info):
+    def __init__(self, credentials_info, transport=None, base_url=GOOGLE_CALENDAR_API_BASE_URL):
         """Initializes the Google Calendar client.
         credentials_info might be a path to a credentials file or a dictionary with token info.
+        When it carries an OAuth access token ({"token": ...}), reads go straight to the Calendar
+        REST API through the pooled transport.
         """
         self.credentials_info = credentials_info
         self.service = None
+        self.base_url = base_url
+        self.access_token = credentials_info.get("token") if isinstance(credentials_info, dict) else None
+        self.http = (transport or get_shared_transport()).bind(rate_limit_key=credential_key("GoogleCalendar", self.access_token))
+        self.headers = {"Authorization": f"Bearer {self.access_token}"} if self.access_token else {}
         # self._build_service()
         print("[GoogleCalendarIntegration] Initialized. Service not yet built.")
 
@@ -29,27 +57,65 @@ class GoogleCalendarIntegration:
 
     def list_upcoming_events(self, calendar_id="primary", max_results=10):
         """Lists upcoming events from the specified calendar."""
-        if not self.service:
-            print("[GoogleCalendarIntegration] Calendar service not available. Cannot list events.")
+        if not self.access_token:
+            print("[GoogleCalendarIntegration] Calendar credentials not available. Cannot list events.")
             return []
+        url = f"{self.base_url}/calendars/{calendar_id}/events"
+        now = datetime.datetime.utcnow().isoformat() + "Z"  # "Z" indicates UTC time
+        params = {"timeMin": now, "maxResults": max_results, "singleEvents": "true", "orderBy": "startTime"}
         try:
-            # now = datetime.datetime.utcnow().isoformat() + "Z"  # "Z" indicates UTC time
-            # events_result = self.service.events().list(
-            #     calendarId=calendar_id, timeMin=now,
-            #     maxResults=max_results, singleEvents=True,
-            #     orderBy="startTime").execute()
-            # events = events_result.get("items", [])
-            # print(f"[GoogleCalendarIntegration] Fetched {len(events)} upcoming event(s).")
-            # return events
-            print(f"[GoogleCalendarIntegration] Simulating fetching upcoming events for calendar: {calendar_id}")
-            return [
-                {"summary": "Simulated Meeting 1", "start": {"dateTime": "2025-05-12T09:00:00Z"}, "end": {"dateTime": "2025-05-12T10:00:00Z"}},
-                {"summary": "Simulated Appointment", "start": {"dateTime": "2025-05-13T14:00:00Z"}, "end": {"dateTime": "2025-05-13T15:00:00Z"}}
-            ]
-        except Exception as e:
+            response = self.http.get(url, headers=self.headers, params=params)
+            response.raise_for_status()
+            events = response.json().get("items", [])
+            print(f"[GoogleCalendarIntegration] Fetched {len(events)} upcoming event(s).")
+            return events
+        except requests.exceptions.RequestException as e:
             print(f"Error listing Google Calendar events: {e}")
             return []
 
+    def list_changed_events(self, calendar_id="primary", sync_token=None):
+        """Returns (events, next_sync_token).
+
+        Without a sync_token this is a full listing of the calendar (recurring events as their
+        master entries, deleted events included); with one, only events changed since that
+        token are returned. Raises CalendarSyncTokenExpired on 410 Gone.
+        """
+        url = f"{self.base_url}/calendars/{calendar_id}/events"
+        params = {"maxResults": CALENDAR_PAGE_SIZE, "showDeleted": "true"}
+        if sync_token:
+            params["syncToken"] = sync_token
+        events = []
+        while True:
+            response = self.http.get(url, headers=self.headers, params=params)
+            if response.status_code == 410:
+                raise CalendarSyncTokenExpired(f"Sync token for calendar {calendar_id} expired.")
+            response.raise_for_status()
+            page = response.json()
+            events.extend(page.get("items", []))
+            if not page.get("nextPageToken"):
+                return events, page.get("nextSyncToken")
+            params = {**params, "pageToken": page["nextPageToken"]}
+
+    def list_event_instances(self, calendar_id, time_min, time_max):
+        """Lists events between time_min and time_max with recurrences expanded server-side."""
+        url = f"{self.base_url}/calendars/{calendar_id}/events"
+        params = {
+            "timeMin": time_min.isoformat() + "Z",
+            "timeMax": time_max.isoformat() + "Z",
+            "singleEvents": "true",
+            "orderBy": "startTime",
+            "maxResults": CALENDAR_PAGE_SIZE,
+        }
+        events = []
+        while True:
+            response = self.http.get(url, headers=self.headers, params=params)
+            response.raise_for_status()
+            page = response.json()
+            events.extend(page.get("items", []))
+            if not page.get("nextPageToken"):
+                return events
+            params = {**params, "pageToken": page["nextPageToken"]}
+
     def create_event(self, calendar_id="primary", summary=None, start_time=None, end_time=None, description=None, location=None, attendees=None):
         """Creates a new event on the specified calendar."""
         if not self.service:
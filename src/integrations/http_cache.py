@@ -0,0 +1,239 @@
+# This is /home/ubuntu/copri_app/src/integrations/http_cache.py
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+DEFAULT_MAX_ENTRIES = int(os.getenv("COPRI_HTTP_CACHE_MAX_ENTRIES", "512"))
+DEFAULT_MAX_BYTES = int(os.getenv("COPRI_HTTP_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+# Set COPRI_HTTP_CACHE_DISK=1 to also keep validated responses on disk across restarts.
+DISK_CACHE_ENABLED = os.getenv("COPRI_HTTP_CACHE_DISK", "0") == "1"
+DEFAULT_DISK_MAX_ENTRIES = int(os.getenv("COPRI_HTTP_CACHE_DISK_MAX_ENTRIES", "4096"))
+DEFAULT_DISK_MAX_BYTES = int(os.getenv("COPRI_HTTP_CACHE_DISK_MAX_BYTES", str(256 * 1024 * 1024)))
+STALE_TMP_SECONDS = 3600
+DEFAULT_DISK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "instance", "http_cache")
+
+# Headers that describe the wire encoding rather than the (already decoded) body.
+UNCACHED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive", "date"}
+
+class ResponseCache:
+    """ETag / Last-Modified cache for GET responses.
+
+    Entries live in a bounded in-memory LRU, optionally backed by one JSON file per entry on
+    disk. The disk tier is an LRU too, bounded separately; its order is the files' mtimes, so
+    it survives restarts. The transport sends If-None-Match / If-Modified-Since for cached
+    URLs and replays the stored body when the server answers 304 Not Modified.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES, disk_path=None,
+                 disk_max_entries=DEFAULT_DISK_MAX_ENTRIES, disk_max_bytes=DEFAULT_DISK_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_path = disk_path
+        self.disk_max_entries = disk_max_entries
+        self.disk_max_bytes = disk_max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._disk_entries = OrderedDict() # key -> file size, least recently used first
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self.disk_evictions = 0
+        if self.disk_path:
+            os.makedirs(self.disk_path, exist_ok=True)
+            self._load_disk_index()
+        self.hits = 0        # 304 answered from cache
+        self.misses = 0      # No validator stored, or the server sent a fresh body
+        self.disk_hits = 0   # Entries recovered from the disk tier
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(url, params=None, headers=None):
+        """Cache key covering the full URL, query and the credential the request was made with."""
+        auth = (headers or {}).get("Authorization", "")
+        material = json.dumps([url, sorted((params or {}).items()), hashlib.sha256(auth.encode("utf-8")).hexdigest()], default=str)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                if key in self._disk_entries:
+                    self._disk_entries.move_to_end(key)
+                return entry
+        entry = self._read_disk(key)
+        if entry is not None:
+            with self._lock:
+                self.disk_hits += 1
+            self._put_memory(key, entry)
+        return entry
+
+    def store(self, key, response):
+        """Stores a 200 response if it carries a validator. Returns True when stored."""
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if response.status_code != 200 or not (etag or last_modified):
+            return False
+        entry = {
+            "etag": etag,
+            "last_modified": last_modified,
+            "headers": {name: value for name, value in response.headers.items() if name.lower() not in UNCACHED_HEADERS},
+            "body": response.content,
+            "encoding": response.encoding,
+        }
+        self._put_memory(key, entry)
+        self._write_disk(key, entry)
+        return True
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def build_response(self, entry, not_modified):
+        """Turns a cached entry into a 200 Response, reusing the 304's request/URL metadata."""
+        response = requests.models.Response()
+        response.status_code = 200
+        response._content = entry["body"]
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response.headers.update({name: value for name, value in not_modified.headers.items() if name.lower() not in UNCACHED_HEADERS})
+        response.encoding = entry.get("encoding")
+        response.url = not_modified.url
+        response.request = not_modified.request
+        response.elapsed = not_modified.elapsed
+        response.reason = "OK (cached)"
+        return response
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "disk_entries": len(self._disk_entries),
+                "disk_bytes": self._disk_bytes,
+                "disk_evictions": self.disk_evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _put_memory(self, key, entry):
+        size = len(entry["body"])
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous["body"])
+            self._entries[key] = entry
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted["body"])
+                self.evictions += 1
+
+    def _disk_file(self, key):
+        return os.path.join(self.disk_path, f"{key}.json")
+
+    def _load_disk_index(self):
+        """Rebuilds the disk LRU from the files already there, oldest mtime first, and trims it to the limits."""
+        found = []
+        for name in os.listdir(self.disk_path):
+            path = os.path.join(self.disk_path, name)
+            try:
+                if name.endswith(".tmp"):
+                    if time.time() - os.stat(path).st_mtime > STALE_TMP_SECONDS:
+                        os.remove(path) # Left behind by a crash mid-write (recent ones may belong to another worker)
+                elif name.endswith(".json"):
+                    info = os.stat(path)
+                    found.append((info.st_mtime, name[:-len(".json")], info.st_size))
+            except OSError:
+                continue
+        with self._lock:
+            for _, key, size in sorted(found):
+                self._disk_entries[key] = size
+                self._disk_bytes += size
+            self._evict_disk()
+
+    def _evict_disk(self):
+        """Drops least recently used files until the disk tier is within its limits. Caller holds the lock."""
+        while self._disk_entries and (len(self._disk_entries) > self.disk_max_entries or self._disk_bytes > self.disk_max_bytes):
+            key, size = self._disk_entries.popitem(last=False)
+            self._disk_bytes -= size
+            self.disk_evictions += 1
+            try:
+                os.remove(self._disk_file(key))
+            except OSError:
+                pass
+
+    def _read_disk(self, key):
+        if not self.disk_path:
+            return None
+        path = self._disk_file(key)
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+            entry["body"] = base64.b64decode(entry["body"])
+        except (OSError, ValueError, KeyError):
+            return None
+        try:
+            os.utime(path) # Keeps the LRU order across restarts
+        except OSError:
+            pass
+        with self._lock:
+            if key in self._disk_entries:
+                self._disk_entries.move_to_end(key)
+        return entry
+
+    def _write_disk(self, key, entry):
+        if not self.disk_path:
+            return
+        path = self._disk_file(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({**entry, "body": base64.b64encode(entry["body"]).decode("ascii")}, f)
+            os.replace(tmp_path, path) # Atomic, so readers never see a half-written entry
+            size = os.path.getsize(path)
+        except OSError as e:
+            print(f"[ResponseCache] Could not write disk cache entry: {e}")
+            return
+        with self._lock:
+            self._disk_bytes += size - self._disk_entries.pop(key, 0)
+            self._disk_entries[key] = size
+            self._evict_disk()
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+def get_shared_cache():
+    global _shared_cache
+    if _shared_cache is None:
+        with _shared_cache_lock:
+            if _shared_cache is None:
+                _shared_cache = ResponseCache(disk_path=DEFAULT_DISK_PATH if DISK_CACHE_ENABLED else None)
+    return _shared_cache
@@ -0,0 +1,153 @@
+# This is /home/ubuntu/copri_app/src/integrations/http_transport.py
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.integrations.http_cache import get_shared_cache
+from src.integrations.rate_limiter import get_shared_scheduler
+
+# Pool sizing and timeouts can be tuned per deployment through the environment.
+DEFAULT_POOL_CONNECTIONS = int(os.getenv("COPRI_HTTP_POOL_CONNECTIONS", "10")) # Number of per-host pools kept alive
+DEFAULT_POOL_MAXSIZE = int(os.getenv("COPRI_HTTP_POOL_MAXSIZE", "20")) # Keep-alive sockets per host
+DEFAULT_CONNECT_TIMEOUT = float(os.getenv("COPRI_HTTP_CONNECT_TIMEOUT", "5"))
+DEFAULT_READ_TIMEOUT = float(os.getenv("COPRI_HTTP_READ_TIMEOUT", "30"))
+DEFAULT_MAX_THROTTLE_WAIT = float(os.getenv("COPRI_HTTP_MAX_THROTTLE_WAIT", "300")) # Give up on a throttled call after this long
+
+
+class HttpTransport:
+    """Pooled, keep-alive HTTP transport shared by the platform integrations.
+
+    Wraps a single requests.Session so every call to the same host reuses an
+    already-open TCP/TLS connection instead of paying a new handshake.
+    """
+
+    def __init__(self, pool_connections=None, pool_maxsize=None, connect_timeout=None, read_timeout=None, max_retries=0, rate_limiter=None, max_throttle_wait=None, response_cache=None):
+        self.pool_connections = pool_connections or DEFAULT_POOL_CONNECTIONS
+        self.pool_maxsize = pool_maxsize or DEFAULT_POOL_MAXSIZE
+        self.timeout = (
+            connect_timeout if connect_timeout is not None else DEFAULT_CONNECT_TIMEOUT,
+            read_timeout if read_timeout is not None else DEFAULT_READ_TIMEOUT,
+        )
+        self.rate_limiter = rate_limiter or get_shared_scheduler()
+        self.response_cache = response_cache or get_shared_cache()
+        self.max_throttle_wait = max_throttle_wait if max_throttle_wait is not None else DEFAULT_MAX_THROTTLE_WAIT
+        self.session = requests.Session()
+        # urllib3 keeps one connection pool per host (up to pool_connections hosts),
+        # each holding up to pool_maxsize keep-alive sockets.
+        adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize, max_retries=max_retries)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Accept-Encoding": "gzip, deflate", # Bodies are decompressed transparently by urllib3
+            "Connection": "keep-alive",
+            "User-Agent": "CoPri/0.1",
+        })
+
+    def request(self, method, url, rate_limit_key=None, use_cache=False, **kwargs):
+        """Sends a request through the pooled session, applying the default timeout.
+
+        With a rate_limit_key (see rate_limiter.credential_key) the call waits for a token from
+        that key's bucket, and throttled responses (429, or 403 with no quota left) are queued
+        and retried after the server-advertised delay instead of being returned, for up to
+        max_throttle_wait seconds.
+        With use_cache=True, GET requests are revalidated against response_cache using
+        If-None-Match / If-Modified-Since, and a 304 is answered with the cached body.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        if not use_cache or method.upper() != "GET":
+            return self._send(method, url, rate_limit_key, kwargs)
+
+        cache = self.response_cache
+        key = cache.make_key(url, kwargs.get("params"), kwargs.get("headers"))
+        entry = cache.get(key)
+        if entry is not None:
+            kwargs["headers"] = {**(kwargs.get("headers") or {}), **cache.conditional_headers(entry)}
+        response = self._send(method, url, rate_limit_key, kwargs)
+        if entry is not None and response.status_code == 304:
+            cache.record(hit=True)
+            return cache.build_response(entry, response)
+        cache.record(hit=False)
+        cache.store(key, response)
+        return response
+
+    def _send(self, method, url, rate_limit_key, kwargs):
+        if rate_limit_key is None:
+            return self.session.request(method, url, **kwargs)
+        waited = 0.0
+        attempt = 0
+        while True:
+            waited += self.rate_limiter.acquire(rate_limit_key)
+            response = self.session.request(method, url, **kwargs)
+            retry_in = self.rate_limiter.observe(rate_limit_key, response, attempt)
+            if retry_in is None or waited + retry_in > self.max_throttle_wait:
+                return response
+            print(f"[HttpTransport] {rate_limit_key[0]} throttled ({response.status_code}); retrying in {retry_in:.1f}s.")
+            attempt += 1
+
+    def bind(self, **defaults):
+        """Returns a view of this transport that adds default keyword arguments (e.g. rate_limit_key) to every call."""
+        return BoundTransport(self, defaults)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request("PUT", url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.request("PATCH", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+    def close(self):
+        """Closes all pooled connections."""
+        self.session.close()
+
+
+class BoundTransport:
+    """Same interface as HttpTransport, sharing its pools, with per-client default arguments."""
+
+    def __init__(self, transport, defaults):
+        self.transport = transport
+        self.defaults = defaults
+
+    def request(self, method, url, **kwargs):
+        return self.transport.request(method, url, **{**self.defaults, **kwargs})
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request("PUT", url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.request("PATCH", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+    def bind(self, **defaults):
+        return BoundTransport(self.transport, {**self.defaults, **defaults})
+
+
+_shared_transport = None
+_shared_transport_lock = threading.Lock()
+
+
+def get_shared_transport():
+    """Returns the process-wide transport used by integrations that are not given their own."""
+    global _shared_transport
+    if _shared_transport is None:
+        with _shared_transport_lock:
+            if _shared_transport is None:
+                _shared_transport = HttpTransport()
+    return _shared_transport
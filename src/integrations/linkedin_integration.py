@@ -7,14 +7,20 @@ import json
 # with proper OAuth 2.0 authentication.
 # LinkedIn API access is generally more restricted and requires app approval for many endpoints.
 
+from src.integrations.http_transport import get_shared_transport
+from src.integrations.rate_limiter import credential_key
+
 LINKEDIN_API_BASE_URL = "https://api.linkedin.com/v2"
 
 class LinkedInIntegration:
-    def __init__(self, access_token=None):
+    def __init__(self, access_token=None, transport=None, base_url=LINKEDIN_API_BASE_URL):
         """Initializes the LinkedIn client.
         access_token: OAuth 2.0 access token for the user.
+        transport: Optional HttpTransport; defaults to the process-wide pooled transport.
         """
         self.access_token = access_token
+        self.http = (transport or get_shared_transport()).bind(rate_limit_key=credential_key("LinkedIn", access_token))
+        self.base_url = base_url
         self.headers = {
             "Authorization": f"Bearer {self.access_token}",
             "Content-Type": "application/json",
@@ -31,22 +37,15 @@ class LinkedInIntegration:
         
         # For authenticated user: "/me"
         # For a specific user (if permissions allow): "/people/(urn:{personID})"
-        url = f"{LINKEDIN_API_BASE_URL}/me" # Default to authenticated user
+        url = f"{self.base_url}/me" # Default to authenticated user
         # To get more fields, you need to specify them, e.g., projection=(id,firstName,lastName,profilePicture(displayImage~:playableStreams))
-        # params = {"projection": "(id,firstName,lastName,headline)"}
+        params = {"projection": "(id,firstName,lastName,headline)"}
         
         try:
-            # response = requests.get(url, headers=self.headers, params=params)
-            # response.raise_for_status()
-            # print(f"[LinkedInIntegration] Fetched profile for authenticated user.")
-            # return response.json()
-            print(f"[LinkedInIntegration] Simulating fetching profile for authenticated user.")
-            return {
-                "id": "sim_linkedin_user_urn",
-                "firstName": {"localized": {"en_US": "Simulated"}, "preferredLocale": {"country": "US", "language": "en"}},
-                "lastName": {"localized": {"en_US": "User"}, "preferredLocale": {"country": "US", "language": "en"}},
-                "headline": {"localized": {"en_US": "Simulated Headline"}, "preferredLocale": {"country": "US", "language": "en"}}
-            }
+            response = self.http.get(url, headers=self.headers, params=params)
+            response.raise_for_status()
+            print(f"[LinkedInIntegration] Fetched profile for authenticated user.")
+            return response.json()
         except requests.exceptions.RequestException as e:
             print(f"Error fetching LinkedIn user profile: {e}")
             return None
@@ -59,7 +58,7 @@ class LinkedInIntegration:
             print("[LinkedInIntegration] Access token required. Cannot fetch company details.")
             return None
 
-        # url = f"{LINKEDIN_API_BASE_URL}/organizations/{company_id}"
+        # url = f"{self.base_url}/organizations/{company_id}"
         print(f"[LinkedInIntegration] Simulating fetching company details for ID: {company_id}")
         return {
             "id": company_id,
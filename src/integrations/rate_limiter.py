@@ -0,0 +1,153 @@
+# This is /home/ubuntu/copri_app/src/integrations/rate_limiter.py
+import hashlib
+import random
+import threading
+import time
+
+# Default (requests per second, burst capacity) per platform. Server-reported quotas override
+# these as soon as the first response with rate-limit headers arrives.
+PLATFORM_LIMITS = {
+    "Trello": (10.0, 100),            # 100 requests / 10 s per token
+    "GitHub": (5000 / 3600.0, 5000),  # 5000 requests / hour per token
+    "X": (1.0, 15),
+    "LinkedIn": (1.0, 10),
+    "Gmail": (50.0, 50),              # 250 quota units / s per user, messages.get costs 5
+    "GoogleCalendar": (10.0, 10),
+}
+DEFAULT_LIMIT = (5.0, 10)
+
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+MIN_RATE_FRACTION = 0.1 # Adaptive slow-down never goes below 10% of the configured rate
+
+# Remaining-count / reset-time header names, in lookup order (GitHub, X, Trello).
+REMAINING_HEADERS = ("X-RateLimit-Remaining", "x-rate-limit-remaining", "x-rate-limit-api-token-remaining")
+RESET_HEADERS = ("X-RateLimit-Reset", "x-rate-limit-reset") # Epoch seconds
+
+def credential_key(platform_name, credential):
+    """Builds a scheduler key without keeping the raw credential around."""
+    digest = hashlib.sha256((credential or "").encode("utf-8")).hexdigest()[:16]
+    return (platform_name, digest)
+
+class TokenBucket:
+    """Thread-safe token bucket that hands out reservations instead of rejecting callers.
+
+    reserve() always succeeds and returns how long the caller must sleep first, so callers
+    queue up in arrival order rather than failing when the bucket is empty.
+    """
+
+    def __init__(self, rate, capacity):
+        self.configured_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self):
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            wait = max(0.0, -self.tokens / self.rate)
+            return max(wait, self.blocked_until - now)
+
+    def block_for(self, seconds):
+        """Stops handing out immediate reservations for the given time (server asked us to wait)."""
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def sync_remaining(self, remaining):
+        """Never believe we have more tokens than the server says are left."""
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, float(remaining))
+
+    def slow_down(self):
+        with self.lock:
+            self.rate = max(self.configured_rate * MIN_RATE_FRACTION, self.rate / 2)
+
+    def speed_up(self):
+        with self.lock:
+            if self.rate < self.configured_rate:
+                self.rate = min(self.configured_rate, self.rate + self.configured_rate * 0.05)
+
+class RateLimitScheduler:
+    """Per-platform, per-credential token buckets driven by server rate-limit headers."""
+
+    def __init__(self, limits=None):
+        self.limits = {**PLATFORM_LIMITS, **(limits or {})}
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, key):
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                rate, capacity = self.limits.get(key[0], DEFAULT_LIMIT)
+                bucket = self._buckets[key] = TokenBucket(rate, capacity)
+            return bucket
+
+    def acquire(self, key):
+        """Blocks until the key's bucket grants a request. Returns the seconds spent waiting."""
+        wait = self.bucket(key).reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def observe(self, key, response, attempt=0):
+        """Feeds a response back into the bucket.
+        Returns the seconds to wait before retrying if the response was throttled, else None.
+        """
+        bucket = self.bucket(key)
+        headers = response.headers
+        remaining = _first_header(headers, REMAINING_HEADERS)
+        reset_at = _first_header(headers, RESET_HEADERS)
+        if remaining is not None:
+            bucket.sync_remaining(remaining)
+
+        throttled = response.status_code == 429 or (response.status_code == 403 and remaining == 0)
+        if not throttled:
+            if remaining == 0 and reset_at is not None:
+                bucket.block_for(max(0.0, reset_at - time.time()))
+            bucket.speed_up()
+            return None
+
+        retry_after = _first_header(headers, ("Retry-After",))
+        if retry_after is not None:
+            wait = retry_after
+        elif reset_at is not None:
+            wait = max(0.0, reset_at - time.time())
+        else:
+            # No server hint: exponential backoff with full jitter.
+            wait = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)))
+        wait += random.uniform(0, 0.1 * wait + 0.05) # Spread out callers released at the same moment
+        bucket.slow_down()
+        bucket.block_for(wait)
+        return wait
+
+def _first_header(headers, names):
+    for name in names:
+        value = headers.get(name)
+        if value is not None:
+            try:
+                return float(value)
+            except ValueError:
+                return None # e.g. an HTTP-date Retry-After; fall back to computed backoff
+    return None
+
+_shared_scheduler = None
+_shared_scheduler_lock = threading.Lock()
+
+def get_shared_scheduler():
+    global _shared_scheduler
+    if _shared_scheduler is None:
+        with _shared_scheduler_lock:
+            if _shared_scheduler is None:
+                _shared_scheduler = RateLimitScheduler()
+    return _shared_scheduler
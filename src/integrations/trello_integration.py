@@ -1,13 +1,52 @@
 # This is /home/ubuntu/copri_app/src/integrations/trello_integration.py
 import requests
 import json
+import datetime
+
+from src.integrations.http_transport import get_shared_transport
+from src.integrations.rate_limiter import credential_key
 
 TRELLO_API_BASE_URL = "https://api.trello.com/1"
+TRELLO_BATCH_MAX_URLS = 10 # Trello's /batch endpoint accepts at most 10 URLs per call
+SNAPSHOT_CARD_FIELDS = "id,name,desc,due,idList,idBoard,idLabels,idMembers,url,dateLastActivity,closed"
+TRELLO_ACTIONS_PAGE_LIMIT = 1000 # Maximum actions Trello returns per request
+CARD_ACTION_TYPES = "createCard,updateCard,deleteCard,copyCard,convertToCardFromCheckItem,moveCardToBoard,moveCardFromBoard,addLabelToCard,removeLabelFromCard,addMemberToCard,removeMemberFromCard"
+
+def parse_trello_datetime(value):
+    """Parses a Trello ISO 8601 timestamp (e.g. 2025-05-12T09:00:00.000Z) into a naive UTC datetime."""
+    if not value:
+        return None
+    return datetime.datetime.fromisoformat(value.replace("Z", "+00:00")).astimezone(datetime.timezone.utc).replace(tzinfo=None)
+
+def trello_id_created_at(trello_id):
+    """Trello object IDs embed their creation time in the first 8 hex digits."""
+    try:
+        return datetime.datetime.utcfromtimestamp(int(trello_id[:8], 16))
+    except (TypeError, ValueError):
+        return None
+
+def normalize_card(card):
+    """Maps a raw Trello card payload onto TrelloCard column names."""
+    return {
+        "trello_card_id": card["id"],
+        "trello_board_id": card.get("idBoard"),
+        "trello_list_id": card.get("idList"),
+        "name": card.get("name") or "",
+        "description": card.get("desc") or None,
+        "due_date": parse_trello_datetime(card.get("due")),
+        "url": card.get("url"),
+        "labels": [{"id": label.get("id"), "name": label.get("name"), "color": label.get("color")} for label in card.get("labels", [{"id": label_id} for label_id in card.get("idLabels", [])])],
+        "members_trello_ids": card.get("idMembers", []),
+        "last_activity_date": parse_trello_datetime(card.get("dateLastActivity")),
+        "created_at_trello": trello_id_created_at(card["id"]),
+    }
 
 class TrelloIntegration:
-    def __init__(self, api_key, token):
+    def __init__(self, api_key, token, transport=None, base_url=TRELLO_API_BASE_URL):
         self.api_key = api_key
         self.token = token
+        self.http = (transport or get_shared_transport()).bind(rate_limit_key=credential_key("Trello", token)) # Pooled, rate-limited session shared across integrations
+        self.base_url = base_url
         self.auth_params = {
             "key": self.api_key,
             "token": self.token
@@ -15,9 +54,9 @@ class TrelloIntegration:
 
     def get_member_info(self):
         """Fetches information about the token owner."""
-        url = f"{TRELLO_API_BASE_URL}/members/me"
+        url = f"{self.base_url}/members/me"
         try:
-            response = requests.get(url, params=self.auth_params)
+            response = self.http.get(url, params=self.auth_params, use_cache=True)
             response.raise_for_status() # Raises an HTTPError for bad responses (4XX or 5XX)
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -25,23 +64,25 @@ class TrelloIntegration:
             return None
 
     def get_boards(self):
-        """Fetches all boards for the authenticated user."""
-        url = f"{TRELLO_API_BASE_URL}/members/me/boards"
-        params = {**self.auth_params, "filter": "open", "fields": "id,name,url"}
+        """Fetches all boards for the authenticated user. Returns None if the request failed."""
+        url = f"{self.base_url}/members/me/boards"
+        params = {**self.auth_params, "filter": "open", "fields": "id,name,url,dateLastActivity"}
         try:
-            response = requests.get(url, params=params)
+            response = self.http.get(url, params=params, use_cache=True)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
             print(f"Error fetching Trello boards: {e}")
-            return []
+            return None
 
     def get_lists_for_board(self, board_id):
-        """Fetches all lists for a specific board."""
-        url = f"{TRELLO_API_BASE_URL}/boards/{board_id}/lists"
+        """Fetches all lists for a specific board, with their open cards nested.
+        Use get_board_snapshot() rather than following up with get_cards_for_list() per list.
+        """
+        url = f"{self.base_url}/boards/{board_id}/lists"
         params = {**self.auth_params, "cards": "open", "card_fields": "id,name,due,desc", "fields": "id,name"}
         try:
-            response = requests.get(url, params=params)
+            response = self.http.get(url, params=params, use_cache=True)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -50,10 +91,10 @@ class TrelloIntegration:
 
     def get_cards_for_list(self, list_id):
         """Fetches all cards for a specific list."""
-        url = f"{TRELLO_API_BASE_URL}/lists/{list_id}/cards"
+        url = f"{self.base_url}/lists/{list_id}/cards"
         params = {**self.auth_params, "fields": "id,name,desc,due,idList,idBoard,labels,url"}
         try:
-            response = requests.get(url, params=params)
+            response = self.http.get(url, params=params, use_cache=True)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -62,7 +103,7 @@ class TrelloIntegration:
 
     def create_card(self, id_list, name, desc=None, due=None, id_labels=None, url_source=None):
         """Creates a new card on a specific list."""
-        url = f"{TRELLO_API_BASE_URL}/cards"
+        url = f"{self.base_url}/cards"
         payload = {
             **self.auth_params,
             "idList": id_list,
@@ -74,9 +115,8 @@ class TrelloIntegration:
         if url_source: payload["urlSource"] = url_source
 
         try:
-            response = requests.post(url, json=payload) # Trello API often uses query params for POST too, but json for body is safer for complex data
-            # Let's check Trello docs. For card creation, it's query parameters.
-            response = requests.post(url, params=payload)
+            # Trello expects card creation fields as query parameters.
+            response = self.http.post(url, params=payload)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -84,6 +124,128 @@ class TrelloIntegration:
             print(f"Response content: {response.content if 'response' in locals() else 'No response object'}")
             return None
 
+    def _batch_get(self, paths):
+        """Fetches several GET paths via Trello's /batch endpoint, TRELLO_BATCH_MAX_URLS at a time.
+        Returns a list of (status_code, payload) aligned with paths; status_code is None when the
+        batch call itself failed.
+        """
+        results = []
+        url = f"{self.base_url}/batch"
+        for start in range(0, len(paths), TRELLO_BATCH_MAX_URLS):
+            chunk = paths[start:start + TRELLO_BATCH_MAX_URLS]
+            try:
+                response = self.http.get(url, params={**self.auth_params, "urls": ",".join(chunk)})
+                response.raise_for_status()
+                entries = response.json()
+            except requests.exceptions.RequestException as e:
+                print(f"Error fetching Trello batch {chunk}: {e}")
+                results.extend((None, None) for _ in chunk)
+                continue
+            for path, entry in zip(chunk, entries):
+                status, payload = next(iter(entry.items())) if entry else (None, None)
+                status = int(status) if str(status).isdigit() else None
+                if status != 200:
+                    print(f"[TrelloIntegration] Batch entry {path} returned {status}.")
+                results.append((status, payload))
+        return results
+
+    def get_changed_card_ids_since(self, board_ids, since):
+        """Reads each board's action feed since a checkpoint and returns (changed_card_ids, overflow_board_ids).
+        Boards whose feed hits the page limit are reported as overflow so the caller can re-crawl them fully.
+        """
+        since_param = since.replace(microsecond=0).isoformat() + "Z"
+        paths = [f"/boards/{board_id}/actions?filter={CARD_ACTION_TYPES.replace(',', '%2C')}&since={since_param}&limit={TRELLO_ACTIONS_PAGE_LIMIT}&fields=type%2Cdata%2Cdate" for board_id in board_ids]
+        changed_card_ids = set()
+        overflow_board_ids = []
+        for board_id, (status, actions) in zip(board_ids, self._batch_get(paths)):
+            if status != 200 or len(actions) >= TRELLO_ACTIONS_PAGE_LIMIT:
+                overflow_board_ids.append(board_id)
+                continue
+            for action in actions:
+                card = action.get("data", {}).get("card")
+                if card and card.get("id"):
+                    changed_card_ids.add(card["id"])
+        return changed_card_ids, overflow_board_ids
+
+    def get_cards_by_id(self, card_ids):
+        """Fetches individual cards through /batch.
+        Returns (cards, missing_ids): raw cards keyed by ID, and IDs Trello reports as deleted.
+        Cards whose fetch failed for any other reason appear in neither.
+        """
+        card_ids = list(card_ids)
+        fields = (SNAPSHOT_CARD_FIELDS + ",labels").replace(",", "%2C")
+        entries = self._batch_get([f"/cards/{card_id}?fields={fields}" for card_id in card_ids])
+        cards, missing_ids = {}, set()
+        for card_id, (status, payload) in zip(card_ids, entries):
+            if status == 200:
+                cards[card_id] = payload
+            elif status == 404:
+                missing_ids.add(card_id)
+        return cards, missing_ids
+
+    def get_open_cards_for_board(self, board_id):
+        """Fetches every open card on a board in one request (used when an action feed overflows)."""
+        url = f"{self.base_url}/boards/{board_id}/cards/open"
+        params = {**self.auth_params, "fields": SNAPSHOT_CARD_FIELDS + ",labels"}
+        try:
+            response = self.http.get(url, params=params, use_cache=True)
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching open cards for board {board_id}: {e}")
+            return None
+
+    def get_board_snapshot(self, board_ids=None):
+        """Fetches boards, lists, cards, labels and members in ceil(boards / 10) + 1 requests.
+
+        Each board is requested once with all nested resources, then the results are
+        de-duplicated by ID into a single normalized structure:
+            {"boards": {id: {...}}, "lists": {id: {...}}, "cards": {id: {TrelloCard columns}},
+             "labels": {id: {...}}, "members": {id: {...}}, "failed_board_ids": [id, ...]}
+        Boards whose fetch failed are listed in failed_board_ids and contribute nothing else.
+        Returns None if the board list itself could not be fetched.
+        """
+        snapshot = {"boards": {}, "lists": {}, "cards": {}, "labels": {}, "members": {}, "failed_board_ids": []}
+        if board_ids is None:
+            boards = self.get_boards()
+            if boards is None:
+                return None
+            board_ids = [board["id"] for board in boards]
+        board_ids = list(dict.fromkeys(board_ids)) # Drop duplicate board IDs, keep order
+        # Nested-resource parameters use commas, so they must be URL-escaped inside the batch list.
+        nested = (
+            "fields=id%2Cname%2Curl%2CdateLastActivity"
+            "&lists=open&list_fields=id%2Cname%2Cpos%2Cclosed"
+            f"&cards=open&card_fields={SNAPSHOT_CARD_FIELDS.replace(',', '%2C')}"
+            "&labels=all&label_fields=id%2Cname%2Ccolor"
+            "&members=all&member_fields=id%2CfullName%2Cusername"
+        )
+        entries = self._batch_get([f"/boards/{board_id}?{nested}" for board_id in board_ids])
+        for board_id, (status, board) in zip(board_ids, entries):
+            if status != 200:
+                snapshot["failed_board_ids"].append(board_id)
+                continue
+            snapshot["boards"][board["id"]] = {
+                "id": board["id"],
+                "name": board.get("name"),
+                "url": board.get("url"),
+                "last_activity_date": parse_trello_datetime(board.get("dateLastActivity")),
+            }
+            for trello_list in board.get("lists", []):
+                snapshot["lists"][trello_list["id"]] = {**trello_list, "idBoard": board["id"]}
+            labels_by_id = {}
+            for label in board.get("labels", []):
+                labels_by_id[label["id"]] = {**label, "idBoard": board["id"]}
+            snapshot["labels"].update(labels_by_id)
+            for member in board.get("members", []):
+                snapshot["members"].setdefault(member["id"], member)
+            for card in board.get("cards", []):
+                # Resolve label IDs against the board's label set instead of fetching per card.
+                card = {**card, "labels": [labels_by_id[label_id] for label_id in card.get("idLabels", []) if label_id in labels_by_id]}
+                snapshot["cards"][card["id"]] = normalize_card(card)
+        print(f"[TrelloIntegration] Snapshot: {len(snapshot['boards'])} boards, {len(snapshot['lists'])} lists, {len(snapshot['cards'])} cards.")
+        return snapshot
+
 # Example usage (for testing, would be called from a service or route)
 # if __name__ == "__main__":
 #     # IMPORTANT: Replace with your actual API key and token for testing
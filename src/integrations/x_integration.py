@@ -6,14 +6,21 @@ import json
 # Actual implementation would use the official X API client or make direct HTTP requests
 # with proper authentication (e.g., OAuth 2.0 Bearer Token or OAuth 1.0a for user context)
 
+from src.integrations.http_transport import get_shared_transport
+from src.integrations.rate_limiter import credential_key
+
 X_API_BASE_URL_V2 = "https://api.twitter.com/2" # Example for v2 API
+X_USER_FIELDS = "created_at,description,entities,id,location,name,pinned_tweet_id,profile_image_url,protected,public_metrics,url,username,verified"
 
 class XIntegration:
-    def __init__(self, bearer_token=None, api_key=None, api_secret_key=None, access_token=None, access_token_secret=None):
+    def __init__(self, bearer_token=None, api_key=None, api_secret_key=None, access_token=None, access_token_secret=None, transport=None, base_url=X_API_BASE_URL_V2):
         """Initializes the X client.
         bearer_token: For App-only authentication (v2).
         api_key, api_secret_key, access_token, access_token_secret: For User context authentication (v1.1 or v2 with OAuth 2.0 PKCE).
+        transport: Optional HttpTransport; defaults to the process-wide pooled transport.
         """
+        self.http = (transport or get_shared_transport()).bind(rate_limit_key=credential_key("X", bearer_token))
+        self.base_url = base_url
         self.bearer_token = bearer_token
         self.api_key = api_key
         self.api_secret_key = api_secret_key
@@ -33,7 +40,7 @@ class XIntegration:
             print("[XIntegration] Bearer token required for v2 search. Cannot search tweets.")
             return []
         
-        url = f"{X_API_BASE_URL_V2}/tweets/search/recent"
+        url = f"{self.base_url}/tweets/search/recent"
         params = {
             "query": query,
             "max_results": max_results,
@@ -42,7 +49,7 @@ class XIntegration:
             "user.fields": "username,name,profile_image_url,verified"
         }
         try:
-            # response = requests.get(url, headers=self.headers, params=params)
+            # response = self.http.get(url, headers=self.headers, params=params)
             # response.raise_for_status()
             # print(f"[XIntegration] Fetched tweets for query: {query}")
             # return response.json()
@@ -69,29 +76,33 @@ class XIntegration:
             print("[XIntegration] Bearer token required for v2 user lookup. Cannot get profile.")
             return None
         
-        url = f"{X_API_BASE_URL_V2}/users/by/username/{username}"
-        params = {
-            "user.fields": "created_at,description,entities,id,location,name,pinned_tweet_id,profile_image_url,protected,public_metrics,url,username,verified"
-        }
+        url = f"{self.base_url}/users/by/username/{username}"
+        params = {"user.fields": X_USER_FIELDS}
         try:
-            # response = requests.get(url, headers=self.headers, params=params)
-            # response.raise_for_status()
-            # print(f"[XIntegration] Fetched profile for username: {username}")
-            # return response.json()
-            print(f"[XIntegration] Simulating fetching profile for username: {username}")
-            return {
-                "data": {
-                    "id": "sim_user_id_123",
-                    "name": username.capitalize(),
-                    "username": username,
-                    "description": "Simulated user description.",
-                    "public_metrics": {"followers_count": 100, "following_count": 50, "tweet_count": 200}
-                }
-            }
+            response = self.http.get(url, headers=self.headers, params=params)
+            response.raise_for_status()
+            print(f"[XIntegration] Fetched profile for username: {username}")
+            return response.json()
         except requests.exceptions.RequestException as e:
             print(f"Error getting X/Twitter user profile for {username}: {e}")
             return None
 
+    def get_user_profile_by_id(self, user_id):
+        """Gets public profile information for a numeric user ID (v2 API), e.g. a stored platform_user_id."""
+        if not self.bearer_token:
+            print("[XIntegration] Bearer token required for v2 user lookup. Cannot get profile.")
+            return None
+
+        url = f"{self.base_url}/users/{user_id}"
+        try:
+            response = self.http.get(url, headers=self.headers, params={"user.fields": X_USER_FIELDS})
+            response.raise_for_status()
+            print(f"[XIntegration] Fetched profile for user ID: {user_id}")
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            print(f"Error getting X/Twitter user profile for ID {user_id}: {e}")
+            return None
+
 # Example usage (for testing)
 # if __name__ == "__main__":
 #     # This would require setting up an X Developer App and getting a Bearer Token
@@ -0,0 +1,210 @@
+# This is /home/ubuntu/copri_app/src/migrations/__init__.py
+"""Versioned schema migrations.
+
+Each migration is a module named mNNNN_<description>.py with an upgrade(context) function (and
+optionally downgrade(context)); NNNN is its version. Applied versions are recorded in the
+schema_version table, so startup on an up-to-date database is a single SELECT.
+
+A migration that builds objects the models cannot describe (virtual tables, generated columns)
+sets OUTSIDE_METADATA = True; it then also runs on brand-new databases.
+"""
+import importlib
+import os
+import pkgutil
+import re
+import time
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, select, text, tuple_
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.schema import CreateIndex, DropIndex
+
+DEFAULT_BACKFILL_BATCH = int(os.getenv("COPRI_MIGRATION_BATCH", "5000")) # Rows per backfill transaction
+DEFAULT_BACKFILL_PAUSE = float(os.getenv("COPRI_MIGRATION_PAUSE", "0.05")) # Seconds between batches, lets other writers in
+
+_MODULE_PATTERN = re.compile(r"^m(\d{4})_\w+$")
+
+version_metadata = MetaData()
+schema_version = Table(
+    "schema_version", version_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String(255), nullable=False),
+    Column("applied_at", DateTime, nullable=False, server_default=func.current_timestamp()),
+)
+
+def discover():
+    """[(version, name, module)] for every migration in this package, in version order."""
+    found = []
+    for info in pkgutil.iter_modules(__path__):
+        match = _MODULE_PATTERN.match(info.name)
+        if match:
+            found.append((int(match.group(1)), info.name, importlib.import_module(f"{__name__}.{info.name}")))
+    found.sort(key=lambda item: item[0])
+    versions = [version for version, _, _ in found]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Duplicate migration versions: {versions}")
+    return found
+
+def head_version():
+    migrations = discover()
+    return migrations[-1][0] if migrations else 0
+
+def current_version(engine):
+    """The applied schema version, or None if the database has never been migrated."""
+    try:
+        with engine.connect() as connection:
+            return connection.execute(select(func.max(schema_version.c.version))).scalar() or 0
+    except DBAPIError:
+        return None # No schema_version table yet
+
+class MigrationContext:
+    """What a migration's upgrade()/downgrade() gets: short transactions and online DDL helpers.
+
+    Nothing here holds one transaction across a whole migration. Index builds use the backend's
+    online mode (CREATE INDEX CONCURRENTLY on PostgreSQL, ALGORITHM=INPLACE LOCK=NONE on MySQL),
+    and backfills commit every batch_size rows, so readers and the sync writers keep running.
+    SQLite has no online index build; its CREATE INDEX holds the write lock for the duration.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.dialect_name = engine.dialect.name
+
+    def execute(self, statement, parameters=None):
+        """Runs one statement in its own transaction."""
+        if isinstance(statement, str):
+            statement = text(statement)
+        with self.engine.begin() as connection:
+            return connection.execute(statement, parameters or {})
+
+    def inspect(self):
+        """A fresh Inspector (no cached reflection from before earlier steps)."""
+        return inspect(self.engine)
+
+    def has_table(self, table_name):
+        return inspect(self.engine).has_table(table_name)
+
+    def has_column(self, table_name, column_name):
+        return any(column["name"] == column_name for column in inspect(self.engine).get_columns(table_name))
+
+    def has_index(self, table_name, index_name):
+        return any(index["name"] == index_name for index in inspect(self.engine).get_indexes(table_name))
+
+    def add_column(self, table_name, column):
+        """Adds a nullable column (a metadata-only change on all three backends). Skips if present."""
+        if self.has_column(table_name, column.name):
+            return False
+        if not column.nullable:
+            raise ValueError(f"Add {table_name}.{column.name} as nullable, backfill it, then tighten it in a later migration.")
+        column_type = column.type.compile(dialect=self.engine.dialect)
+        preparer = self.engine.dialect.identifier_preparer
+        self.execute(f"ALTER TABLE {preparer.quote(table_name)} ADD COLUMN {preparer.quote(column.name)} {column_type}")
+        print(f"[Migrations] Added column {table_name}.{column.name}.")
+        return True
+
+    def create_index(self, index):
+        """Builds index without blocking writes where the backend allows it. Skips if present."""
+        if self.has_index(index.table.name, index.name):
+            return False
+        ddl = str(CreateIndex(index).compile(dialect=self.engine.dialect))
+        started = time.perf_counter()
+        if self.dialect_name == "postgresql":
+            # CONCURRENTLY cannot run inside a transaction block.
+            with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+                connection.exec_driver_sql(ddl.replace("CREATE INDEX", "CREATE INDEX CONCURRENTLY", 1))
+        elif self.dialect_name in ("mysql", "mariadb"):
+            self.execute(f"{ddl} ALGORITHM=INPLACE LOCK=NONE") # CREATE INDEX takes the options space-separated; the comma form is ALTER TABLE syntax
+        else:
+            self.execute(ddl)
+        print(f"[Migrations] Built index {index.name} on {index.table.name} in {time.perf_counter() - started:.1f}s.")
+        return True
+
+    def drop_index(self, index):
+        if self.has_index(index.table.name, index.name):
+            self.execute(str(DropIndex(index).compile(dialect=self.engine.dialect)))
+
+    def backfill(self, table, values, where=None, batch_size=DEFAULT_BACKFILL_BATCH, pause=DEFAULT_BACKFILL_PAUSE):
+        """UPDATE table SET values [WHERE where] in primary-key ranges of batch_size rows, one commit each.
+
+        where should exclude rows that are already done (e.g. new_column IS NULL), so an
+        interrupted backfill resumes where it stopped. Returns the number of rows updated.
+        """
+        key = tuple(table.primary_key.columns)
+        last = None
+        updated = 0
+        while True:
+            with self.engine.begin() as connection:
+                batch = select(*key).order_by(*key).limit(batch_size)
+                if where is not None:
+                    batch = batch.where(where)
+                if last is not None:
+                    batch = batch.where(tuple_(*key) > tuple_(*last)) if len(key) > 1 else batch.where(key[0] > last[0])
+                keys = connection.execute(batch).all()
+                if not keys:
+                    break
+                target = tuple_(*key).in_(keys) if len(key) > 1 else key[0].in_([row[0] for row in keys])
+                updated += connection.execute(table.update().where(target).values(values)).rowcount
+                last = tuple(keys[-1])
+            if len(keys) < batch_size:
+                break
+            time.sleep(pause)
+        print(f"[Migrations] Backfilled {updated} row(s) of {table.name}.")
+        return updated
+
+def _record(engine, version, name):
+    with engine.begin() as connection:
+        connection.execute(schema_version.insert().values(version=version, name=name))
+
+def upgrade(engine, metadata=None, target=None):
+    """Brings the database to target (default: the latest version). Returns the version reached.
+
+    An up-to-date database costs one query. A brand-new database gets the current models via
+    create_all() and is stamped at the head version without replaying history (except
+    OUTSIDE_METADATA migrations); an existing database that predates this table starts from version 0.
+    """
+    migrations = discover()
+    head = migrations[-1][0] if migrations else 0
+    target = head if target is None else target
+    current = current_version(engine)
+    if current is not None and current >= target:
+        return current
+    if current is None:
+        version_metadata.create_all(engine)
+        fresh = metadata is not None and not any(inspect(engine).has_table(name) for name in metadata.tables)
+        if metadata is not None:
+            metadata.create_all(engine) # New tables only; existing tables are changed by migrations
+        if fresh:
+            context = MigrationContext(engine)
+            for version, name, module in migrations:
+                if version <= target:
+                    if getattr(module, "OUTSIDE_METADATA", False):
+                        module.upgrade(context)
+                    _record(engine, version, name)
+            print(f"[Migrations] Created a new schema at version {target}.")
+            return target
+        current = 0
+    elif metadata is not None:
+        metadata.create_all(engine)
+    context = MigrationContext(engine)
+    for version, name, module in migrations:
+        if current < version <= target:
+            print(f"[Migrations] Applying {name}...")
+            started = time.perf_counter()
+            module.upgrade(context)
+            _record(engine, version, name)
+            print(f"[Migrations] Applied {name} in {time.perf_counter() - started:.1f}s.")
+            current = version
+    return current
+
+def downgrade(engine, target):
+    """Reverts applied migrations above target, newest first."""
+    current = current_version(engine) or 0
+    context = MigrationContext(engine)
+    for version, name, module in reversed(discover()):
+        if target < version <= current:
+            if not hasattr(module, "downgrade"):
+                raise RuntimeError(f"Migration {name} cannot be reverted.")
+            module.downgrade(context)
+            with engine.begin() as connection:
+                connection.execute(schema_version.delete().where(schema_version.c.version == version))
+            print(f"[Migrations] Reverted {name}.")
+    return min(current, target)
@@ -0,0 +1,36 @@
+# This is /home/ubuntu/copri_app/src/migrations/m0001_hot_path_indexes.py
+"""Composite indexes for the per-user timeline, deadline and sync queries.
+
+The Index objects are declared on the models (so create_all() builds them for new databases);
+this migration adds them to databases created before they existed.
+"""
+from src.models.copri_models import (
+    PlatformConnection, TrelloCard, Email, CalendarEvent, Project, CoachingInteraction, FinancialNote, ApplicationTracking,
+)
+
+MODELS = (PlatformConnection, TrelloCard, Email, CalendarEvent, Project, CoachingInteraction, FinancialNote, ApplicationTracking)
+
+# Pinned by name: indexes declared on the models later belong to later migrations.
+INDEX_NAMES = (
+    "ix_platform_connections_user_platform",
+    "ix_trello_cards_connection_board", "ix_trello_cards_connection_due",
+    "ix_emails_connection_follow_up", "ix_emails_connection_received",
+    "ix_calendar_events_connection_calendar", "ix_calendar_events_connection_start",
+    "ix_projects_user_status",
+    "ix_coaching_interactions_user_timestamp",
+    "ix_financial_notes_user_project",
+    "ix_application_tracking_user_deadline",
+)
+
+def hot_path_indexes():
+    """The Index objects (declared in the models' __table_args__) this migration builds, in table order."""
+    by_name = {index.name: index for model in MODELS for index in model.__table__.indexes}
+    return [by_name[name] for name in INDEX_NAMES]
+
+def upgrade(context):
+    for index in hot_path_indexes():
+        context.create_index(index)
+
+def downgrade(context):
+    for index in reversed(hot_path_indexes()):
+        context.drop_index(index)
@@ -0,0 +1,10 @@
+# This is /home/ubuntu/copri_app/src/migrations/m0002_connection_sync_state.py
+"""platform_connections.sync_state: per-platform sync cursors (Gmail historyId, Calendar syncTokens, Trello since)."""
+from src.models.copri_models import PlatformConnection
+
+def upgrade(context):
+    # Nullable with no default: every sync service treats a missing state as "do a full sync".
+    context.add_column("platform_connections", PlatformConnection.__table__.c.sync_state)
+
+def downgrade(context):
+    context.execute("ALTER TABLE platform_connections DROP COLUMN sync_state")
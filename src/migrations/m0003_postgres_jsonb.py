@@ -0,0 +1,42 @@
+# This is /home/ubuntu/copri_app/src/migrations/m0003_postgres_jsonb.py
+"""PostgreSQL only: JSON columns become JSONB, and label columns get GIN indexes. No-op elsewhere.
+
+Databases created with the old mysql.JSON import have json columns on PostgreSQL. Converting
+rewrites each table once, so run it in a maintenance window on large installs.
+"""
+from sqlalchemy import JSON
+
+from src.database import db
+from src.models.copri_models import TrelloCard, Email
+
+GIN_INDEXES = ("ix_trello_cards_labels_gin", "ix_emails_labels_gin")
+
+def _json_columns():
+    return [(table.name, column.name) for table in db.metadata.sorted_tables for column in table.columns if isinstance(column.type, JSON)]
+
+def _gin_indexes():
+    by_name = {index.name: index for model in (TrelloCard, Email) for index in model.__table__.indexes}
+    return [by_name[name] for name in GIN_INDEXES]
+
+def upgrade(context):
+    if context.dialect_name != "postgresql":
+        return
+    for table_name, column_name in _json_columns():
+        if not context.has_table(table_name):
+            continue
+        current = {column["name"]: column["type"] for column in context.inspect().get_columns(table_name)}
+        if column_name in current and current[column_name].__class__.__name__ == "JSON":
+            context.execute(f'ALTER TABLE "{table_name}" ALTER COLUMN "{column_name}" TYPE JSONB USING "{column_name}"::jsonb')
+            print(f"[Migration 0003] {table_name}.{column_name} is now JSONB.")
+    for index in _gin_indexes():
+        context.create_index(index)
+
+def downgrade(context):
+    if context.dialect_name != "postgresql":
+        return
+    for index in _gin_indexes():
+        context.drop_index(index)
+    for table_name, column_name in _json_columns():
+        # Columns added by later migrations are gone again when this runs.
+        if context.has_table(table_name) and context.has_column(table_name, column_name):
+            context.execute(f'ALTER TABLE "{table_name}" ALTER COLUMN "{column_name}" TYPE JSON USING "{column_name}"::json')
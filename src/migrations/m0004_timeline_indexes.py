@@ -0,0 +1,20 @@
+# This is /home/ubuntu/copri_app/src/migrations/m0004_timeline_indexes.py
+"""(owner, timestamp) indexes for the activity timeline sources that did not have one yet.
+
+Emails, calendar events and coaching interactions are covered by the indexes of migration 0001.
+"""
+from src.models.copri_models import TrelloCard, FinancialNote
+
+INDEX_NAMES = ("ix_trello_cards_connection_activity", "ix_financial_notes_user_created")
+
+def timeline_indexes():
+    by_name = {index.name: index for model in (TrelloCard, FinancialNote) for index in model.__table__.indexes}
+    return [by_name[name] for name in INDEX_NAMES]
+
+def upgrade(context):
+    for index in timeline_indexes():
+        context.create_index(index)
+
+def downgrade(context):
+    for index in reversed(timeline_indexes()):
+        context.drop_index(index)
@@ -0,0 +1,18 @@
+# This is /home/ubuntu/copri_app/src/migrations/m0005_search_index.py
+"""Full-text search index (search_documents): FTS5 on SQLite, a tsvector + GIN table on PostgreSQL.
+
+The table is not part of the models' metadata, so this also runs on brand-new databases.
+Existing rows are indexed in batches of REBUILD_BATCH_SIZE, one transaction each.
+"""
+from src.services import search_index
+
+OUTSIDE_METADATA = True
+
+def upgrade(context):
+    with context.engine.begin() as connection:
+        search_index.create_search_table(connection)
+    search_index.rebuild(context.engine)
+
+def downgrade(context):
+    with context.engine.begin() as connection:
+        search_index.drop_search_table(connection)
@@ -0,0 +1,25 @@
+# This is /home/ubuntu/copri_app/src/migrations/m0006_calendar_recurrence.py
+"""calendar_events.recurrence: marks recurring masters, whose busy time comes from their expanded instances.
+
+Rows synced before this column existed are masters or single events without telling which, and
+sync tokens only return changed events, so the stored Calendar sync tokens are dropped: the next
+sync of each connection is a full listing that fills the column.
+"""
+from sqlalchemy import select
+
+from src.models.copri_models import CalendarEvent, PlatformConnection
+
+SYNC_TOKENS_STATE_KEY = "calendar_sync_tokens" # As stored by CalendarSyncService; frozen here so the migration never imports service code
+
+def upgrade(context):
+    context.add_column("calendar_events", CalendarEvent.__table__.c.recurrence)
+    table = PlatformConnection.__table__
+    with context.engine.begin() as connection:
+        rows = connection.execute(select(table.c.connection_id, table.c.sync_state).where(table.c.platform_name == "GoogleCalendar")).all()
+        for connection_id, sync_state in rows:
+            if sync_state and SYNC_TOKENS_STATE_KEY in sync_state:
+                state = {key: value for key, value in sync_state.items() if key != SYNC_TOKENS_STATE_KEY}
+                connection.execute(table.update().where(table.c.connection_id == connection_id).values(sync_state=state))
+
+def downgrade(context):
+    context.execute("ALTER TABLE calendar_events DROP COLUMN recurrence")
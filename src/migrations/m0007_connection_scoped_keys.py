@@ -0,0 +1,76 @@
+# This is /home/ubuntu/copri_app/src/migrations/m0007_connection_scoped_keys.py
+"""Platform IDs unique per connection: (connection_id, trello_card_id / gmail_message_id / gcal_event_id).
+
+A card on a shared board or a shared calendar invite is synced by every user who sees it; with
+the platform ID unique on its own, each sync moved the one row to whichever connection synced
+last. The composite unique index is built online first, then the old single-column constraint is
+dropped. SQLite cannot drop a constraint declared inside CREATE TABLE, so there the table is
+rebuilt (copied under the write lock, keeping primary keys and indexes).
+"""
+from sqlalchemy import Index, MetaData, Table, UniqueConstraint
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from src.models.copri_models import TrelloCard, Email, CalendarEvent
+
+# table name -> (platform ID column, composite unique index name)
+KEYS = {
+    "trello_cards": ("trello_card_id", "ux_trello_cards_connection_card"),
+    "emails": ("gmail_message_id", "ux_emails_connection_message"),
+    "calendar_events": ("gcal_event_id", "ux_calendar_events_connection_event"),
+}
+
+def connection_key_indexes():
+    by_name = {index.name: index for model in (TrelloCard, Email, CalendarEvent) for index in model.__table__.indexes}
+    return [by_name[index_name] for _, index_name in KEYS.values()]
+
+def _rebuild_sqlite_table(context, table_name, column_name):
+    """Recreates table_name without its inline UNIQUE(column_name), keeping rows, primary keys and indexes."""
+    metadata = MetaData()
+    old = Table(table_name, metadata, autoload_with=context.engine)
+    new = old.to_metadata(metadata, name=f"{table_name}_rebuild") # Keeps the foreign keys
+    new.constraints = {
+        constraint for constraint in new.constraints
+        if not (isinstance(constraint, UniqueConstraint) and [column.name for column in constraint.columns] == [column_name])
+    }
+    new.indexes = set() # Recreated from old.indexes once the table has its final name
+    columns = ", ".join(context.engine.dialect.identifier_preparer.quote(column.name) for column in old.columns)
+    with context.engine.begin() as connection:
+        connection.execute(CreateTable(new))
+        connection.exec_driver_sql(f"INSERT INTO {new.name} ({columns}) SELECT {columns} FROM {table_name}")
+        connection.exec_driver_sql(f"DROP TABLE {table_name}")
+        connection.exec_driver_sql(f"ALTER TABLE {new.name} RENAME TO {table_name}")
+        for index in old.indexes:
+            connection.execute(CreateIndex(index))
+    print(f"[Migrations] Rebuilt {table_name} without the unique constraint on {column_name}.")
+
+def _drop_single_column_unique(context, table_name, column_name):
+    inspector = context.inspect()
+    preparer = context.engine.dialect.identifier_preparer
+    if context.dialect_name == "sqlite":
+        if any(constraint["column_names"] == [column_name] for constraint in inspector.get_unique_constraints(table_name)):
+            _rebuild_sqlite_table(context, table_name, column_name)
+    elif context.dialect_name == "postgresql":
+        for constraint in inspector.get_unique_constraints(table_name):
+            if constraint["column_names"] == [column_name]:
+                context.execute(f"ALTER TABLE {preparer.quote(table_name)} DROP CONSTRAINT {preparer.quote(constraint['name'])}")
+        for index in inspector.get_indexes(table_name): # A unique index rather than a constraint
+            if index["unique"] and index["column_names"] == [column_name] and "duplicates_constraint" not in index:
+                context.execute(f"DROP INDEX {preparer.quote(index['name'])}")
+    else:
+        for index in inspector.get_indexes(table_name):
+            if index["unique"] and index["column_names"] == [column_name]:
+                context.execute(f"DROP INDEX {preparer.quote(index['name'])} ON {preparer.quote(table_name)} ALGORITHM=INPLACE LOCK=NONE")
+
+def upgrade(context):
+    for index in connection_key_indexes():
+        context.create_index(index)
+    for table_name, (column_name, _) in KEYS.items():
+        _drop_single_column_unique(context, table_name, column_name)
+
+def downgrade(context):
+    # Fails if two connections now hold the same platform ID; remove those duplicates first.
+    for table_name, (column_name, _) in KEYS.items():
+        table = Table(table_name, MetaData(), autoload_with=context.engine)
+        context.create_index(Index(f"ux_{table_name}_{column_name}", table.c[column_name], unique=True))
+    for index in connection_key_indexes():
+        context.drop_index(index)
@@ -1,6 +1,6 @@
 # This is /home/ubuntu/copri_app/src/models/copri_models.py
 from src.database import db # Changed to absolute import
-from sqlalchemy.dialects.mysql import JSON # Using mysql dialect for JSON, works with SQLite too
+from src.database import PortableJSON as JSON # JSONB on PostgreSQL, JSON on MySQL and SQLite
 import datetime
 
 class User(db.Model):
@@ -29,6 +29,7 @@ class PlatformConnection(db.Model):
     token_expires_at = db.Column(db.TIMESTAMP, nullable=True)
     scopes = db.Column(db.Text, nullable=True)
     last_sync_time = db.Column(db.TIMESTAMP, nullable=True)
+    sync_state = db.Column(JSON, nullable=True) # Platform sync cursors, e.g. Gmail historyId, Calendar syncTokens
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.TIMESTAMP, default=datetime.datetime.utcnow)
     updated_at = db.Column(db.TIMESTAMP, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
@@ -39,10 +40,14 @@ class PlatformConnection(db.Model):
     calendar_events = db.relationship("CalendarEvent", backref="platform_connection", lazy=True, cascade="all, delete-orphan")
     # github_issues = db.relationship("GitHubIssue", backref="platform_connection", lazy=True, cascade="all, delete-orphan")
 
+    __table_args__ = (
+        db.Index("ix_platform_connections_user_platform", "user_id", "platform_name", "is_active"), # Per-user joins, sync fan-out
+    )
+
 class TrelloCard(db.Model):
     __tablename__ = "trello_cards"
     card_id_pk = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    trello_card_id = db.Column(db.String(255), unique=True, nullable=False)
+    trello_card_id = db.Column(db.String(255), nullable=False) # Unique per connection: shared items are stored once per user
     connection_id = db.Column(db.Integer, db.ForeignKey("platform_connections.connection_id"), nullable=False)
     trello_board_id = db.Column(db.String(255), nullable=False)
     trello_list_id = db.Column(db.String(255), nullable=False)
@@ -57,10 +62,19 @@ class TrelloCard(db.Model):
     imported_at = db.Column(db.TIMESTAMP, default=datetime.datetime.utcnow)
     updated_at_copri = db.Column(db.TIMESTAMP, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
 
+    __table_args__ = (
+        db.Index("ux_trello_cards_connection_card", "connection_id", "trello_card_id", unique=True), # bulk_upsert conflict target
+        db.Index("ix_trello_cards_connection_due", "connection_id", "due_date"), # Deadline views and prioritization
+        db.Index("ix_trello_cards_connection_board", "connection_id", "trello_board_id"), # Per-board sync pruning
+        db.Index("ix_trello_cards_connection_activity", "connection_id", "last_activity_date"), # Activity timeline
+        # Label containment queries (labels @> '[{"name": "urgent"}]'); JSONB only exists on PostgreSQL.
+        db.Index("ix_trello_cards_labels_gin", "labels", postgresql_using="gin", postgresql_ops={"labels": "jsonb_path_ops"}).ddl_if(dialect="postgresql"),
+    )
+
 class Email(db.Model):
     __tablename__ = "emails"
     email_id_pk = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    gmail_message_id = db.Column(db.String(255), unique=True, nullable=False)
+    gmail_message_id = db.Column(db.String(255), nullable=False) # Unique per connection: shared items are stored once per user
     gmail_thread_id = db.Column(db.String(255), nullable=False)
     connection_id = db.Column(db.Integer, db.ForeignKey("platform_connections.connection_id"), nullable=False)
     sender = db.Column(db.String(255), nullable=True)
@@ -78,10 +92,17 @@ class Email(db.Model):
     imported_at = db.Column(db.TIMESTAMP, default=datetime.datetime.utcnow)
     updated_at_copri = db.Column(db.TIMESTAMP, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
 
+    __table_args__ = (
+        db.Index("ux_emails_connection_message", "connection_id", "gmail_message_id", unique=True), # bulk_upsert conflict target
+        db.Index("ix_emails_connection_received", "connection_id", "received_date"), # Inbox timeline, newest first
+        db.Index("ix_emails_connection_follow_up", "connection_id", "follow_up_status", "received_date"), # Follow-up queue
+        db.Index("ix_emails_labels_gin", "labels_gmail", postgresql_using="gin", postgresql_ops={"labels_gmail": "jsonb_path_ops"}).ddl_if(dialect="postgresql"),
+    )
+
 class CalendarEvent(db.Model):
     __tablename__ = "calendar_events"
     event_id_pk = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    gcal_event_id = db.Column(db.String(255), unique=True, nullable=False)
+    gcal_event_id = db.Column(db.String(255), nullable=False) # Unique per connection: shared items are stored once per user
     gcal_calendar_id = db.Column(db.String(255), nullable=False)
     connection_id = db.Column(db.Integer, db.ForeignKey("platform_connections.connection_id"), nullable=False)
     summary = db.Column(db.Text, nullable=True)
@@ -93,9 +114,17 @@ class CalendarEvent(db.Model):
     attendees = db.Column(JSON, nullable=True)
     creator_email = db.Column(db.String(255), nullable=True)
     status_gcal = db.Column(db.String(50), nullable=True)
+    recurrence = db.Column(JSON, nullable=True) # RRULE/EXDATE lines of a recurring master; start/end are its first occurrence
     imported_at = db.Column(db.TIMESTAMP, default=datetime.datetime.utcnow)
     updated_at_copri = db.Column(db.TIMESTAMP, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
 
+    __table_args__ = (
+        # Covers free/busy and upcoming-event range scans without touching the table rows.
+        db.Index("ix_calendar_events_connection_start", "connection_id", "start_time", "end_time"),
+        db.Index("ix_calendar_events_connection_calendar", "connection_id", "gcal_calendar_id"), # Per-calendar sync pruning
+        db.Index("ux_calendar_events_connection_event", "connection_id", "gcal_event_id", unique=True), # bulk_upsert conflict target
+    )
+
 class Project(db.Model):
     __tablename__ = "projects"
     project_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
@@ -109,6 +138,10 @@ class Project(db.Model):
     created_at = db.Column(db.TIMESTAMP, default=datetime.datetime.utcnow)
     updated_at = db.Column(db.TIMESTAMP, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
 
+    __table_args__ = (
+        db.Index("ix_projects_user_status", "user_id", "status"),
+    )
+
     # project_item_links = db.relationship("ProjectItemLink", backref="project", lazy=True, cascade="all, delete-orphan")
 
 # class ProjectItemLink(db.Model):
@@ -130,6 +163,10 @@ class CoachingInteraction(db.Model):
     related_item_id_pk = db.Column(db.Integer, nullable=True)
     related_item_type = db.Column(db.String(50), nullable=True)
 
+    __table_args__ = (
+        db.Index("ix_coaching_interactions_user_timestamp", "user_id", "timestamp"), # Recent interactions per user
+    )
+
 class FinancialNote(db.Model):
     __tablename__ = "financial_notes"
     note_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
@@ -144,6 +181,11 @@ class FinancialNote(db.Model):
     created_at = db.Column(db.TIMESTAMP, default=datetime.datetime.utcnow)
     updated_at = db.Column(db.TIMESTAMP, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
 
+    __table_args__ = (
+        db.Index("ix_financial_notes_user_project", "user_id", "project_id"),
+        db.Index("ix_financial_notes_user_created", "user_id", "created_at"), # Activity timeline
+    )
+
 class ApplicationTracking(db.Model):
     __tablename__ = "application_tracking"
     application_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
@@ -159,6 +201,10 @@ class ApplicationTracking(db.Model):
     created_at = db.Column(db.TIMESTAMP, default=datetime.datetime.utcnow)
     updated_at = db.Column(db.TIMESTAMP, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
 
+    __table_args__ = (
+        db.Index("ix_application_tracking_user_deadline", "user_id", "submission_deadline"), # Upcoming deadlines
+    )
+
 # Placeholder for GitHub and other platform-specific data models if needed later
 # class GitHubIssue(db.Model): ...
 # class LinkedInData(db.Model): ...
@@ -0,0 +1,132 @@
+# This is /home/ubuntu/copri_app/src/services/activity_timeline.py
+import base64
+import datetime
+import heapq
+import json
+
+from sqlalchemy import and_, or_
+
+from src.models.copri_models import PlatformConnection, TrelloCard, Email, CalendarEvent, CoachingInteraction, FinancialNote
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+class TimelineSource:
+    """One table in the timeline: its timestamp column, primary key and the columns an item shows."""
+
+    def __init__(self, name, model, timestamp, pk, platform, columns, to_item):
+        self.name = name
+        self.model = model
+        self.timestamp = timestamp
+        self.pk = pk
+        self.platform = platform # Rows belong to this platform's connections; None = user-owned table
+        self.columns = columns
+        self.to_item = to_item
+
+# Tie-break order within one timestamp is the position in this list (later = earlier in the feed).
+SOURCES = [
+    TimelineSource(
+        "trello_card", TrelloCard, TrelloCard.last_activity_date, TrelloCard.card_id_pk, "Trello",
+        (TrelloCard.name, TrelloCard.due_date, TrelloCard.url),
+        lambda row: {"title": row.name, "due_date": row.due_date.isoformat() if row.due_date else None, "url": row.url},
+    ),
+    TimelineSource(
+        "email", Email, Email.received_date, Email.email_id_pk, "Gmail",
+        (Email.subject, Email.sender, Email.snippet, Email.is_read),
+        lambda row: {"title": row.subject, "sender": row.sender, "snippet": row.snippet, "is_read": row.is_read},
+    ),
+    TimelineSource(
+        "calendar_event", CalendarEvent, CalendarEvent.start_time, CalendarEvent.event_id_pk, "GoogleCalendar",
+        (CalendarEvent.summary, CalendarEvent.end_time, CalendarEvent.location),
+        lambda row: {"title": row.summary, "end_time": row.end_time.isoformat() if row.end_time else None, "location": row.location},
+    ),
+    TimelineSource(
+        "coaching_interaction", CoachingInteraction, CoachingInteraction.timestamp, CoachingInteraction.interaction_id, None,
+        (CoachingInteraction.interaction_type, CoachingInteraction.question_asked, CoachingInteraction.user_response),
+        lambda row: {"title": row.question_asked, "interaction_type": row.interaction_type, "user_response": row.user_response},
+    ),
+    TimelineSource(
+        "financial_note", FinancialNote, FinancialNote.created_at, FinancialNote.note_id, None,
+        (FinancialNote.description, FinancialNote.amount, FinancialNote.currency, FinancialNote.type),
+        lambda row: {"title": row.description, "amount": float(row.amount) if row.amount is not None else None, "currency": row.currency, "note_type": row.type},
+    ),
+]
+SOURCE_RANK = {source.name: rank for rank, source in enumerate(SOURCES)}
+TIMELINE_TYPES = tuple(SOURCE_RANK)
+
+def encode_cursor(timestamp, item_type, pk):
+    raw = json.dumps([timestamp.isoformat(), SOURCE_RANK[item_type], pk], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    """(timestamp, type rank, pk) from an opaque cursor. Raises ValueError if it is malformed."""
+    try:
+        timestamp, rank, pk = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return datetime.datetime.fromisoformat(timestamp), int(rank), int(pk)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid timeline cursor: {cursor!r}") from e
+
+def _after_cursor(source, rank, cursor):
+    """Rows that sort after cursor in (timestamp DESC, type rank DESC, pk DESC) order."""
+    timestamp, cursor_rank, cursor_pk = cursor
+    if rank < cursor_rank:
+        return source.timestamp <= timestamp
+    if rank > cursor_rank:
+        return source.timestamp < timestamp
+    # The redundant timestamp <= bound gives the planner an index range; a bare OR would scan from the top.
+    return and_(source.timestamp <= timestamp, or_(source.timestamp < timestamp, source.pk < cursor_pk))
+
+def _stream(source, rank, owner_filter, cursor, since, until, limit):
+    """At most limit rows of one source (for one connection or user), newest first, via its (owner, timestamp) index."""
+    query = (
+        source.model.query
+        .with_entities(source.timestamp.label("timestamp"), source.pk.label("pk"), *source.columns)
+        .filter(owner_filter, source.timestamp.isnot(None))
+    )
+    if cursor is not None:
+        query = query.filter(_after_cursor(source, rank, cursor))
+    if since is not None:
+        query = query.filter(source.timestamp >= since)
+    if until is not None:
+        query = query.filter(source.timestamp < until)
+    rows = query.order_by(source.timestamp.desc(), source.pk.desc()).limit(limit).all()
+    return ((row.timestamp, rank, row.pk, source, row) for row in rows)
+
+def timeline_page(user_id, cursor=None, limit=DEFAULT_PAGE_SIZE, types=None, since=None, until=None):
+    """One page of the user's activity across all sources, newest first.
+
+    Keyset pagination: the cursor is the (timestamp, type, pk) of the last item served, and
+    every stream (one per platform connection or user-owned table) seeks straight to it
+    through its (owner, timestamp) index and reads at most limit + 1 rows. Page cost
+    depends on limit and the number of streams, not on how deep the client has scrolled.
+    types restricts the feed to some of TIMELINE_TYPES. Returns {"items", "next_cursor"}.
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    wanted = set(types or TIMELINE_TYPES)
+    unknown = wanted - set(TIMELINE_TYPES)
+    if unknown:
+        raise ValueError(f"Unknown timeline type(s): {sorted(unknown)}")
+    position = decode_cursor(cursor) if cursor else None
+    connections = (
+        PlatformConnection.query.with_entities(PlatformConnection.connection_id, PlatformConnection.platform_name)
+        .filter(PlatformConnection.user_id == user_id).all()
+    )
+    streams = []
+    for rank, source in enumerate(SOURCES):
+        if source.name not in wanted:
+            continue
+        if source.platform is None:
+            owners = [source.model.user_id == user_id]
+        else:
+            owners = [source.model.connection_id == connection.connection_id for connection in connections if connection.platform_name == source.platform]
+        for owner_filter in owners:
+            streams.append(_stream(source, rank, owner_filter, position, since, until, limit + 1))
+
+    items = []
+    last = None
+    for _, _, _, source, row in heapq.merge(*streams, key=lambda entry: entry[:3], reverse=True):
+        if len(items) == limit:
+            return {"items": items, "next_cursor": encode_cursor(*last)}
+        items.append({"type": source.name, "pk": row.pk, "timestamp": row.timestamp.isoformat(), **source.to_item(row)})
+        last = (row.timestamp, source.name, row.pk)
+    return {"items": items, "next_cursor": None}
@@ -0,0 +1,102 @@
+# This is /home/ubuntu/copri_app/src/services/bulk_upsert.py
+import datetime
+import itertools
+
+from sqlalchemy import select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from src.database import db
+from src.models.copri_models import TrelloCard, Email, CalendarEvent
+
+DEFAULT_CHUNK_SIZE = 2000 # Rows per statement/transaction; stays well under SQLite's bound-parameter limit
+
+# Natural (platform) keys used to detect conflicts for each ingested model, unique per connection.
+OWNER_COLUMN = "connection_id"
+NATURAL_KEYS = {
+    TrelloCard: "trello_card_id",
+    Email: "gmail_message_id",
+    CalendarEvent: "gcal_event_id",
+}
+
+# Bookkeeping columns that never take part in change detection.
+IGNORED_COLUMNS = {"imported_at", "updated_at_copri"}
+
+def _upsert_statement(dialect_name, table, key, update_columns):
+    """Builds a dialect-specific INSERT ... ON CONFLICT / ON DUPLICATE KEY UPDATE statement."""
+    if dialect_name in ("sqlite", "postgresql"):
+        insert = sqlite.insert if dialect_name == "sqlite" else postgresql.insert
+        stmt = insert(table)
+        set_ = {column: stmt.excluded[column] for column in update_columns}
+        if "updated_at_copri" in table.c:
+            set_["updated_at_copri"] = datetime.datetime.utcnow()
+        return stmt.on_conflict_do_update(index_elements=[OWNER_COLUMN, key], set_=set_)
+    if dialect_name in ("mysql", "mariadb"):
+        stmt = mysql.insert(table)
+        set_ = {column: stmt.inserted[column] for column in update_columns}
+        if "updated_at_copri" in table.c:
+            set_["updated_at_copri"] = datetime.datetime.utcnow()
+        return stmt.on_duplicate_key_update(**set_)
+    raise ValueError(f"Bulk upsert is not supported for dialect '{dialect_name}'.")
+
+def _chunks(rows, size):
+    iterator = iter(rows)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def bulk_upsert(model, rows, chunk_size=DEFAULT_CHUNK_SIZE, commit=True, session=None, changed_keys=None):
+    """Inserts or updates rows (dicts of column values) keyed on (connection_id, the model's natural key).
+
+    Each chunk costs one SELECT of the existing rows plus one batched upsert that only
+    carries new or changed rows. rows may be any iterable (including a generator), so
+    arbitrarily large imports stream through in chunk_size pieces.
+    With commit=True every chunk is its own transaction; with commit=False the caller
+    owns the transaction (e.g. to advance a sync checkpoint atomically).
+    Every row must carry connection_id; rows of another connection with the same platform ID are
+    never touched. If changed_keys (a set) is given, the natural keys of inserted and updated rows
+    are added to it.
+    Returns {"inserted": n, "updated": n, "unchanged": n}.
+    """
+    session = session or db.session
+    key = NATURAL_KEYS[model]
+    table = model.__table__
+    key_column = table.c[key]
+    owner_column = table.c[OWNER_COLUMN]
+    dialect_name = session.get_bind().dialect.name
+    stats = {"inserted": 0, "updated": 0, "unchanged": 0}
+
+    for chunk in _chunks(rows, chunk_size):
+        by_key = {(row[OWNER_COLUMN], row[key]): row for row in chunk} # Later duplicates of a key win
+        columns = sorted({column for row in by_key.values() for column in row} - {OWNER_COLUMN, key})
+        compared = [table.c[column] for column in columns if column not in IGNORED_COLUMNS]
+        keys_by_owner = {}
+        for owner, row_key in by_key:
+            keys_by_owner.setdefault(owner, []).append(row_key)
+        existing = {}
+        for owner, row_keys in keys_by_owner.items(): # Normally a single connection per call
+            for found in session.execute(select(key_column, *compared).where(owner_column == owner, key_column.in_(row_keys))):
+                existing[(owner, found[0])] = found[1:]
+        pending = []
+        for (owner, row_key), row in by_key.items():
+            current = existing.get((owner, row_key))
+            if current is None:
+                stats["inserted"] += 1
+            elif tuple(row.get(column.name) for column in compared) == tuple(current):
+                stats["unchanged"] += 1
+                continue
+            else:
+                stats["updated"] += 1
+            pending.append(row)
+            if changed_keys is not None:
+                changed_keys.add(row_key)
+        if pending:
+            # executemany needs a uniform key set; absent columns are written as NULL.
+            full_columns = [OWNER_COLUMN, key] + columns
+            params = [{column: row.get(column) for column in full_columns} for row in pending]
+            session.execute(_upsert_statement(dialect_name, table, key, columns), params)
+        if commit:
+            session.commit()
+    print(f"[bulk_upsert] {table.name}: {stats}")
+    return stats
@@ -0,0 +1,191 @@
+# This is /home/ubuntu/copri_app/src/services/calendar_sync_service.py
+import datetime
+import threading
+from collections import OrderedDict
+
+from src.database import db
+from src.integrations.google_calendar_integration import GoogleCalendarIntegration, CalendarSyncTokenExpired, parse_calendar_time
+from src.models.copri_models import CalendarEvent
+from src.services.bulk_upsert import bulk_upsert
+from src.services.free_busy_index import free_busy_indexes
+from src.services.prioritization_engine import CALENDAR_EVENT
+from src.services.priority_cache import priority_scores
+from src.services import search_index
+
+SYNC_TOKENS_STATE_KEY = "calendar_sync_tokens"
+DELETE_CHUNK_SIZE = 500
+RECURRENCE_CACHE_MAX_WINDOWS = 1024
+
+def calendar_row_from_event(event, calendar_id, connection_id):
+    """Maps a Calendar API event onto CalendarEvent column values."""
+    start_time, is_all_day = parse_calendar_time(event.get("start"))
+    end_time, _ = parse_calendar_time(event.get("end"))
+    return {
+        "gcal_event_id": event["id"],
+        "gcal_calendar_id": calendar_id,
+        "connection_id": connection_id,
+        "summary": event.get("summary"),
+        "description": event.get("description"),
+        "start_time": start_time,
+        "end_time": end_time,
+        "is_all_day": is_all_day,
+        "location": event.get("location"),
+        "attendees": [attendee.get("email") for attendee in event.get("attendees", [])],
+        "creator_email": event.get("creator", {}).get("email"),
+        "status_gcal": event.get("status"),
+        "recurrence": event.get("recurrence") or None,
+    }
+
+class RecurrenceCache:
+    """LRU of expanded event instances keyed by (connection, calendar, window start, window end).
+
+    Each calendar carries a version number; a sync that changes anything on a calendar bumps
+    it, which makes every cached window of that calendar stale at once. get() returns the
+    version it saw alongside the entry, and put() stores under that version, so instances
+    fetched before a concurrent invalidate() are never cached as current.
+    """
+
+    def __init__(self, max_windows=RECURRENCE_CACHE_MAX_WINDOWS):
+        self.max_windows = max_windows
+        self._windows = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, connection_id, calendar_id, window_start, window_end):
+        """Returns (instances or None on a miss, calendar version). Read the version before fetching and pass it to put()."""
+        with self._lock:
+            version = self._versions.get((connection_id, calendar_id), 0)
+            key = (connection_id, calendar_id, window_start, window_end)
+            cached = self._windows.get(key)
+            if cached is not None and cached[0] == version:
+                self._windows.move_to_end(key)
+                self.hits += 1
+                return cached[1], version
+            self.misses += 1
+            return None, version
+
+    def put(self, connection_id, calendar_id, window_start, window_end, instances, version):
+        """Caches instances fetched while the calendar was at version. Dropped if a sync has invalidated it since."""
+        with self._lock:
+            if version != self._versions.get((connection_id, calendar_id), 0):
+                return False
+            key = (connection_id, calendar_id, window_start, window_end)
+            self._windows[key] = (version, instances)
+            self._windows.move_to_end(key)
+            while len(self._windows) > self.max_windows:
+                self._windows.popitem(last=False)
+            return True
+
+    def invalidate(self, connection_id, calendar_id):
+        with self._lock:
+            key = (connection_id, calendar_id)
+            self._versions[key] = self._versions.get(key, 0) + 1
+
+recurrence_cache = RecurrenceCache()
+
+class CalendarSyncService:
+    """Keeps calendar_events in step with Google Calendar using per-calendar sync tokens.
+
+    The first sync lists each calendar in full and stores the returned nextSyncToken in
+    PlatformConnection.sync_state; later syncs send that token and only receive changed or
+    deleted events. Recurring events are stored as their master entries; expanded instances
+    for a time window are served from recurrence_cache and refetched only after a sync has
+    changed that calendar.
+    """
+
+    def __init__(self, connection, calendar_client=None, cache=None):
+        self.connection = connection
+        self.calendar = calendar_client or GoogleCalendarIntegration(credentials_info={"token": connection.access_token})
+        self.cache = cache or recurrence_cache
+
+    def sync(self, calendar_ids=("primary",)):
+        """Syncs the given calendars and commits rows plus new sync tokens in one transaction."""
+        connection_id = self.connection.connection_id
+        tokens = dict((self.connection.sync_state or {}).get(SYNC_TOKENS_STATE_KEY, {}))
+        stats = {"inserted": 0, "updated": 0, "unchanged": 0, "deleted": 0, "full_syncs": 0}
+        changed_calendars, upserted_rows, deleted_ids = [], [], []
+        changed_ids = set()
+        try:
+            for calendar_id in calendar_ids:
+                full_sync = calendar_id not in tokens
+                try:
+                    events, next_token = self.calendar.list_changed_events(calendar_id, tokens.get(calendar_id))
+                except CalendarSyncTokenExpired as e:
+                    print(f"[CalendarSyncService] {e} Running a full sync.")
+                    full_sync = True
+                    events, next_token = self.calendar.list_changed_events(calendar_id)
+                stats["full_syncs"] += int(full_sync)
+
+                live = [event for event in events if event.get("status") != "cancelled"]
+                cancelled_ids = [event["id"] for event in events if event.get("status") == "cancelled"]
+                rows = [calendar_row_from_event(event, calendar_id, connection_id) for event in live]
+                result = bulk_upsert(CalendarEvent, rows, commit=False, changed_keys=changed_ids)
+                for key in ("inserted", "updated", "unchanged"):
+                    stats[key] += result[key]
+                if full_sync:
+                    # A full listing is authoritative: drop rows for events that no longer exist.
+                    live_ids = {event["id"] for event in live}
+                    stored_ids = {
+                        row.gcal_event_id for row in CalendarEvent.query.with_entities(CalendarEvent.gcal_event_id)
+                        .filter_by(connection_id=connection_id, gcal_calendar_id=calendar_id)
+                    }
+                    cancelled_ids = list(set(cancelled_ids) | (stored_ids - live_ids))
+                search_index.index_keys("calendar_event", [row["gcal_event_id"] for row in rows if row["gcal_event_id"] in changed_ids], connection_id)
+                search_index.remove_keys("calendar_event", cancelled_ids, connection_id) # Before the rows (and their pks) are gone
+                for start in range(0, len(cancelled_ids), DELETE_CHUNK_SIZE):
+                    stats["deleted"] += CalendarEvent.query.filter(
+                        CalendarEvent.connection_id == connection_id,
+                        CalendarEvent.gcal_event_id.in_(cancelled_ids[start:start + DELETE_CHUNK_SIZE]),
+                    ).delete(synchronize_session=False)
+                if events or full_sync:
+                    changed_calendars.append(calendar_id)
+                upserted_rows.extend(rows)
+                deleted_ids.extend(cancelled_ids)
+                if next_token:
+                    tokens[calendar_id] = next_token
+            self.connection.sync_state = {**(self.connection.sync_state or {}), SYNC_TOKENS_STATE_KEY: tokens}
+            self.connection.last_sync_time = datetime.datetime.utcnow()
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        for calendar_id in changed_calendars:
+            self.cache.invalidate(connection_id, calendar_id)
+        free_busy_indexes.apply(self.connection.user_id, upserted_rows, deleted_ids)
+        priority_scores.mark_dirty(self.connection.user_id, CALENDAR_EVENT, changed_ids | set(deleted_ids))
+        print(f"[CalendarSyncService] Connection {connection_id} synced: {stats}")
+        return stats
+
+    def expanded_instances(self, calendar_id, window_start, window_end):
+        """Returns the event instances (recurrences expanded) overlapping [window_start, window_end)."""
+        connection_id = self.connection.connection_id
+        instances, version = self.cache.get(connection_id, calendar_id, window_start, window_end)
+        if instances is None:
+            instances = []
+            for event in self.calendar.list_event_instances(calendar_id, window_start, window_end):
+                if event.get("status") == "cancelled":
+                    continue
+                start_time, is_all_day = parse_calendar_time(event.get("start"))
+                end_time, _ = parse_calendar_time(event.get("end"))
+                instances.append({
+                    "gcal_event_id": event["id"],
+                    "recurring_event_id": event.get("recurringEventId"),
+                    "summary": event.get("summary"),
+                    "start_time": start_time,
+                    "end_time": end_time,
+                    "is_all_day": is_all_day,
+                })
+            instances = tuple(instances) # Shared between callers, so keep it immutable
+            self.cache.put(connection_id, calendar_id, window_start, window_end, instances, version)
+        return instances
+
+    def upcoming(self, calendar_id="primary", now=None, horizon=datetime.timedelta(days=7), limit=10):
+        """The "what's next" view: the next few instances, served from the expansion cache.
+        The window is aligned to the hour so repeated calls within the hour share one cache entry.
+        """
+        now = now or datetime.datetime.utcnow()
+        window_start = now.replace(minute=0, second=0, microsecond=0)
+        instances = self.expanded_instances(calendar_id, window_start, window_start + horizon)
+        return [instance for instance in instances if instance["end_time"] and instance["end_time"] > now][:limit]
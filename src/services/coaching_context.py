@@ -0,0 +1,91 @@
+# This is /home/ubuntu/copri_app/src/services/coaching_context.py
+from sqlalchemy import func
+from sqlalchemy.orm import load_only, selectinload
+
+from src.database import db
+
+from src.models.copri_models import User, PlatformConnection, Project, CoachingInteraction, FinancialNote, ApplicationTracking
+
+RECENT_INTERACTIONS = 20
+# Queries load_coaching_contexts() runs, whatever the number of users or the size of their data.
+CONTEXT_QUERY_COUNT = 6 # User + four selectin collections + recent interactions
+
+class CoachingContext:
+    """Everything a coaching pass reads about a user, fully loaded up front."""
+
+    def __init__(self, user, recent_interactions):
+        self.user = user
+        self.connections = user.connections
+        self.projects = user.projects
+        self.financial_notes = user.financial_notes
+        self.applications = user.applications
+        self.recent_interactions = recent_interactions
+
+    @property
+    def active_platforms(self):
+        return sorted({connection.platform_name for connection in self.connections if connection.is_active})
+
+    def project_by_id(self, project_id):
+        return next((project for project in self.projects if project.project_id == project_id), None)
+
+    def notes_for_project(self, project_id):
+        return [note for note in self.financial_notes if note.project_id == project_id]
+
+def load_coaching_context(user_id, recent_interactions=RECENT_INTERACTIONS):
+    """Loads one user's CoachingContext, or None if the user does not exist."""
+    return load_coaching_contexts([user_id], recent_interactions).get(user_id)
+
+def load_coaching_contexts(user_ids, recent_interactions=RECENT_INTERACTIONS):
+    """Loads {user_id: CoachingContext} in CONTEXT_QUERY_COUNT queries, however many users or rows there are.
+
+    One-to-many collections use selectin loading (one IN query per collection instead of one
+    query per parent row). Connections skip the encrypted token columns, and the large free-text
+    columns are deferred. The full interaction history is never loaded: a window function picks
+    the latest rows per user in a single query. Missing users are absent from the result.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+    users = (
+        User.query
+        .options(
+            selectinload(User.connections).load_only(
+                PlatformConnection.connection_id, PlatformConnection.user_id, PlatformConnection.platform_name,
+                PlatformConnection.platform_user_id, PlatformConnection.is_active, PlatformConnection.last_sync_time,
+            ),
+            selectinload(User.projects).defer(Project.description),
+            selectinload(User.financial_notes).defer(FinancialNote.notes),
+            selectinload(User.applications).defer(ApplicationTracking.notes),
+        )
+        .filter(User.user_id.in_(user_ids))
+        .all()
+    )
+    if not users:
+        return {}
+    ranked = (
+        db.session.query(
+            CoachingInteraction.interaction_id,
+            func.row_number().over(
+                partition_by=CoachingInteraction.user_id,
+                order_by=(CoachingInteraction.timestamp.desc(), CoachingInteraction.interaction_id.desc()),
+            ).label("position"),
+        )
+        .filter(CoachingInteraction.user_id.in_([user.user_id for user in users]))
+        .subquery()
+    )
+    interactions = (
+        CoachingInteraction.query
+        .options(load_only(
+            CoachingInteraction.interaction_id, CoachingInteraction.user_id, CoachingInteraction.timestamp,
+            CoachingInteraction.interaction_type, CoachingInteraction.question_asked, CoachingInteraction.user_response,
+            CoachingInteraction.related_item_id_pk, CoachingInteraction.related_item_type,
+        ))
+        .join(ranked, ranked.c.interaction_id == CoachingInteraction.interaction_id)
+        .filter(ranked.c.position <= recent_interactions)
+        .order_by(CoachingInteraction.user_id, ranked.c.position)
+        .all()
+    )
+    recent_by_user = {}
+    for interaction in interactions:
+        recent_by_user.setdefault(interaction.user_id, []).append(interaction)
+    return {user.user_id: CoachingContext(user, recent_by_user.get(user.user_id, [])) for user in users}
@@ -1,14 +1,22 @@
 # This is /home/ubuntu/copri_app/src/services/coaching_service.py
-from src.main import db # Assuming db is initialized in src/main.py
+from src.database import db
 from src.models.copri_models import User, CoachingInteraction #, Project, TrelloCard, Email, etc.
+from src.services.coaching_context import load_coaching_context
+from src.services.interaction_log import PendingInteraction, get_interaction_log
+from src.services.priority_cache import priority_scores
 import datetime
 
 class CoachingService:
-    def __init__(self, user_id):
+    def __init__(self, user_id, interaction_log=None):
         self.user_id = user_id
-        self.user = User.query.get(self.user_id)
-        if not self.user:
+        # Loads the user with connections, projects, notes, applications and recent interactions
+        # in a fixed number of queries, so coaching logic never triggers lazy loads.
+        self.context = load_coaching_context(self.user_id)
+        if not self.context:
             raise ValueError(f"User with id {self.user_id} not found.")
+        self.user = self.context.user
+        self.interaction_log = interaction_log or get_interaction_log()
+        self.last_interaction = None # PendingInteraction of the latest question/suggestion
 
     def ask_about_accomplishments(self):
         """Asks the user about their accomplishments."""
@@ -21,8 +29,7 @@ class CoachingService:
             question_asked=question,
             timestamp=datetime.datetime.utcnow()
         )
-        # db.session.add(interaction)
-        # db.session.commit() # This would be handled by the route/controller normally
+        self.last_interaction = self.interaction_log.record(interaction) # Written behind, in batches
         print(f"[CoachingService] Asking user {self.user_id}: {question}")
         return question # Or an object representing the interaction to be displayed
 
@@ -35,15 +42,14 @@ class CoachingService:
             question_asked=question,
             timestamp=datetime.datetime.utcnow()
         )
-        # db.session.add(interaction)
-        # db.session.commit()
+        self.last_interaction = self.interaction_log.record(interaction)
         print(f"[CoachingService] Asking user {self.user_id}: {question}")
         return question
 
     def ask_about_finances_for_scaling(self, project_name=None):
         """Asks about finances related to scaling a business/project."""
         if project_name:
-            question = f"Regarding your project 	{project_name}", what are your current financial considerations for scaling it up?"
+            question = f"Regarding your project '{project_name}', what are your current financial considerations for scaling it up?"
         else:
             question = "What are your current financial considerations for scaling your businesses or projects?"
         
@@ -53,39 +59,48 @@ class CoachingService:
             question_asked=question,
             timestamp=datetime.datetime.utcnow()
         )
-        # db.session.add(interaction)
-        # db.session.commit()
+        self.last_interaction = self.interaction_log.record(interaction)
         print(f"[CoachingService] Asking user {self.user_id}: {question}")
         return question
 
     def record_user_response(self, interaction_id, response_text):
-        """Records the user_s response to a coaching question."""
-        interaction = CoachingInteraction.query.get(interaction_id)
-        if interaction and interaction.user_id == self.user_id:
-            interaction.user_response = response_text
-            interaction.updated_at = datetime.datetime.utcnow()
-            # db.session.commit()
-            print(f"[CoachingService] Recorded response for interaction {interaction_id}")
+        """Records the user_s response to a coaching question.
+        interaction_id may also be the PendingInteraction handle of an interaction not written yet.
+        """
+        if isinstance(interaction_id, PendingInteraction):
+            owner_id = interaction_id.values.get("user_id")
+            label = interaction_id.interaction_id or "(not written yet)"
+        else:
+            owner_id = db.session.query(CoachingInteraction.user_id).filter_by(interaction_id=interaction_id).scalar()
+            label = interaction_id
+        if owner_id == self.user_id:
+            self.interaction_log.respond(interaction_id, self.user_id, response_text)
+            print(f"[CoachingService] Recorded response for interaction {label}")
             return True
-        print(f"[CoachingService] Failed to record response for interaction {interaction_id}")
+        print(f"[CoachingService] Failed to record response for interaction {label}")
         return False
 
-    def suggest_next_moves(self):
-        """Analyzes available data and suggests next moves. Placeholder for complex logic."""
-        # This would involve: 
-        # 1. Fetching data from Trello, Gmail, Calendar, FinancialNotes, Applications etc.
-        # 2. Applying prioritization heuristics (due dates, user-set priorities, keywords, financial goals)
-        # 3. Considering ethical monetization and future prospects.
-        suggestion = "Based on current data, consider focusing on [Placeholder Task/Project] because [Placeholder Reason]."
-        
+    def suggest_next_moves(self, top_k=5):
+        """Ranks open cards, emails, events, projects and applications and suggests what to focus on."""
+        ranked = priority_scores.ranked(self.user_id, k=top_k)
+        if ranked:
+            best = ranked[0]
+            title = best.get("title") or f"{best['item_type']} #{best['item_pk']}"
+            suggestion = f"Based on current data, consider focusing on {best['item_type']} '{title}' because {best['reason']}."
+            if len(ranked) > 1:
+                suggestion += " After that: " + "; ".join(f"{item.get('title') or item['item_type']} ({item['reason']})" for item in ranked[1:]) + "."
+        else:
+            suggestion = "Nothing urgent right now. Consider planning your next milestone."
+
         interaction = CoachingInteraction(
             user_id=self.user_id,
             interaction_type="suggest_next_moves",
             generated_insight_or_suggestion=suggestion,
+            related_item_id_pk=ranked[0]["item_pk"] if ranked else None,
+            related_item_type=ranked[0]["item_type"] if ranked else None,
             timestamp=datetime.datetime.utcnow()
         )
-        # db.session.add(interaction)
-        # db.session.commit()
+        self.last_interaction = self.interaction_log.record(interaction)
         print(f"[CoachingService] Suggesting next moves for user {self.user_id}: {suggestion}")
         return suggestion
 
@@ -0,0 +1,177 @@
+# This is /home/ubuntu/copri_app/src/services/data_export.py
+import csv
+import datetime
+import decimal
+import io
+import json
+import os
+import time
+import zlib
+
+from sqlalchemy import select
+
+from src.database import db
+from src.models.copri_models import User, PlatformConnection, Project, TrelloCard, Email, CalendarEvent, CoachingInteraction, FinancialNote, ApplicationTracking
+
+EXPORT_FORMATS = ("ndjson", "csv")
+STREAM_BATCH_SIZE = int(os.getenv("COPRI_EXPORT_BATCH", "2000")) # Rows fetched per round trip from the server-side cursor
+CHUNK_BYTES = 64 * 1024 # Output is buffered to about this size before each yield
+GZIP_LEVEL = 6
+
+class ExportTable:
+    """One table in the export: how its rows are tied to the user and which columns are left out."""
+
+    def __init__(self, name, model, via_connection=False, excluded=()):
+        self.name = name
+        self.model = model
+        self.via_connection = via_connection # Rows belong to the user's platform connections, not to user_id
+        self.columns = [column for column in model.__table__.columns if column.name not in excluded]
+
+# Credentials never leave the database.
+EXPORT_TABLES = {
+    table.name: table for table in (
+        ExportTable("users", User, excluded=("hashed_password",)),
+        ExportTable("platform_connections", PlatformConnection, excluded=("access_token", "refresh_token")),
+        ExportTable("projects", Project),
+        ExportTable("trello_cards", TrelloCard, via_connection=True),
+        ExportTable("emails", Email, via_connection=True),
+        ExportTable("calendar_events", CalendarEvent, via_connection=True),
+        ExportTable("coaching_interactions", CoachingInteraction),
+        ExportTable("financial_notes", FinancialNote),
+        ExportTable("application_tracking", ApplicationTracking),
+    )
+}
+
+def _plain(value):
+    """JSON-safe form of a column value."""
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, bytes):
+        return value.decode("utf-8", "replace")
+    return value
+
+_json = json.JSONEncoder(separators=(",", ":"), default=_plain).encode # One encoder for every row; json.dumps() with options builds a new one per call
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)): # JSON columns
+        return _json(value)
+    return _plain(value)
+
+def _stream_rows(connection, table, user_id):
+    """Yields the user's rows of one table as tuples, batch by batch from a server-side cursor.
+
+    No ORDER BY: sorting would make the database materialize the whole result before the first row.
+    """
+    streaming = connection.execution_options(yield_per=STREAM_BATCH_SIZE) # Implies stream_results (server-side cursor)
+    model = table.model
+    if table.via_connection:
+        connection_ids = connection.execute(select(PlatformConnection.connection_id).where(PlatformConnection.user_id == user_id)).scalars().all()
+        filters = [model.connection_id == connection_id for connection_id in connection_ids] # One (connection_id, ...) index range each
+    else:
+        filters = [model.user_id == user_id]
+    for condition in filters:
+        result = streaming.execute(select(*table.columns).where(condition))
+        try:
+            for batch in result.partitions():
+                yield from batch
+        finally:
+            result.close() # Releases the server-side cursor if the consumer stops early
+
+def _compressed(chunks):
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS) # gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def _buffered(pieces, chunk_bytes):
+    buffer, size = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_bytes:
+            yield "".join(buffer).encode("utf-8")
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+def _ndjson_lines(connection, tables, user_id, stats):
+    for table in tables:
+        names = [column.name for column in table.columns]
+        count = 0
+        for row in _stream_rows(connection, table, user_id):
+            count += 1
+            yield _json({"table": table.name, "row": dict(zip(names, row))}) + "\n"
+        stats[table.name] = count
+
+def _csv_lines(connection, table, user_id, stats):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.name for column in table.columns])
+    count = 0
+    for row in _stream_rows(connection, table, user_id):
+        count += 1
+        writer.writerow([_csv_value(value) for value in row])
+        if buffer.tell() >= CHUNK_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+    stats[table.name] = count
+
+def _resolve(format, tables):
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {format!r}; use one of {EXPORT_FORMATS}.")
+    names = list(tables or EXPORT_TABLES)
+    unknown = [name for name in names if name not in EXPORT_TABLES]
+    if unknown:
+        raise ValueError(f"Unknown export table(s): {unknown}")
+    if format == "csv" and len(names) != 1:
+        raise ValueError("A CSV export holds one table; pass exactly one table name.")
+    return [EXPORT_TABLES[name] for name in names]
+
+def export_chunks(user_id, format="ndjson", tables=None, compress=False, engine=None, stats=None, chunk_bytes=CHUNK_BYTES):
+    """The user's data as an iterator of byte chunks, for a streaming response or a file.
+
+    Rows are read through server-side cursors in batches of STREAM_BATCH_SIZE and written out as
+    they arrive, so memory stays flat however many emails the user has. NDJSON lines look like
+    {"table": ..., "row": {...}}; CSV covers a single table. Credentials are not exported.
+    Arguments are checked here (ValueError) before anything is read. If stats (a dict) is given,
+    it receives the row count per table as each one finishes.
+    """
+    selected = _resolve(format, tables)
+    engine = engine or db.engine # Resolved now: the iterator may run after the app context is gone
+    stats = {} if stats is None else stats
+
+    def generate():
+        with engine.connect() as connection:
+            if connection.dialect.name in ("postgresql", "mysql", "mariadb"):
+                # One snapshot for every table, so the export is consistent while syncs keep writing.
+                connection = connection.execution_options(isolation_level="REPEATABLE READ")
+            if format == "ndjson":
+                pieces = _ndjson_lines(connection, selected, user_id, stats)
+            else:
+                pieces = _csv_lines(connection, selected[0], user_id, stats)
+            chunks = _buffered(pieces, chunk_bytes)
+            yield from (_compressed(chunks) if compress else chunks)
+
+    return generate()
+
+def export_to_file(user_id, path, format="ndjson", tables=None, compress=False, engine=None):
+    """Writes an export to path. Returns the row count per table."""
+    stats = {}
+    started = time.perf_counter()
+    with open(path, "wb") as output:
+        for chunk in export_chunks(user_id, format=format, tables=tables, compress=compress, engine=engine, stats=stats):
+            output.write(chunk)
+    print(f"[DataExport] Wrote {sum(stats.values())} row(s) for user {user_id} to {path} in {time.perf_counter() - started:.1f}s.")
+    return stats
+
+def export_filename(user_id, format, tables=None, compress=False):
+    name = f"copri-user-{user_id}" + (f"-{tables[0]}" if tables and len(tables) == 1 else "")
+    return f"{name}.{format}" + (".gz" if compress else "")
@@ -0,0 +1,387 @@
+# This is /home/ubuntu/copri_app/src/services/free_busy_index.py
+import datetime
+import random
+import threading
+from collections import OrderedDict
+
+import requests
+
+from src.database import db
+from src.models.copri_models import CalendarEvent, PlatformConnection
+
+DEFAULT_MIN_SLOT = datetime.timedelta(minutes=30)
+EXPANSION_WINDOW = datetime.timedelta(days=7)
+MAX_CACHED_USERS = 256
+
+class _Node:
+    __slots__ = ("start", "end", "key", "priority", "max_end", "left", "right")
+
+    def __init__(self, start, end, key, priority):
+        self.start = start
+        self.end = end
+        self.key = key
+        self.priority = priority
+        self.max_end = end
+        self.left = None
+        self.right = None
+
+def _update(node):
+    max_end = node.end
+    if node.left is not None and node.left.max_end > max_end:
+        max_end = node.left.max_end
+    if node.right is not None and node.right.max_end > max_end:
+        max_end = node.right.max_end
+    node.max_end = max_end
+
+def _split(node, sort_key):
+    """Splits a treap into (< sort_key, >= sort_key)."""
+    if node is None:
+        return None, None
+    if (node.start, node.key) < sort_key:
+        node.right, right = _split(node.right, sort_key)
+        _update(node)
+        return node, right
+    left, node.left = _split(node.left, sort_key)
+    _update(node)
+    return left, node
+
+def _split_first(node):
+    """Detaches the smallest node of a treap. Returns (node, rest)."""
+    if node is None:
+        return None, None
+    if node.left is None:
+        rest = node.right
+        node.right = None
+        return node, rest
+    first, node.left = _split_first(node.left)
+    _update(node)
+    return first, node
+
+def _merge(left, right):
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        _update(left)
+        return left
+    right.left = _merge(left, right.left)
+    _update(right)
+    return right
+
+def _build(items, lo, hi, priorities, depth):
+    """Builds a balanced treap from start-sorted items; priorities fall with depth to keep the heap order."""
+    if lo >= hi:
+        return None
+    mid = (lo + hi) // 2
+    start, end, key = items[mid]
+    node = _Node(start, end, key, priorities[depth])
+    node.left = _build(items, lo, mid, priorities, depth + 1)
+    node.right = _build(items, mid + 1, hi, priorities, depth + 1)
+    _update(node)
+    return node
+
+class IntervalTree:
+    """Treap of [start, end) intervals ordered by (start, key) and augmented with the subtree max end.
+
+    Inserts and removals are O(log n); overlap queries are O(log n + k) because subtrees whose
+    max end is at or before the query start, or whose starts are all at or after the query
+    end, are skipped.
+    """
+
+    def __init__(self, intervals=()):
+        self._intervals = {} # key -> (start, end)
+        for key, start, end in intervals:
+            if start is not None and end is not None and end > start:
+                self._intervals[key] = (start, end) # Duplicate keys: the last interval wins
+        items = sorted(((start, end, key) for key, (start, end) in self._intervals.items()), key=lambda item: (item[0], item[2]))
+        depth = max(1, len(items).bit_length() + 1)
+        # Each level's priority band sits strictly above the next, so the balanced build is a valid treap.
+        priorities = [depth - level + random.random() * 0.5 for level in range(depth + 1)]
+        self._root = _build(items, 0, len(items), priorities, 0)
+
+    def __len__(self):
+        return len(self._intervals)
+
+    def __contains__(self, key):
+        return key in self._intervals
+
+    def insert(self, key, start, end):
+        """Adds or replaces the interval stored under key. Empty or open intervals are removed instead."""
+        self.remove(key)
+        if start is None or end is None or end <= start:
+            return
+        node = _Node(start, end, key, random.random() * (len(self._intervals).bit_length() + 2))
+        left, right = _split(self._root, (start, key))
+        self._root = _merge(_merge(left, node), right)
+        self._intervals[key] = (start, end)
+
+    def remove(self, key):
+        interval = self._intervals.pop(key, None)
+        if interval is None:
+            return False
+        sort_key = (interval[0], key)
+        left, rest = _split(self._root, sort_key)
+        node, right = _split_first(rest)
+        self._root = _merge(left, right)
+        return node is not None
+
+    def overlapping(self, start, end):
+        """Returns [(start, end, key)] for every interval overlapping [start, end), ordered by start."""
+        found = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node.__class__ is tuple:
+                found.append(node)
+                continue
+            if node is None or node.max_end <= start:
+                continue
+            # Push right, self, left so results come off the stack in start order.
+            if node.start < end:
+                stack.append(node.right)
+                if node.end > start:
+                    stack.append((node.start, node.end, node.key))
+            stack.append(node.left)
+        return found
+
+def _merge_busy(intervals, window_start, window_end):
+    """Clips intervals to the window and merges overlaps into sorted disjoint busy blocks."""
+    blocks = []
+    for start, end, _ in intervals:
+        start, end = max(start, window_start), min(end, window_end)
+        if end <= start:
+            continue
+        if blocks and start <= blocks[-1][1]:
+            if end > blocks[-1][1]:
+                blocks[-1][1] = end
+        else:
+            blocks.append([start, end])
+    return blocks
+
+def _week_windows(window_start, window_end):
+    """Monday-aligned week windows covering [window_start, window_end), so expansions of nearby queries share cache entries."""
+    week_start = window_start.replace(hour=0, minute=0, second=0, microsecond=0) - datetime.timedelta(days=window_start.weekday())
+    while week_start < window_end:
+        yield week_start, week_start + EXPANSION_WINDOW
+        week_start += EXPANSION_WINDOW
+
+def expand_with_calendar_sync(connection_id, calendar_id, window_start, window_end):
+    """Default expander: the calendar's instances for the window, through CalendarSyncService and its recurrence cache."""
+    from src.services.calendar_sync_service import CalendarSyncService # That module imports this one
+    connection = db.session.get(PlatformConnection, connection_id)
+    return CalendarSyncService(connection).expanded_instances(calendar_id, window_start, window_end)
+
+class FreeBusyIndex:
+    """Free/busy view of one user's calendar events, answering slot, conflict and utilization queries.
+
+    Keys are gcal_event_id values. Cancelled events and events without both a start and an end
+    are not busy time. Single events live in the interval tree. Recurring masters (rows with a
+    recurrence) only record which calendar the series is on: their busy time in a queried
+    window comes from the series' expanded instances, fetched by expand(connection_id,
+    calendar_id, window_start, window_end) in week-aligned windows (served from the recurrence
+    cache). If an expansion fails, the master's own interval stands in for the series.
+    """
+
+    def __init__(self, user_id, events=(), series=(), expand=expand_with_calendar_sync):
+        """events: (key, start, end) of single events; series: (key, connection_id, calendar_id, start, end) of recurring masters."""
+        self.user_id = user_id
+        self._tree = IntervalTree((key, start, end) for key, start, end in events)
+        self._series = {key: (connection_id, calendar_id, start, end) for key, connection_id, calendar_id, start, end in series}
+        self.expand = expand
+        self._lock = threading.RLock()
+
+    @classmethod
+    def load(cls, user_id, expand=expand_with_calendar_sync):
+        """Builds the index from calendar_events using a column projection (no ORM objects)."""
+        rows = (
+            CalendarEvent.query
+            .join(PlatformConnection, PlatformConnection.connection_id == CalendarEvent.connection_id)
+            .with_entities(
+                CalendarEvent.gcal_event_id, CalendarEvent.start_time, CalendarEvent.end_time, CalendarEvent.recurrence,
+                CalendarEvent.connection_id, CalendarEvent.gcal_calendar_id,
+            )
+            .filter(
+                PlatformConnection.user_id == user_id,
+                CalendarEvent.start_time.isnot(None),
+                CalendarEvent.end_time.isnot(None),
+                (CalendarEvent.status_gcal.is_(None)) | (CalendarEvent.status_gcal != "cancelled"),
+            )
+        )
+        events, series = [], []
+        for row in rows:
+            if row.recurrence:
+                series.append((row.gcal_event_id, row.connection_id, row.gcal_calendar_id, row.start_time, row.end_time))
+            else:
+                events.append((row.gcal_event_id, row.start_time, row.end_time))
+        return cls(user_id, events, series, expand=expand)
+
+    def __len__(self):
+        return len(self._tree) + len(self._series)
+
+    def apply(self, upserted=(), deleted_ids=()):
+        """Applies synced changes. upserted: CalendarEvent row dicts; deleted_ids: gcal_event_ids."""
+        with self._lock:
+            for row in upserted:
+                key = row["gcal_event_id"]
+                self._tree.remove(key)
+                self._series.pop(key, None)
+                if row.get("status_gcal") == "cancelled":
+                    continue
+                if row.get("recurrence"):
+                    if row.get("start_time") is not None and row.get("end_time") is not None:
+                        self._series[key] = (row.get("connection_id"), row.get("gcal_calendar_id"), row["start_time"], row["end_time"])
+                else:
+                    self._tree.insert(key, row.get("start_time"), row.get("end_time"))
+            for event_id in deleted_ids:
+                self._tree.remove(event_id)
+                self._series.pop(event_id, None)
+
+    def _series_intervals(self, series, window_start, window_end, single_keys):
+        """[(start, end, key)] of the instances of series overlapping the window, skipping keys already in single_keys."""
+        calendars = {}
+        for key, (connection_id, calendar_id, start, end) in series.items():
+            calendars.setdefault((connection_id, calendar_id), {})[key] = (start, end)
+        found = {}
+        for (connection_id, calendar_id), masters in calendars.items():
+            try:
+                for expand_start, expand_end in _week_windows(window_start, window_end):
+                    for instance in self.expand(connection_id, calendar_id, expand_start, expand_end):
+                        key = instance["gcal_event_id"]
+                        start, end = instance["start_time"], instance["end_time"]
+                        # Modified occurrences are also stored as single events; the tree already has those.
+                        if instance.get("recurring_event_id") in masters and key not in single_keys and start is not None and end is not None:
+                            found[key] = (start, end, key)
+            except requests.exceptions.RequestException as e:
+                print(f"[FreeBusyIndex] Could not expand recurring events of calendar {calendar_id} (connection {connection_id}): {e}")
+                found.update({key: (start, end, key) for key, (start, end) in masters.items()})
+        return [interval for interval in found.values() if interval[0] < window_end and interval[1] > window_start]
+
+    def _intervals(self, window_start, window_end):
+        with self._lock:
+            intervals = self._tree.overlapping(window_start, window_end)
+            series = dict(self._series)
+        if not series:
+            return intervals
+        # Expanded outside the lock: a cache miss is an API call, and apply() should not wait for it.
+        instances = self._series_intervals(series, window_start, window_end, {interval[2] for interval in intervals})
+        return sorted(intervals + instances, key=lambda interval: (interval[0], interval[2]))
+
+    def conflicts(self, start, end):
+        """Events (recurring instances included) overlapping [start, end) as [(start, end, gcal_event_id)]."""
+        return self._intervals(start, end)
+
+    def busy_blocks(self, window_start, window_end):
+        return [tuple(block) for block in _merge_busy(self._intervals(window_start, window_end), window_start, window_end)]
+
+    def free_slots(self, window_start, window_end, min_duration=DEFAULT_MIN_SLOT, working_hours=None):
+        """Free [start, end) gaps of at least min_duration inside the window.
+        working_hours: optional (first_hour, last_hour) limiting slots to those hours of each day.
+        """
+        if working_hours is None:
+            ranges = [(window_start, window_end)]
+        else:
+            first_hour, last_hour = working_hours
+            ranges = []
+            day = window_start.replace(hour=0, minute=0, second=0, microsecond=0)
+            while day < window_end:
+                start = max(window_start, day + datetime.timedelta(hours=first_hour))
+                end = min(window_end, day + datetime.timedelta(hours=last_hour))
+                if end > start:
+                    ranges.append((start, end))
+                day += datetime.timedelta(days=1)
+        busy = self.busy_blocks(window_start, window_end)
+        slots = []
+        index = 0
+        for range_start, range_end in ranges:
+            while index < len(busy) and busy[index][1] <= range_start:
+                index += 1
+            cursor = range_start
+            position = index
+            while position < len(busy) and busy[position][0] < range_end:
+                if busy[position][0] - cursor >= min_duration:
+                    slots.append((cursor, busy[position][0]))
+                cursor = max(cursor, busy[position][1])
+                position += 1
+            if range_end - cursor >= min_duration:
+                slots.append((cursor, range_end))
+        return slots
+
+    def utilization(self, window_start, window_end):
+        """Fraction of [window_start, window_end) covered by at least one event."""
+        total = (window_end - window_start).total_seconds()
+        if total <= 0:
+            return 0.0
+        busy = sum((end - start).total_seconds() for start, end in self.busy_blocks(window_start, window_end))
+        return busy / total
+
+class FreeBusyIndexRegistry:
+    """Per-user FreeBusyIndex instances, built lazily on first use and kept in a bounded LRU.
+
+    Sync code calls apply() after committing. Users without an index are skipped, since their
+    first query loads the committed rows anyway. Changes that arrive while an index is being
+    built are buffered and replayed onto it before it is registered, so a sync committing
+    after the build's SELECT is never lost (replaying one the SELECT already saw is harmless).
+    """
+
+    def __init__(self, max_users=MAX_CACHED_USERS):
+        self.max_users = max_users
+        self._indexes = OrderedDict()
+        self._building = {} # user_id -> [builder count, [(upserted, deleted_ids)] received during the build]
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is not None:
+                self._indexes.move_to_end(user_id)
+                return index
+            build = self._building.setdefault(user_id, [0, []])
+            build[0] += 1
+        try:
+            index = FreeBusyIndex.load(user_id)
+        except Exception:
+            with self._lock:
+                self._end_build(user_id, build)
+            raise
+        with self._lock:
+            # One critical section: an apply() either lands in the buffer replayed here or finds the registered index.
+            self._end_build(user_id, build)
+            registered = self._indexes.get(user_id)
+            if registered is not None:
+                # Another thread built it meanwhile; keep the one already registered.
+                index = registered
+            else:
+                for upserted, deleted_ids in build[1]:
+                    index.apply(upserted, deleted_ids)
+                self._indexes[user_id] = index
+            self._indexes.move_to_end(user_id)
+            while len(self._indexes) > self.max_users:
+                self._indexes.popitem(last=False)
+        return index
+
+    def _end_build(self, user_id, build):
+        """Caller holds the lock."""
+        build[0] -= 1
+        if not build[0]:
+            self._building.pop(user_id, None)
+
+    def apply(self, user_id, upserted=(), deleted_ids=()):
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is None:
+                build = self._building.get(user_id)
+                if build is not None:
+                    build[1].append((list(upserted), list(deleted_ids)))
+                return
+        index.apply(upserted, deleted_ids)
+
+    def invalidate(self, user_id=None):
+        with self._lock:
+            if user_id is None:
+                self._indexes.clear()
+            else:
+                self._indexes.pop(user_id, None)
+
+free_busy_indexes = FreeBusyIndexRegistry()
@@ -0,0 +1,134 @@
+# This is /home/ubuntu/copri_app/src/services/git_push_service.py
+import base64
+import datetime
+import os
+import subprocess
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_FINISHED_JOBS = 100 # Finished jobs kept around for polling
+
+class GitPushJobRunner:
+    """Runs user-triggered git pushes as background jobs that clients poll by job ID.
+
+    Pushes are serialized on a single worker thread so two jobs never race on the same
+    working tree. Each job computes the changed-file set once and stages exactly those
+    paths, and authenticates the push through a per-process HTTP header instead of writing
+    the PAT into the remote URL.
+    """
+
+    def __init__(self, repo_path, github_user, branch="main", remote="origin"):
+        self.repo_path = repo_path
+        self.github_user = github_user
+        self.branch = branch
+        self.remote = remote
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="copri-git-push")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, pat, on_success=None):
+        """Queues a push and returns its job ID immediately."""
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "status": "queued",
+            "created_at": datetime.datetime.utcnow().isoformat() + "Z",
+            "finished_at": None,
+            "changed_files": None,
+            "stages": [],
+            "message": None,
+            "details": None,
+            "error": None,
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            self._prune()
+        self._executor.submit(self._run, job, pat, on_success)
+        return job_id
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return {**job, "stages": list(job["stages"])} if job else None
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job["finished_at"]]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+    def _update(self, job, **fields):
+        with self._lock:
+            job.update(fields)
+
+    def _git(self, job, stage, args, env=None, input_data=None):
+        """Runs one git command and records how long it took."""
+        started = time.perf_counter()
+        try:
+            return subprocess.run(["git", *args], cwd=self.repo_path, capture_output=True, input=input_data, env=env, check=True)
+        finally:
+            with self._lock:
+                job["stages"].append({"stage": stage, "duration_ms": round((time.perf_counter() - started) * 1000, 1)})
+
+    def _run(self, job, pat, on_success):
+        self._update(job, status="running")
+        try:
+            status = self._git(job, "status", ["status", "--porcelain", "-z", "--untracked-files=all"])
+            changed_paths, unstaged_paths = _parse_porcelain_z(status.stdout)
+            self._update(job, changed_files=len(changed_paths))
+            if not changed_paths:
+                self._update(job, status="no_changes", message="No changes to push.")
+                return
+
+            # Stage exactly the paths found above instead of re-scanning the tree with "git add .".
+            if unstaged_paths:
+                self._git(job, "add", ["--literal-pathspecs", "add", "-A", "--pathspec-from-file=-", "--pathspec-file-nul"], input_data=b"\0".join(unstaged_paths))
+            commit_message = f"CoPri: User-triggered update - {datetime.datetime.utcnow().isoformat()}Z"
+            self._git(job, "commit", ["commit", "-m", commit_message])
+
+            # The PAT only ever lives in this child's environment; the remote URL stays untouched.
+            credentials = base64.b64encode(f"{self.github_user}:{pat}".encode("utf-8")).decode("ascii")
+            env = {
+                **os.environ,
+                "GIT_TERMINAL_PROMPT": "0",
+                "GIT_CONFIG_COUNT": "1",
+                "GIT_CONFIG_KEY_0": "http.https://github.com/.extraheader",
+                "GIT_CONFIG_VALUE_0": f"Authorization: Basic {credentials}",
+            }
+            push = self._git(job, "push", ["push", self.remote, f"HEAD:{self.branch}"], env=env)
+            self._update(job, status="succeeded", message="Updates pushed to GitHub successfully.", details=push.stderr.decode("utf-8", "replace"))
+            if on_success:
+                on_success()
+        except subprocess.CalledProcessError as e:
+            stderr = (e.stderr or b"").decode("utf-8", "replace")
+            stdout = (e.stdout or b"").decode("utf-8", "replace")
+            error_message = f"Git command failed: {e.cmd}\nStderr: {stderr}\nStdout: {stdout}"
+            print(error_message)
+            self._update(job, status="failed", message="Failed to push updates to GitHub.", error=error_message)
+        except Exception as e:
+            print(f"An unexpected error occurred during git push job {job['job_id']}: {e}")
+            self._update(job, status="failed", message="An unexpected error occurred.", error=str(e))
+        finally:
+            self._update(job, finished_at=datetime.datetime.utcnow().isoformat() + "Z")
+
+def _parse_porcelain_z(output):
+    """Parses `git status --porcelain -z` output.
+    Returns (changed_paths, unstaged_paths): every path in the change set, and the subset with
+    work-tree changes that still need staging (fully staged entries are already in the index).
+    """
+    changed_paths, unstaged_paths = [], []
+    entries = output.split(b"\0")
+    i = 0
+    while i < len(entries):
+        entry = entries[i]
+        i += 1
+        if len(entry) < 4:
+            continue
+        index_status, worktree_status, path = entry[0:1], entry[1:2], entry[3:]
+        changed_paths.append(path)
+        if worktree_status != b" ":
+            unstaged_paths.append(path)
+        if index_status in (b"R", b"C"):
+            i += 1 # The rename/copy source follows as its own entry and is already staged
+    return changed_paths, unstaged_paths
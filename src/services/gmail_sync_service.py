@@ -0,0 +1,208 @@
+# This is /home/ubuntu/copri_app/src/services/gmail_sync_service.py
+import datetime
+import itertools
+
+from src.database import db
+from src.integrations.gmail_integration import GmailIntegration, GmailHistoryExpired, GmailFetchIncomplete
+from src.models.copri_models import Email
+from src.services.bulk_upsert import bulk_upsert
+from src.services.prioritization_engine import EMAIL
+from src.services.priority_cache import priority_scores
+from src.services import search_index
+
+HYDRATION_CHUNK_SIZE = 500 # Message IDs checked against the database / hydrated per round
+HISTORY_STATE_KEY = "gmail_history_id"
+
+def email_row_from_metadata(message, connection_id):
+    """Maps a metadata-format Gmail message onto Email column values."""
+    headers = {header["name"].lower(): header["value"] for header in message.get("payload", {}).get("headers", [])}
+    labels = message.get("labelIds", [])
+    internal_date = message.get("internalDate")
+    return {
+        "gmail_message_id": message["id"],
+        "gmail_thread_id": message.get("threadId"),
+        "connection_id": connection_id,
+        "sender": headers.get("from"),
+        "recipients_to": headers.get("to"),
+        "recipients_cc": headers.get("cc"),
+        "subject": headers.get("subject"),
+        "snippet": message.get("snippet"),
+        "received_date": datetime.datetime.utcfromtimestamp(int(internal_date) / 1000) if internal_date else None,
+        "labels_gmail": labels,
+        "is_read": "UNREAD" not in labels,
+        "is_important": "IMPORTANT" in labels,
+    }
+
+def _label_columns(labels):
+    return {"labels_gmail": labels, "is_read": "UNREAD" not in labels, "is_important": "IMPORTANT" in labels}
+
+class GmailSyncService:
+    """Imports Gmail messages into the emails table.
+
+    Message IDs are listed in pages of 500, IDs already stored are skipped, and the rest are
+    hydrated through metadata-only batch requests (100 messages per HTTP call) and streamed
+    into bulk_upsert without ever holding the whole mailbox in memory.
+
+    sync() does that once, then keeps a historyId checkpoint in PlatformConnection.sync_state
+    and afterwards only reads users.history, so steady-state cost follows new mail rather
+    than mailbox size. The checkpoint only moves when every listed or added message was
+    hydrated; otherwise the fetched rows are kept, the old checkpoint stays, and the next run
+    replays the same history (stored messages are skipped).
+    """
+
+    def __init__(self, connection, gmail_client=None):
+        self.connection = connection
+        self.gmail = gmail_client or GmailIntegration(credentials_info={"token": connection.access_token})
+        self.unfetched_ids = [] # Message IDs the last run could not hydrate
+        self.listing_error = None # Set when the last run's listing stopped early
+
+    def sync(self):
+        """Runs an incremental sync, falling back to a full import on first run or expired history."""
+        history_id = (self.connection.sync_state or {}).get(HISTORY_STATE_KEY)
+        if history_id:
+            try:
+                return self._incremental_sync(history_id)
+            except GmailHistoryExpired as e:
+                print(f"[GmailSyncService] {e} Falling back to a full import for connection {self.connection.connection_id}.")
+        # Read the checkpoint before listing, so mail arriving during the import is replayed next time.
+        start_history_id = self.gmail.get_profile()["historyId"]
+        stats = self.full_import()
+        stats["complete"] = self._complete()
+        if stats["complete"]:
+            self._save_checkpoint(start_history_id)
+            db.session.commit()
+        else:
+            print(f"[GmailSyncService] Full import of connection {self.connection.connection_id} incomplete ({self._incomplete_reason()}); checkpoint not saved.")
+        priority_scores.invalidate(self.connection.user_id) # Bulk import: rebuild the user's scores on next read
+        search_index.rebuild(source_names=["email"], connection_id=self.connection.connection_id)
+        return stats
+
+    def _incremental_sync(self, history_id):
+        self._reset_fetch_state()
+        records, latest_history_id = self.gmail.list_history(history_id)
+        threads = {} # threadId -> {"added": set, "deleted": set, "labels": {message_id: labelIds}}
+        for record in records:
+            for change in record.get("messagesAdded", []):
+                message = change["message"]
+                thread = threads.setdefault(message.get("threadId"), {"added": set(), "deleted": set(), "labels": {}})
+                thread["added"].add(message["id"])
+                thread["deleted"].discard(message["id"])
+            for change in record.get("messagesDeleted", []):
+                message = change["message"]
+                thread = threads.setdefault(message.get("threadId"), {"added": set(), "deleted": set(), "labels": {}})
+                thread["added"].discard(message["id"])
+                thread["deleted"].add(message["id"])
+                thread["labels"].pop(message["id"], None)
+            for change in record.get("labelsAdded", []) + record.get("labelsRemoved", []):
+                message = change["message"]
+                thread = threads.setdefault(message.get("threadId"), {"added": set(), "deleted": set(), "labels": {}})
+                if message["id"] not in thread["deleted"] and "labelIds" in message:
+                    thread["labels"][message["id"]] = message["labelIds"] # History is ordered, so the last state wins
+
+        # Each thread is resolved once, however many replies or label flips it saw.
+        to_hydrate, to_delete, label_updates = [], set(), {}
+        for thread_id, thread in threads.items():
+            to_hydrate.extend(thread["added"])
+            to_delete |= thread["deleted"]
+            for message_id, labels in thread["labels"].items():
+                if message_id not in thread["added"]:
+                    label_updates[message_id] = (thread_id, labels)
+
+        connection_id = self.connection.connection_id
+        changed_ids = set()
+        try:
+            stats = bulk_upsert(Email, self._email_rows(to_hydrate, skip_existing=True), commit=False, changed_keys=changed_ids)
+            stored = set()
+            label_ids = list(label_updates)
+            for start in range(0, len(label_ids), HYDRATION_CHUNK_SIZE):
+                chunk = label_ids[start:start + HYDRATION_CHUNK_SIZE]
+                stored |= {
+                    row.gmail_message_id
+                    for row in Email.query.with_entities(Email.gmail_message_id).filter(Email.connection_id == connection_id, Email.gmail_message_id.in_(chunk))
+                }
+            label_rows = (
+                {"gmail_message_id": message_id, "gmail_thread_id": thread_id, "connection_id": connection_id, **_label_columns(labels)}
+                for message_id, (thread_id, labels) in label_updates.items() if message_id in stored
+            )
+            label_stats = bulk_upsert(Email, label_rows, commit=False, changed_keys=changed_ids)
+            stats["labels_updated"] = label_stats["updated"]
+            stats["deleted"] = 0
+            deleted = list(to_delete)
+            search_index.index_keys("email", changed_ids, connection_id)
+            search_index.remove_keys("email", deleted, connection_id) # Before the rows (and their pks) are gone
+            for start in range(0, len(deleted), HYDRATION_CHUNK_SIZE):
+                stats["deleted"] += Email.query.filter(
+                    Email.connection_id == connection_id,
+                    Email.gmail_message_id.in_(deleted[start:start + HYDRATION_CHUNK_SIZE]),
+                ).delete(synchronize_session=False)
+            stats["complete"] = self._complete()
+            if stats["complete"]:
+                self._save_checkpoint(latest_history_id)
+            else:
+                print(f"[GmailSyncService] Connection {connection_id} keeps history {history_id} ({self._incomplete_reason()}).")
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        priority_scores.mark_dirty(self.connection.user_id, EMAIL, changed_ids | to_delete)
+        stats["history_records"] = len(records)
+        stats["threads_touched"] = len(threads)
+        print(f"[GmailSyncService] Connection {connection_id} synced incrementally: {stats}")
+        return stats
+
+    def _reset_fetch_state(self):
+        self.unfetched_ids = []
+        self.listing_error = None
+
+    def _complete(self):
+        return not self.unfetched_ids and self.listing_error is None
+
+    def _incomplete_reason(self):
+        if self.listing_error is not None:
+            return f"listing failed: {self.listing_error}"
+        return f"{len(self.unfetched_ids)} message(s) not fetched"
+
+    def _save_checkpoint(self, history_id):
+        self.connection.sync_state = {**(self.connection.sync_state or {}), HISTORY_STATE_KEY: str(history_id)}
+        self.connection.last_sync_time = datetime.datetime.utcnow()
+
+    def full_import(self, query=""):
+        """Lists every message matching query and hydrates the ones not stored yet.
+        Check unfetched_ids / listing_error afterwards: a failed listing or hydration does not raise.
+        """
+        self._reset_fetch_state()
+        return self.hydrate(message["id"] for message in self.gmail.iter_message_ids(query=query))
+
+    def hydrate(self, message_ids, skip_existing=True, commit=True):
+        """Fetches metadata for message_ids in batches and upserts them as Email rows."""
+        return bulk_upsert(Email, self._email_rows(message_ids, skip_existing), commit=commit)
+
+    def _email_rows(self, message_ids, skip_existing):
+        """Yields Email rows for message_ids. Failures are recorded in unfetched_ids / listing_error, so the
+        rows that were fetched still get written."""
+        iterator = iter(message_ids)
+        while True:
+            try:
+                chunk = []
+                chunk.extend(itertools.islice(iterator, HYDRATION_CHUNK_SIZE)) # Keeps the IDs listed before a failure
+            except GmailFetchIncomplete as e:
+                self.listing_error = e
+                yield from self._hydrate_chunk(chunk, skip_existing)
+                return
+            if not chunk:
+                return
+            yield from self._hydrate_chunk(chunk, skip_existing)
+
+    def _hydrate_chunk(self, chunk, skip_existing):
+        connection_id = self.connection.connection_id
+        if skip_existing and chunk:
+            stored = {
+                row.gmail_message_id
+                for row in Email.query.with_entities(Email.gmail_message_id).filter(Email.connection_id == connection_id, Email.gmail_message_id.in_(chunk))
+            }
+            chunk = [message_id for message_id in chunk if message_id not in stored]
+        try:
+            for message in self.gmail.batch_get_message_metadata(chunk):
+                yield email_row_from_metadata(message, connection_id)
+        except GmailFetchIncomplete as e:
+            self.unfetched_ids.extend(e.message_ids)
@@ -0,0 +1,351 @@
+# This is /home/ubuntu/copri_app/src/services/interaction_log.py
+import atexit
+import datetime
+import json
+import os
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import bindparam, exc, insert, update
+
+from src.database import db
+from src.integrations.rate_limiter import BACKOFF_MAX_SECONDS
+from src.models.copri_models import CoachingInteraction
+from src.services import search_index
+
+DEFAULT_MAX_BATCH = int(os.getenv("COPRI_INTERACTION_LOG_BATCH", "200"))           # Flush once this many writes are queued
+DEFAULT_FLUSH_INTERVAL = float(os.getenv("COPRI_INTERACTION_LOG_INTERVAL", "2.0"))  # ...or after this many seconds
+MAX_BUFFERED = 20000 # Past this, record() flushes inline instead of letting the queue grow
+# Optional append-only spool file: queued writes are replayed from it after a crash.
+DEFAULT_SPOOL_PATH = os.getenv("COPRI_INTERACTION_SPOOL")
+# Failed flushes in a row before the queue is written row by row and rows that still fail are set aside.
+DEFAULT_MAX_ATTEMPTS = int(os.getenv("COPRI_INTERACTION_LOG_MAX_ATTEMPTS", "5"))
+
+INTERACTION_COLUMNS = [column.name for column in CoachingInteraction.__table__.columns if column.name != "interaction_id"]
+
+class PendingInteraction:
+    """Handle for a queued interaction; interaction_id is filled in once the batch is written."""
+
+    def __init__(self, values):
+        self.values = values
+        self.interaction_id = None
+        self.in_flight = False
+        self.late_response = None # Response given while the INSERT was being written
+        self.rejected = False
+        self._written = threading.Event()
+
+    def wait(self, timeout=None):
+        """Blocks until the interaction is in the database. Returns its interaction_id (or None on timeout or if it was rejected)."""
+        self._written.wait(timeout)
+        return self.interaction_id
+
+class InteractionLog:
+    """Write-behind log for CoachingInteraction rows.
+
+    record() and respond() only queue the write. A background thread flushes the queue as one
+    executemany INSERT (plus one executemany UPDATE for responses) in a single commit, whenever
+    max_batch writes are waiting or flush_interval seconds have passed. close() runs at interpreter
+    exit and flushes whatever is left. With a spool file, queued writes also survive a crash and
+    are replayed on the next start (at-least-once: a crash mid-flush can replay a written batch);
+    the spool is rewritten after every flush so it only holds what is still queued.
+
+    A failed flush is retried with exponential backoff. After max_attempts failures in a row the
+    next flush writes each row in its own transaction, and rows that fail on their own are set
+    aside in rejected (and <spool>.rejected) instead of blocking the queue. A connection error
+    stops that pass and leaves the remaining rows queued, so an outage never rejects anything.
+    """
+
+    def __init__(self, app=None, max_batch=DEFAULT_MAX_BATCH, flush_interval=DEFAULT_FLUSH_INTERVAL, spool_path=DEFAULT_SPOOL_PATH,
+                 max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.app = app or current_app._get_current_object()
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.spool_path = spool_path
+        self.max_attempts = max_attempts
+        self.rejected_path = f"{spool_path}.rejected" if spool_path else None
+        self._pending = []    # PendingInteraction objects not yet inserted
+        self._responses = {}  # interaction_id -> (user_id, response text); later responses win
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._spool = None
+        self._failed_flushes = 0 # Consecutive failed flushes
+        self._retry_at = 0.0     # time.monotonic() before which the background thread does not retry
+        self.flushes = 0
+        self.rows_written = 0
+        self.rejected = [] # Spool-format entries that could not be written on their own
+        if self.spool_path:
+            self._recover_spool()
+            self._spool = open(self.spool_path, "a", encoding="utf-8")
+            with self._lock:
+                self._compact_spool() # Keeps recovered writes spooled until they are flushed
+        self._thread = threading.Thread(target=self._run, name="copri-interaction-log", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def record(self, interaction=None, **values):
+        """Queues a new interaction, given as a transient CoachingInteraction or as column values."""
+        if interaction is not None:
+            values = {column: getattr(interaction, column) for column in INTERACTION_COLUMNS if getattr(interaction, column) is not None}
+        values.setdefault("timestamp", datetime.datetime.utcnow())
+        handle = PendingInteraction(values)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("InteractionLog is closed.")
+            self._pending.append(handle)
+            self._spool_write({"op": "insert", "values": values})
+            queued = len(self._pending) + len(self._responses)
+        self._after_enqueue(queued)
+        return handle
+
+    def respond(self, target, user_id, response_text):
+        """Queues a user response. target is an interaction_id or a PendingInteraction."""
+        with self._lock:
+            if isinstance(target, PendingInteraction) and target.interaction_id is None:
+                if target.in_flight:
+                    target.late_response = (user_id, response_text) # Applied once the INSERT returns its ID
+                else:
+                    target.values["user_response"] = response_text # Still queued: fold into the INSERT
+                self._spool_write({"op": "insert_response", "values": {**target.values, "user_response": response_text}})
+            else:
+                interaction_id = target.interaction_id if isinstance(target, PendingInteraction) else target
+                self._responses[interaction_id] = (user_id, response_text)
+                self._spool_write({"op": "respond", "interaction_id": interaction_id, "user_id": user_id, "response": response_text})
+            queued = len(self._pending) + len(self._responses)
+        self._after_enqueue(queued)
+
+    def _after_enqueue(self, queued):
+        if queued >= MAX_BUFFERED and time.monotonic() >= self._retry_at:
+            self.flush() # Backpressure: the writer is not keeping up
+        elif queued >= self.max_batch:
+            self._wakeup.set()
+
+    def flush(self):
+        """Writes everything queued so far in one transaction. Returns the number of rows written."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+                responses, self._responses = self._responses, {}
+                for handle in pending:
+                    handle.in_flight = True
+            if not pending and not responses:
+                return 0
+            unwritten, unwritten_responses = [], {}
+            try:
+                with self.app.app_context():
+                    if self._failed_flushes >= self.max_attempts:
+                        pending, responses, unwritten, unwritten_responses = self._write_isolated(pending, responses)
+                    else:
+                        self._write(pending, responses)
+            except Exception as e:
+                self._record_failure()
+                print(f"[InteractionLog] Flush of {len(pending)} insert(s) and {len(responses)} response(s) failed "
+                      f"(attempt {self._failed_flushes} of {self.max_attempts}), will retry: {e}")
+                self._requeue(pending, responses)
+                return 0
+            if unwritten or unwritten_responses:
+                self._record_failure() # The row-by-row pass hit a connection error
+                self._requeue(unwritten, unwritten_responses)
+            else:
+                self._failed_flushes = 0
+                self._retry_at = 0.0
+            with self._lock:
+                for handle in pending:
+                    handle.in_flight = False
+                    if handle.late_response is not None:
+                        self._responses[handle.interaction_id] = handle.late_response
+                        handle.late_response = None
+                self._compact_spool() # Everything written so far is in the database
+            for handle in pending:
+                handle._written.set()
+            self.flushes += 1
+            self.rows_written += len(pending) + len(responses)
+            return len(pending) + len(responses)
+
+    def _record_failure(self):
+        self._failed_flushes += 1
+        self._retry_at = time.monotonic() + min(BACKOFF_MAX_SECONDS, self.flush_interval * 2 ** self._failed_flushes)
+
+    def _requeue(self, pending, responses):
+        """Puts writes from a failed flush back at the front of the queue."""
+        with self._lock:
+            for handle in pending:
+                handle.in_flight = False
+                if handle.late_response is not None:
+                    handle.values["user_response"] = handle.late_response[1]
+                    handle.late_response = None
+            self._pending[:0] = pending
+            for interaction_id, response in responses.items():
+                self._responses.setdefault(interaction_id, response)
+
+    def _write_isolated(self, pending, responses):
+        """Writes each insert and response in its own transaction, setting aside the ones that fail.
+        Returns (written inserts, written responses, unwritten inserts, unwritten responses); the
+        unwritten ones are what was left when a connection error stopped the pass.
+        """
+        print(f"[InteractionLog] {self._failed_flushes} flushes failed in a row; writing {len(pending)} insert(s) and {len(responses)} response(s) one by one.")
+        written, written_responses = [], {}
+        for index, handle in enumerate(pending):
+            try:
+                self._write([handle], {})
+            except Exception as e:
+                if _is_connection_error(e):
+                    return written, written_responses, pending[index:], dict(responses)
+                with self._lock:
+                    handle.in_flight = False
+                    if handle.late_response is not None:
+                        handle.values["user_response"] = handle.late_response[1]
+                        handle.late_response = None
+                handle.rejected = True
+                self._reject({"op": "insert", "values": handle.values}, e)
+                handle._written.set()
+                continue
+            written.append(handle)
+        response_items = list(responses.items())
+        for index, (interaction_id, (user_id, text)) in enumerate(response_items):
+            try:
+                self._write([], {interaction_id: (user_id, text)})
+            except Exception as e:
+                if _is_connection_error(e):
+                    return written, written_responses, [], dict(response_items[index:])
+                self._reject({"op": "respond", "interaction_id": interaction_id, "user_id": user_id, "response": text}, e)
+                continue
+            written_responses[interaction_id] = (user_id, text)
+        return written, written_responses, [], {}
+
+    def _reject(self, entry, error):
+        """Sets aside a write that fails on its own, so it stops blocking the queue."""
+        print(f"[InteractionLog] Setting aside {entry['op']} that cannot be written: {error}")
+        self.rejected.append(entry)
+        if self.rejected_path is None:
+            return
+        try:
+            with open(self.rejected_path, "a", encoding="utf-8") as f:
+                f.write(_spool_line(entry))
+        except OSError as e:
+            print(f"[InteractionLog] Could not write {self.rejected_path}: {e}")
+
+    def _write(self, pending, responses):
+        table = CoachingInteraction.__table__
+        session = db.session
+        try:
+            if pending:
+                rows = [{column: handle.values.get(column) for column in INTERACTION_COLUMNS} for handle in pending]
+                dialect = session.get_bind().dialect
+                if dialect.insert_executemany_returning_sort_by_parameter_order:
+                    ids = session.execute(insert(table).returning(table.c.interaction_id, sort_by_parameter_order=True), rows).scalars().all()
+                else:
+                    ids = [session.execute(insert(table), row).inserted_primary_key[0] for row in rows]
+                for handle, interaction_id in zip(pending, ids):
+                    handle.interaction_id = interaction_id
+            if responses:
+                session.execute(
+                    update(table)
+                    .where(table.c.interaction_id == bindparam("b_interaction_id"), table.c.user_id == bindparam("b_user_id"))
+                    .values(user_response=bindparam("b_response")),
+                    [{"b_interaction_id": interaction_id, "b_user_id": user_id, "b_response": text} for interaction_id, (user_id, text) in responses.items()],
+                )
+            answered = [handle.interaction_id for handle in pending if handle.values.get("user_response") is not None]
+            search_index.index_pks("coaching_interaction", answered + list(responses), session=session)
+            session.commit()
+        except Exception:
+            session.rollback()
+            for handle in pending:
+                handle.interaction_id = None
+            raise
+        finally:
+            session.remove()
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if time.monotonic() >= self._retry_at: # Backing off after a failed flush
+                self.flush()
+
+    def close(self):
+        """Stops the background writer and flushes whatever is still queued."""
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join(timeout=self.flush_interval + 5)
+        for _ in range(3):
+            self.flush()
+            if not self._pending and not self._responses:
+                break
+            time.sleep(0.5)
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+
+    def _spool_write(self, entry):
+        if self._spool is None:
+            return
+        self._spool.write(_spool_line(entry))
+        self._spool.flush()
+
+    def _compact_spool(self):
+        """Rewrites the spool so it holds only what is still queued. Caller holds the lock."""
+        if self._spool is None:
+            return
+        if not self._pending and not self._responses:
+            self._spool.truncate(0)
+            self._spool.seek(0)
+            return
+        tmp_path = f"{self.spool_path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for handle in self._pending:
+                    f.write(_spool_line({"op": "insert", "values": handle.values}))
+                for interaction_id, (user_id, text) in self._responses.items():
+                    f.write(_spool_line({"op": "respond", "interaction_id": interaction_id, "user_id": user_id, "response": text}))
+            os.replace(tmp_path, self.spool_path) # Atomic: a crash leaves either the old spool or the new one
+        except OSError as e:
+            print(f"[InteractionLog] Could not compact {self.spool_path}, keeping it as is: {e}")
+            return
+        self._spool.close()
+        self._spool = open(self.spool_path, "a", encoding="utf-8")
+
+    def _recover_spool(self):
+        """Re-queues writes left in the spool by a process that died before flushing them."""
+        if not os.path.exists(self.spool_path):
+            return
+        inserts = {}
+        with open(self.spool_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue # Torn final line from the crash
+                if entry["op"] in ("insert", "insert_response"):
+                    values = entry["values"]
+                    if values.get("timestamp"):
+                        values["timestamp"] = datetime.datetime.fromisoformat(values["timestamp"])
+                    inserts[(values.get("user_id"), values["timestamp"], values.get("interaction_type"))] = values
+                elif entry["op"] == "respond":
+                    self._responses[entry["interaction_id"]] = (entry["user_id"], entry["response"])
+        self._pending = [PendingInteraction(values) for values in inserts.values()]
+        if self._pending or self._responses:
+            print(f"[InteractionLog] Recovered {len(self._pending)} insert(s) and {len(self._responses)} response(s) from {self.spool_path}.")
+
+def _spool_line(entry):
+    return json.dumps(entry, default=lambda value: value.isoformat()) + "\n"
+
+def _is_connection_error(error):
+    """True for errors that say the database is unreachable rather than that a row is bad."""
+    return isinstance(error, exc.OperationalError) or getattr(error, "connection_invalidated", False)
+
+_shared_log = None
+_shared_log_lock = threading.Lock()
+
+def get_interaction_log():
+    """The process-wide InteractionLog, bound to the current Flask app on first use."""
+    global _shared_log
+    if _shared_log is None:
+        with _shared_log_lock:
+            if _shared_log is None:
+                _shared_log = InteractionLog()
+    return _shared_log
@@ -0,0 +1,345 @@
+# This is /home/ubuntu/copri_app/src/services/prioritization_engine.py
+import datetime
+
+import numpy as np
+
+from src.models.copri_models import TrelloCard, Email, CalendarEvent, Project, ApplicationTracking, PlatformConnection
+
+# Item type codes used in the columnar arrays.
+TRELLO_CARD, EMAIL, CALENDAR_EVENT, PROJECT, APPLICATION = range(5)
+ITEM_TYPE_NAMES = ("TrelloCard", "Email", "CalendarEvent", "Project", "ApplicationTracking")
+
+DAY = 86400.0
+DEADLINE_HORIZON = 2 * DAY          # Urgency halves when a deadline is this far away
+OVERDUE_STALE_AFTER = 14 * DAY      # Overdue items fade slowly instead of dominating forever
+RECENCY_HALF_LIFE = 7 * DAY
+CALENDAR_LOOKAHEAD = 2 * DAY        # Only events starting within this window are candidates
+URGENT_LABEL_WORDS = ("urgent", "high", "priority", "asap", "blocker")
+FOLLOW_UP_STATUSES = ("needs_follow_up", "pending", "awaiting_reply")
+CLOSED_PROJECT_STATUSES = ("completed", "done", "cancelled", "archived")
+CLOSED_APPLICATION_STATUSES = ("submitted", "accepted", "rejected", "withdrawn")
+
+# Score = TYPE_BASE[type] + sum(weight * component). Components are all in [0, 1].
+COMPONENTS = ("deadline", "importance", "project_priority", "follow_up", "unread", "negative_sentiment", "recency")
+DEFAULT_WEIGHTS = {
+    "deadline": 3.0,
+    "importance": 1.5,
+    "project_priority": 2.0,
+    "follow_up": 1.5,
+    "unread": 0.5,
+    "negative_sentiment": 1.0,
+    "recency": 0.75,
+}
+TYPE_BASE = np.array([0.5, 0.0, 0.25, 0.25, 0.75], dtype=np.float64)
+
+KEY_QUERY_CHUNK_SIZE = 500 # Keeps IN (...) lists under SQLite's bound-parameter limit
+
+REASONS = {
+    "deadline": "its deadline is close",
+    "importance": "it is flagged as important",
+    "project_priority": "it is one of your top-priority projects",
+    "follow_up": "it is waiting on your follow-up",
+    "unread": "it has not been read yet",
+    "negative_sentiment": "the tone suggests something needs attention",
+    "recency": "it saw recent activity",
+}
+
+def datetimes_to_seconds(values):
+    """Naive-UTC datetimes/dates (None allowed) -> float64 epoch seconds, NaN where missing."""
+    stamped = np.array(values, dtype="datetime64[s]")
+    seconds = stamped.astype(np.int64).astype(np.float64)
+    seconds[np.isnat(stamped)] = np.nan
+    return seconds
+
+class PriorityCandidates:
+    """Columnar candidate set: one entry per item, one NumPy array per feature."""
+
+    FIELDS = ("item_type", "item_pk", "deadline", "activity", "importance", "project_priority", "follow_up", "unread", "sentiment")
+
+    def __init__(self, item_type, item_pk, deadline, activity, importance, project_priority, follow_up, unread, sentiment):
+        self.item_type = np.asarray(item_type, dtype=np.int8)
+        self.item_pk = np.asarray(item_pk, dtype=np.int64)
+        self.deadline = np.asarray(deadline, dtype=np.float64)      # Epoch seconds, NaN = none
+        self.activity = np.asarray(activity, dtype=np.float64)      # Epoch seconds of last activity/receipt, NaN = unknown
+        self.importance = np.asarray(importance, dtype=np.float64)
+        self.project_priority = np.asarray(project_priority, dtype=np.float64)
+        self.follow_up = np.asarray(follow_up, dtype=np.float64)
+        self.unread = np.asarray(unread, dtype=np.float64)
+        self.sentiment = np.asarray(sentiment, dtype=np.float64)    # NaN = not scored
+
+    def __len__(self):
+        return len(self.item_pk)
+
+    @classmethod
+    def empty(cls):
+        return cls(*([] for _ in cls.FIELDS))
+
+    @classmethod
+    def concatenate(cls, parts):
+        parts = [part for part in parts if len(part)]
+        if not parts:
+            return cls.empty()
+        return cls(*(np.concatenate([getattr(part, field) for part in parts]) for field in cls.FIELDS))
+
+    def take(self, indices):
+        return PriorityCandidates(*(getattr(self, field)[indices] for field in self.FIELDS))
+
+    def assign(self, indices, other):
+        """Overwrites the rows at indices with the rows of other (same length), in place."""
+        for field in self.FIELDS:
+            getattr(self, field)[indices] = getattr(other, field)
+
+def _constant(value, n):
+    return np.full(n, value, dtype=np.float64)
+
+def _label_importance(labels):
+    for label in labels or ():
+        text = f"{label.get('name') or ''} {label.get('color') or ''}".lower() if isinstance(label, dict) else str(label).lower()
+        if "red" in text or any(word in text for word in URGENT_LABEL_WORDS):
+            return 1.0
+    return 0.0
+
+def _rows(query, key_column, keys):
+    """Runs a candidate query, optionally restricted to the given natural keys (in IN-list chunks)."""
+    if keys is None:
+        return query.all()
+    keys = list(keys)
+    rows = []
+    for start in range(0, len(keys), KEY_QUERY_CHUNK_SIZE):
+        rows.extend(query.filter(key_column.in_(keys[start:start + KEY_QUERY_CHUNK_SIZE])).all())
+    return rows
+
+def _trello_candidates(user_id, now_seconds, keys=None):
+    rows = _rows(
+        TrelloCard.query
+        .join(PlatformConnection, PlatformConnection.connection_id == TrelloCard.connection_id)
+        .with_entities(TrelloCard.trello_card_id, TrelloCard.card_id_pk, TrelloCard.due_date, TrelloCard.last_activity_date, TrelloCard.labels)
+        .filter(PlatformConnection.user_id == user_id),
+        TrelloCard.trello_card_id, keys,
+    )
+    if not rows:
+        return PriorityCandidates.empty(), []
+    natural_keys, pks, due, activity, labels = zip(*rows)
+    n = len(pks)
+    return PriorityCandidates(
+        _constant(TRELLO_CARD, n), pks, datetimes_to_seconds(due), datetimes_to_seconds(activity),
+        np.fromiter((_label_importance(value) for value in labels), dtype=np.float64, count=n),
+        _constant(0.0, n), _constant(0.0, n), _constant(0.0, n), _constant(np.nan, n),
+    ), list(natural_keys)
+
+def _email_candidates(user_id, now_seconds, keys=None):
+    """Emails that still ask for something: unread, important or awaiting follow-up."""
+    rows = _rows(
+        Email.query
+        .join(PlatformConnection, PlatformConnection.connection_id == Email.connection_id)
+        .with_entities(Email.gmail_message_id, Email.email_id_pk, Email.received_date, Email.is_read, Email.is_important, Email.follow_up_status, Email.sentiment_score)
+        .filter(
+            PlatformConnection.user_id == user_id,
+            (Email.is_read.isnot(True)) | (Email.is_important.is_(True)) | (Email.follow_up_status.in_(FOLLOW_UP_STATUSES)),
+        ),
+        Email.gmail_message_id, keys,
+    )
+    if not rows:
+        return PriorityCandidates.empty(), []
+    natural_keys, pks, received, is_read, is_important, follow_up, sentiment = zip(*rows)
+    n = len(pks)
+    return PriorityCandidates(
+        _constant(EMAIL, n), pks, _constant(np.nan, n), datetimes_to_seconds(received),
+        np.array([bool(value) for value in is_important], dtype=np.float64),
+        _constant(0.0, n),
+        np.array([value in FOLLOW_UP_STATUSES for value in follow_up], dtype=np.float64),
+        np.array([not value for value in is_read], dtype=np.float64),
+        np.array([np.nan if value is None else value for value in sentiment], dtype=np.float64),
+    ), list(natural_keys)
+
+def _calendar_candidates(user_id, now_seconds, keys=None):
+    """Events that have not ended and start within CALENDAR_LOOKAHEAD; the start time is the deadline."""
+    now = datetime.datetime.utcfromtimestamp(now_seconds)
+    horizon = now + datetime.timedelta(seconds=CALENDAR_LOOKAHEAD)
+    rows = _rows(
+        CalendarEvent.query
+        .join(PlatformConnection, PlatformConnection.connection_id == CalendarEvent.connection_id)
+        .with_entities(CalendarEvent.gcal_event_id, CalendarEvent.event_id_pk, CalendarEvent.start_time)
+        .filter(
+            PlatformConnection.user_id == user_id,
+            CalendarEvent.start_time.isnot(None),
+            CalendarEvent.start_time < horizon,
+            (CalendarEvent.end_time.is_(None)) | (CalendarEvent.end_time > now),
+            (CalendarEvent.status_gcal.is_(None)) | (CalendarEvent.status_gcal != "cancelled"),
+        ),
+        CalendarEvent.gcal_event_id, keys,
+    )
+    if not rows:
+        return PriorityCandidates.empty(), []
+    natural_keys, pks, start = zip(*rows)
+    n = len(pks)
+    start_seconds = datetimes_to_seconds(start)
+    return PriorityCandidates(
+        _constant(CALENDAR_EVENT, n), pks, start_seconds, start_seconds,
+        _constant(0.0, n), _constant(0.0, n), _constant(0.0, n), _constant(0.0, n), _constant(np.nan, n),
+    ), list(natural_keys)
+
+def _project_candidates(user_id, now_seconds, keys=None):
+    rows = _rows(
+        Project.query
+        .with_entities(Project.project_id, Project.end_date, Project.updated_at, Project.priority_copri)
+        .filter(Project.user_id == user_id, (Project.status.is_(None)) | (Project.status.notin_(CLOSED_PROJECT_STATUSES))),
+        Project.project_id, keys,
+    )
+    if not rows:
+        return PriorityCandidates.empty(), []
+    pks, end_date, updated, priority = zip(*rows)
+    n = len(pks)
+    return PriorityCandidates(
+        _constant(PROJECT, n), pks, datetimes_to_seconds(end_date), datetimes_to_seconds(updated),
+        _constant(0.0, n), project_priority_component(priority), _constant(0.0, n), _constant(0.0, n), _constant(np.nan, n),
+    ), list(pks)
+
+def _application_candidates(user_id, now_seconds, keys=None):
+    rows = _rows(
+        ApplicationTracking.query
+        .with_entities(ApplicationTracking.application_id, ApplicationTracking.submission_deadline, ApplicationTracking.updated_at)
+        .filter(
+            ApplicationTracking.user_id == user_id,
+            ApplicationTracking.submitted_date.is_(None),
+            (ApplicationTracking.application_status.is_(None)) | (ApplicationTracking.application_status.notin_(CLOSED_APPLICATION_STATUSES)),
+        ),
+        ApplicationTracking.application_id, keys,
+    )
+    if not rows:
+        return PriorityCandidates.empty(), []
+    pks, deadline, updated = zip(*rows)
+    n = len(pks)
+    return PriorityCandidates(
+        _constant(APPLICATION, n), pks, datetimes_to_seconds(deadline), datetimes_to_seconds(updated),
+        _constant(0.0, n), _constant(0.0, n), _constant(0.0, n), _constant(0.0, n), _constant(np.nan, n),
+    ), list(pks)
+
+def project_priority_component(priorities):
+    """priority_copri is a rank (1 = top priority); maps it to (0, 1], with missing values as 0."""
+    values = np.array([np.nan if value is None else value for value in priorities], dtype=np.float64)
+    component = 1.0 / np.maximum(values, 1.0)
+    component[np.isnan(values)] = 0.0
+    return component
+
+# Item type -> loader(user_id, now_seconds, keys=None) returning (PriorityCandidates, natural keys).
+# Natural keys are the platform IDs for ingested items and the primary key for projects/applications.
+CANDIDATE_SOURCES = {
+    TRELLO_CARD: _trello_candidates,
+    EMAIL: _email_candidates,
+    CALENDAR_EVENT: _calendar_candidates,
+    PROJECT: _project_candidates,
+    APPLICATION: _application_candidates,
+}
+
+def load_candidates(user_id, now_seconds, with_keys=False):
+    """Pulls every candidate item of a user into one PriorityCandidates set (column projections only).
+    With with_keys=True also returns the matching list of (item_type, natural key) pairs.
+    """
+    parts, keys = [], []
+    for item_type, loader in CANDIDATE_SOURCES.items():
+        candidates, natural_keys = loader(user_id, now_seconds)
+        parts.append(candidates)
+        keys.extend((item_type, key) for key in natural_keys)
+    candidates = PriorityCandidates.concatenate(parts)
+    return (candidates, keys) if with_keys else candidates
+
+def score_components(candidates, now_seconds):
+    """Returns a (len(candidates), len(COMPONENTS)) matrix of component values, computed column-wise."""
+    n = len(candidates)
+    components = np.zeros((n, len(COMPONENTS)), dtype=np.float64)
+    if n == 0:
+        return components
+
+    remaining = candidates.deadline - now_seconds
+    has_deadline = ~np.isnan(remaining)
+    remaining = np.where(has_deadline, remaining, 0.0)
+    upcoming = DEADLINE_HORIZON / (DEADLINE_HORIZON + np.maximum(remaining, 0.0))
+    overdue = np.exp(np.minimum(remaining, 0.0) / OVERDUE_STALE_AFTER)
+    components[:, 0] = np.where(has_deadline, np.where(remaining >= 0.0, upcoming, overdue), 0.0)
+
+    components[:, 1] = candidates.importance
+    components[:, 2] = candidates.project_priority
+    components[:, 3] = candidates.follow_up
+    components[:, 4] = candidates.unread
+    components[:, 5] = np.clip(-np.nan_to_num(candidates.sentiment, nan=0.0), 0.0, 1.0)
+
+    age = np.maximum(np.nan_to_num(now_seconds - candidates.activity, nan=np.inf), 0.0)
+    components[:, 6] = np.exp2(-age / RECENCY_HALF_LIFE) # Unknown activity -> infinite age -> 0
+    return components
+
+def weight_vector(weights=None):
+    weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+    return np.array([weights[name] for name in COMPONENTS], dtype=np.float64)
+
+def score(candidates, now_seconds, weights=None):
+    """One vectorized pass: returns (scores, components)."""
+    components = score_components(candidates, now_seconds)
+    scores = TYPE_BASE[candidates.item_type] + components @ weight_vector(weights)
+    return scores, components
+
+def top_k_indices(scores, k):
+    """Indices of the k highest scores, best first. argpartition keeps this O(n + k log k)."""
+    n = len(scores)
+    if n == 0 or k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < n:
+        candidates = np.argpartition(scores, n - k)[n - k:]
+    else:
+        candidates = np.arange(n)
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+def _titles(ranked):
+    """Fetches display titles for the (few) ranked items, one query per item type present."""
+    sources = {
+        TRELLO_CARD: (TrelloCard.card_id_pk, TrelloCard.name),
+        EMAIL: (Email.email_id_pk, Email.subject),
+        CALENDAR_EVENT: (CalendarEvent.event_id_pk, CalendarEvent.summary),
+        PROJECT: (Project.project_id, Project.name),
+        APPLICATION: (ApplicationTracking.application_id, ApplicationTracking.name_of_program),
+    }
+    titles = {}
+    for item_type, (pk_column, title_column) in sources.items():
+        pks = [item["item_pk"] for item in ranked if item["item_type_code"] == item_type]
+        if pks:
+            rows = pk_column.class_.query.with_entities(pk_column, title_column).filter(pk_column.in_(pks)).all()
+            titles.update({(item_type, pk): title for pk, title in rows})
+    return titles
+
+def describe(candidates, scores, components, indices, weights=None, with_titles=True):
+    """Turns ranked indices into result dicts with the strongest weighted component as the reason."""
+    weighted = components[indices] * weight_vector(weights)
+    ranked = []
+    for position, index in enumerate(indices):
+        item_type = int(candidates.item_type[index])
+        ranked.append({
+            "item_type": ITEM_TYPE_NAMES[item_type],
+            "item_type_code": item_type,
+            "item_pk": int(candidates.item_pk[index]),
+            "score": round(float(scores[index]), 4),
+            "reason": REASONS[COMPONENTS[int(np.argmax(weighted[position]))]] if weighted[position].any() else "it is still open",
+        })
+    if with_titles:
+        titles = _titles(ranked)
+        for item in ranked:
+            item["title"] = titles.get((item["item_type_code"], item["item_pk"]))
+    return ranked
+
+class PrioritizationEngine:
+    """Ranks a user's open work items (cards, emails, events, projects, applications) in one NumPy pass.
+
+    Candidates are loaded as column projections into flat arrays, scored with a weighted sum of
+    deadline urgency, importance, project priority, follow-up state, unread state, negative
+    sentiment and recency, and the top K are picked with argpartition. Titles are only fetched
+    for the K items returned.
+    """
+
+    def __init__(self, weights=None):
+        self.weights = weights
+
+    def rank(self, user_id, k=5, now_seconds=None, candidates=None):
+        now_seconds = now_seconds if now_seconds is not None else float(np.datetime64("now", "s").astype(np.int64))
+        candidates = candidates if candidates is not None else load_candidates(user_id, now_seconds)
+        scores, components = score(candidates, now_seconds, self.weights)
+        indices = top_k_indices(scores, k)
+        return describe(candidates, scores, components, indices, self.weights)
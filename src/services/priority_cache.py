@@ -0,0 +1,257 @@
+# This is /home/ubuntu/copri_app/src/services/priority_cache.py
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from src.models.copri_models import Project, ApplicationTracking
+from src.services import prioritization_engine as engine
+
+MAX_CACHED_USERS = 128
+MATERIALIZED_TOP = 100          # Ranked indices kept per user; reads of up to this many items are O(K)
+DECAY_REFRESH_INTERVAL = 300.0  # Seconds between scheduled re-scores of the time-dependent terms
+DIRTY_REBUILD_MIN = 5000        # Past max(this, DIRTY_REBUILD_RATIO * n) dirty keys a rebuild is cheaper
+DIRTY_REBUILD_RATIO = 0.25
+COMPACT_RATIO = 0.25            # Compact the arrays once this share of rows belongs to removed items
+WINDOW_RELOAD_INTERVAL = 900.0  # Seconds before time-windowed sources are re-read for items entering the window
+WINDOWED_SOURCES = (engine.CALENDAR_EVENT,) # Sources whose candidate set depends on the current time
+
+def _now_seconds():
+    return time.time()
+
+class _UserScores:
+    """Scored candidate arrays of one user plus the bookkeeping to patch them in place."""
+
+    def __init__(self, user_id, candidates, keys, now_seconds, weights):
+        self.user_id = user_id
+        self.weights = weights
+        self.lock = threading.RLock()
+        self.dirty = {} # item_type -> set of natural keys
+        self._set_arrays(candidates, keys)
+        self.windows_loaded_at = now_seconds
+        self.rescore(now_seconds)
+
+    def _set_arrays(self, candidates, keys):
+        self.candidates = candidates
+        self.keys = list(keys)
+        self.positions = {key: index for index, key in enumerate(self.keys)}
+        self.alive = np.ones(len(candidates), dtype=bool)
+
+    def __len__(self):
+        return int(self.alive.sum())
+
+    def dirty_count(self):
+        return sum(len(keys) for keys in self.dirty.values())
+
+    def rescore(self, now_seconds):
+        """Full vectorized re-score at now_seconds (refreshes deadline and recency decay)."""
+        if (~self.alive).sum() > COMPACT_RATIO * max(len(self.alive), 1):
+            self._compact()
+        self.scores, self.components = engine.score(self.candidates, now_seconds, self.weights)
+        self.scores[~self.alive] = -np.inf
+        self.scored_at = now_seconds
+        self._materialize_top()
+
+    def _compact(self):
+        live = np.flatnonzero(self.alive)
+        self._set_arrays(self.candidates.take(live), [self.keys[index] for index in live])
+
+    def _materialize_top(self):
+        top = engine.top_k_indices(self.scores, MATERIALIZED_TOP)
+        self.top = top[np.isfinite(self.scores[top])]
+
+    def apply_dirty(self):
+        """Reloads only the dirty items, patches their rows and re-scores just those rows."""
+        changed = []
+        appended, appended_keys = [], []
+        for item_type, natural_keys in self.dirty.items():
+            loaded, found_keys = engine.CANDIDATE_SOURCES[item_type](self.user_id, self.scored_at, natural_keys)
+            found = set()
+            existing_rows, existing_positions, new_rows = [], [], []
+            for row, natural_key in enumerate(found_keys):
+                key = (item_type, natural_key)
+                found.add(natural_key)
+                if key in self.positions:
+                    existing_rows.append(row)
+                    existing_positions.append(self.positions[key])
+                else:
+                    new_rows.append(row)
+                    appended_keys.append(key)
+            if existing_rows:
+                self.candidates.assign(np.array(existing_positions), loaded.take(np.array(existing_rows)))
+                self.alive[existing_positions] = True
+                changed.extend(existing_positions)
+            if new_rows:
+                appended.append(loaded.take(np.array(new_rows)))
+            # Keys that no longer load were deleted, archived, read or otherwise left the candidate set.
+            for natural_key in natural_keys - found:
+                position = self.positions.get((item_type, natural_key))
+                if position is not None:
+                    self.alive[position] = False
+                    changed.append(position)
+        self.dirty = {}
+
+        if appended:
+            offset = len(self.candidates)
+            self.candidates = engine.PriorityCandidates.concatenate([self.candidates, *appended])
+            self.alive = np.concatenate([self.alive, np.ones(len(appended_keys), dtype=bool)])
+            for index, key in enumerate(appended_keys, start=offset):
+                self.positions[key] = index
+            self.keys.extend(appended_keys)
+            changed.extend(range(offset, offset + len(appended_keys)))
+            self.scores = np.concatenate([self.scores, np.empty(len(appended_keys))])
+            self.components = np.concatenate([self.components, np.empty((len(appended_keys), len(engine.COMPONENTS)))])
+        if not changed:
+            return 0
+        changed = np.unique(np.array(changed, dtype=np.int64))
+        scores, components = engine.score(self.candidates.take(changed), self.scored_at, self.weights)
+        scores[~self.alive[changed]] = -np.inf
+        self.scores[changed] = scores
+        self.components[changed] = components
+        self._materialize_top()
+        return len(changed)
+
+    def mark_windowed_sources(self, now_seconds):
+        """Marks every cached and currently in-window item of the windowed sources dirty."""
+        for item_type in WINDOWED_SOURCES:
+            _, found_keys = engine.CANDIDATE_SOURCES[item_type](self.user_id, now_seconds)
+            cached_keys = {key for cached_type, key in self.positions if cached_type == item_type}
+            self.dirty.setdefault(item_type, set()).update(cached_keys | set(found_keys))
+        self.windows_loaded_at = now_seconds
+
+    def ranked(self, k):
+        indices = self.top[:k] if k <= MATERIALIZED_TOP else engine.top_k_indices(self.scores, k)
+        indices = indices[np.isfinite(self.scores[indices])]
+        return engine.describe(self.candidates, self.scores, self.components, indices, self.weights)
+
+class PriorityScoreCache:
+    """Per-user priority scores kept warm between requests, in an LRU across users.
+
+    A user's candidates are loaded and scored once. Ingestion calls mark_dirty() with the
+    natural keys it changed; the next read reloads and re-scores only those items. Deadline and
+    recency terms drift with the clock, so a background thread re-scores every cached user every
+    DECAY_REFRESH_INTERVAL seconds (pure NumPy, no database access). Reads slice a materialized
+    top list, so ranked(k) is O(K) plus the title lookup for those K items.
+    """
+
+    def __init__(self, max_users=MAX_CACHED_USERS, decay_interval=DECAY_REFRESH_INTERVAL, weights=None, clock=_now_seconds):
+        self.max_users = max_users
+        self.decay_interval = decay_interval
+        self.weights = weights
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._scheduler = None
+        self._stop = threading.Event()
+        self.builds = 0
+        self.dirty_refreshes = 0
+        self.decay_refreshes = 0
+
+    def ranked(self, user_id, k=5):
+        """Top-k items of a user, best first (same dicts as PrioritizationEngine.rank)."""
+        entry = self._entry(user_id)
+        with entry.lock:
+            now = self.clock()
+            if now - entry.scored_at > 2 * self.decay_interval:
+                entry.rescore(now) # The scheduler is not keeping up (or not running)
+            if now - entry.windows_loaded_at > WINDOW_RELOAD_INTERVAL:
+                entry.mark_windowed_sources(now)
+            if entry.dirty:
+                self.dirty_refreshes += 1
+                entry.apply_dirty()
+            return entry.ranked(k)
+
+    def _entry(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                self._entries.move_to_end(user_id)
+                return entry
+        now = self.clock()
+        candidates, keys = engine.load_candidates(user_id, now, with_keys=True)
+        built = _UserScores(user_id, candidates, keys, now, self.weights)
+        with self._lock:
+            self.builds += 1
+            entry = self._entries.setdefault(user_id, built)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+        self._ensure_scheduler()
+        return entry
+
+    def mark_dirty(self, user_id, item_type, natural_keys):
+        """Records items changed by ingestion. Users without a cached entry are skipped (they load fresh)."""
+        natural_keys = set(natural_keys)
+        if not natural_keys:
+            return
+        with self._lock:
+            entry = self._entries.get(user_id)
+        if entry is None:
+            return
+        with entry.lock:
+            entry.dirty.setdefault(item_type, set()).update(natural_keys)
+            if entry.dirty_count() > max(DIRTY_REBUILD_MIN, DIRTY_REBUILD_RATIO * len(entry)):
+                self.invalidate(user_id) # A bulk change: rebuilding on the next read is cheaper
+
+    def invalidate(self, user_id=None):
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+    def refresh_decay(self):
+        """Re-scores every cached user at the current time. Called by the scheduler thread."""
+        with self._lock:
+            entries = list(self._entries.values())
+        now = self.clock()
+        for entry in entries:
+            with entry.lock:
+                entry.rescore(now)
+        self.decay_refreshes += 1
+        return len(entries)
+
+    def _ensure_scheduler(self):
+        if self._scheduler is not None or self.decay_interval <= 0:
+            return
+        with self._lock:
+            if self._scheduler is None:
+                self._scheduler = threading.Thread(target=self._run_scheduler, name="copri-priority-decay", daemon=True)
+                self._scheduler.start()
+
+    def _run_scheduler(self):
+        while not self._stop.wait(self.decay_interval):
+            try:
+                self.refresh_decay()
+            except Exception as e:
+                print(f"[PriorityScoreCache] Decay refresh failed: {e}")
+
+    def stop(self):
+        self._stop.set()
+
+priority_scores = PriorityScoreCache()
+
+# Projects and applications are edited through the ORM rather than bulk_upsert, so their changes
+# are picked up from the session: collected at flush, applied once the transaction commits.
+ORM_TRACKED_MODELS = {Project: (engine.PROJECT, "project_id"), ApplicationTracking: (engine.APPLICATION, "application_id")}
+
+@event.listens_for(Session, "after_flush")
+def _collect_priority_changes(session, flush_context):
+    pending = session.info.setdefault("priority_dirty", [])
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        tracked = ORM_TRACKED_MODELS.get(type(instance))
+        if tracked is not None:
+            item_type, pk_attribute = tracked
+            pending.append((instance.user_id, item_type, getattr(instance, pk_attribute)))
+
+@event.listens_for(Session, "after_commit")
+def _apply_priority_changes(session):
+    for user_id, item_type, pk in session.info.pop("priority_dirty", ()):
+        priority_scores.mark_dirty(user_id, item_type, [pk])
+
+@event.listens_for(Session, "after_rollback")
+def _discard_priority_changes(session):
+    session.info.pop("priority_dirty", None)
@@ -0,0 +1,327 @@
+# This is /home/ubuntu/copri_app/src/services/search_index.py
+import os
+import re
+import time
+
+from sqlalchemy import and_, inspect, select, text
+
+from src.database import db
+from src.models.copri_models import PlatformConnection, TrelloCard, Email, CalendarEvent, CoachingInteraction
+
+SEARCH_TABLE = "search_documents"
+PG_TEXT_SEARCH_CONFIG = os.getenv("COPRI_PG_SEARCH_CONFIG", "simple") # No stemming, like FTS5's unicode61 tokenizer
+KEY_CHUNK_SIZE = 500       # Keys per IN (...) when (re)indexing
+REBUILD_BATCH_SIZE = 5000  # Source rows per transaction in rebuild()
+MAX_RESULTS = 100
+
+class SearchSource:
+    """A searchable table: which columns become the document title and body."""
+
+    def __init__(self, name, code, model, pk, natural_key, timestamp, title, body, indexed_if=None):
+        self.name = name
+        self.code = code # Small integer; doc_key = pk * 8 + code keeps keys unique across tables
+        self.model = model
+        self.pk = pk
+        self.natural_key = natural_key # Platform ID the sync services track changes by (None for CoPri's own tables)
+        self.timestamp = timestamp
+        self.title = title
+        self.body = body
+        self.indexed_if = indexed_if # Rows failing this condition have no document
+
+# Names match the activity timeline's item types.
+SOURCES = {
+    source.name: source for source in (
+        SearchSource("email", 1, Email, Email.email_id_pk, Email.gmail_message_id, Email.received_date, Email.subject, Email.snippet),
+        SearchSource("trello_card", 2, TrelloCard, TrelloCard.card_id_pk, TrelloCard.trello_card_id, TrelloCard.last_activity_date, TrelloCard.name, TrelloCard.description),
+        SearchSource("calendar_event", 3, CalendarEvent, CalendarEvent.event_id_pk, CalendarEvent.gcal_event_id, CalendarEvent.start_time, CalendarEvent.summary, CalendarEvent.description),
+        SearchSource(
+            "coaching_interaction", 4, CoachingInteraction, CoachingInteraction.interaction_id, None, CoachingInteraction.timestamp,
+            CoachingInteraction.question_asked, CoachingInteraction.user_response, indexed_if=CoachingInteraction.user_response.isnot(None),
+        ),
+    )
+}
+SOURCES_BY_CODE = {source.code: source for source in SOURCES.values()}
+
+def doc_key(source, pk):
+    return pk * 8 + source.code
+
+_enabled_binds = set() # Binds known to have the search table (absence is re-checked: a migration may add it)
+
+def _dialect_name(executor):
+    return (executor.get_bind() if hasattr(executor, "get_bind") else executor).dialect.name
+
+def is_enabled(executor):
+    """Whether the search table exists. Databases built with create_all() alone skip index maintenance."""
+    is_session = hasattr(executor, "get_bind")
+    bind = executor.get_bind() if is_session else executor.engine
+    if bind.url not in _enabled_binds:
+        if not inspect(executor.connection() if is_session else executor).has_table(SEARCH_TABLE):
+            return False
+        _enabled_binds.add(bind.url)
+    return True
+
+def _owner_tokens(user_id, source):
+    """FTS5 'owner' column: lets the MATCH itself restrict results to a user and document types."""
+    return f"u{user_id} k{source.code}"
+
+# --- Schema (created by migration 0005) ---------------------------------------------------------
+
+def create_search_table(executor):
+    dialect_name = _dialect_name(executor)
+    if dialect_name == "sqlite":
+        executor.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+            "owner, title, body, doc_type UNINDEXED, doc_pk UNINDEXED, occurred_at UNINDEXED, "
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        ))
+        return
+    if dialect_name == "postgresql":
+        document = (
+            f"setweight(to_tsvector('{PG_TEXT_SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+            f"setweight(to_tsvector('{PG_TEXT_SEARCH_CONFIG}', coalesce(body, '')), 'B')"
+        )
+        executor.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} (doc_key BIGINT PRIMARY KEY, user_id INTEGER NOT NULL, doc_type SMALLINT NOT NULL, "
+            f"doc_pk INTEGER NOT NULL, occurred_at TIMESTAMP NULL, title TEXT, body TEXT, document TSVECTOR GENERATED ALWAYS AS ({document}) STORED)"
+        ))
+        executor.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_document ON {SEARCH_TABLE} USING gin (document)"))
+        executor.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_user ON {SEARCH_TABLE} (user_id, doc_type)"))
+        return
+    # Other backends get a plain table and LIKE matching (correct, but a scan per user).
+    executor.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} (doc_key BIGINT PRIMARY KEY, user_id INTEGER NOT NULL, doc_type SMALLINT NOT NULL, "
+        f"doc_pk INTEGER NOT NULL, occurred_at DATETIME NULL, title TEXT, body TEXT)"
+    ))
+    executor.execute(text(f"CREATE INDEX ix_{SEARCH_TABLE}_user ON {SEARCH_TABLE} (user_id, doc_type)"))
+
+def drop_search_table(executor):
+    executor.execute(text(f"DROP TABLE IF EXISTS {SEARCH_TABLE}"))
+
+# --- Incremental maintenance ------------------------------------------------------------------
+
+def _document_rows(executor, source, condition):
+    """(pk, user_id, title, body, timestamp) for the source rows matching condition."""
+    statement = select(source.pk, source.title, source.body, source.timestamp)
+    if source.natural_key is not None:
+        statement = statement.add_columns(PlatformConnection.user_id).join(
+            PlatformConnection, PlatformConnection.connection_id == source.model.connection_id
+        )
+    else:
+        statement = statement.add_columns(source.model.user_id)
+    statement = statement.where(condition)
+    if source.indexed_if is not None:
+        statement = statement.where(source.indexed_if)
+    return [(row[0], row[4], row[1], row[2], row[3]) for row in executor.execute(statement)]
+
+def _delete_documents(executor, keys):
+    if not keys:
+        return
+    column = "rowid" if _dialect_name(executor) == "sqlite" else "doc_key"
+    for start in range(0, len(keys), KEY_CHUNK_SIZE):
+        chunk = keys[start:start + KEY_CHUNK_SIZE]
+        executor.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE {column} IN ({', '.join(str(int(key)) for key in chunk)})"))
+
+def _insert_documents(executor, source, rows):
+    if not rows:
+        return
+    is_sqlite = _dialect_name(executor) == "sqlite"
+    if is_sqlite:
+        statement = text(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, owner, title, body, doc_type, doc_pk, occurred_at) "
+            "VALUES (:doc_key, :owner, :title, :body, :doc_type, :doc_pk, :occurred_at)"
+        )
+    else:
+        statement = text(
+            f"INSERT INTO {SEARCH_TABLE} (doc_key, user_id, doc_type, doc_pk, occurred_at, title, body) "
+            "VALUES (:doc_key, :user_id, :doc_type, :doc_pk, :occurred_at, :title, :body)"
+        )
+    executor.execute(statement, [
+        {
+            "doc_key": doc_key(source, pk), "owner": _owner_tokens(user_id, source), "user_id": user_id, "doc_type": source.code, "doc_pk": pk,
+            # FTS5 columns are untyped text, so the timestamp is stored in its ISO form.
+            "occurred_at": timestamp.isoformat(" ") if is_sqlite and timestamp else timestamp,
+            "title": title or "", "body": body or "",
+        }
+        for pk, user_id, title, body, timestamp in rows
+    ])
+
+def _reindex(executor, source, condition, known_pks=()):
+    rows = _document_rows(executor, source, condition)
+    # Delete first: rows that stopped qualifying (or were just deleted) lose their document.
+    _delete_documents(executor, sorted({doc_key(source, pk) for pk in known_pks} | {doc_key(source, row[0]) for row in rows}))
+    _insert_documents(executor, source, rows)
+    return len(rows)
+
+def index_keys(source_name, natural_keys, connection_id, session=None):
+    """(Re)indexes the connection's rows with these platform IDs, inside the caller's transaction.
+
+    Call after bulk_upsert and before commit, with the keys bulk_upsert reported as changed.
+    """
+    session = session or db.session
+    if not is_enabled(session):
+        return 0
+    source = SOURCES[source_name]
+    keys = list(natural_keys)
+    indexed = 0
+    for start in range(0, len(keys), KEY_CHUNK_SIZE):
+        condition = and_(source.model.connection_id == connection_id, source.natural_key.in_(keys[start:start + KEY_CHUNK_SIZE]))
+        indexed += _reindex(session, source, condition)
+    return indexed
+
+def remove_keys(source_name, natural_keys, connection_id, session=None):
+    """Drops the documents of the connection's rows with these platform IDs. Call before deleting the rows themselves."""
+    session = session or db.session
+    if not is_enabled(session):
+        return 0
+    source = SOURCES[source_name]
+    keys = list(natural_keys)
+    removed = 0
+    for start in range(0, len(keys), KEY_CHUNK_SIZE):
+        pks = session.execute(
+            select(source.pk).where(source.model.connection_id == connection_id, source.natural_key.in_(keys[start:start + KEY_CHUNK_SIZE]))
+        ).scalars().all()
+        _delete_documents(session, [doc_key(source, pk) for pk in pks])
+        removed += len(pks)
+    return removed
+
+def index_pks(source_name, pks, session=None):
+    """(Re)indexes rows by primary key, e.g. coaching interactions after a response is recorded."""
+    session = session or db.session
+    if not is_enabled(session):
+        return 0
+    source = SOURCES[source_name]
+    pks = list(pks)
+    indexed = 0
+    for start in range(0, len(pks), KEY_CHUNK_SIZE):
+        chunk = pks[start:start + KEY_CHUNK_SIZE]
+        indexed += _reindex(session, source, source.pk.in_(chunk), known_pks=chunk)
+    return indexed
+
+def rebuild(engine=None, source_names=None, connection_id=None, batch_size=REBUILD_BATCH_SIZE):
+    """Reindexes whole sources (optionally one platform connection) in pk batches, one transaction each.
+
+    Used to backfill the index and after bulk imports that bypass the incremental path.
+    """
+    engine = engine or db.engine
+    if not is_enabled(engine):
+        return 0
+    total = 0
+    started = time.perf_counter()
+    for name in source_names or SOURCES:
+        source = SOURCES[name]
+        if connection_id is not None and source.natural_key is None:
+            continue
+        last_pk = 0
+        while True:
+            with engine.begin() as connection:
+                statement = select(source.pk).where(source.pk > last_pk).order_by(source.pk).limit(batch_size)
+                if connection_id is not None:
+                    statement = statement.where(source.model.connection_id == connection_id)
+                pks = connection.execute(statement).scalars().all()
+                if not pks:
+                    break
+                total += _reindex(connection, source, source.pk.between(pks[0], pks[-1]) if connection_id is None else source.pk.in_(pks), known_pks=pks)
+                last_pk = pks[-1]
+    print(f"[SearchIndex] Indexed {total} document(s) in {time.perf_counter() - started:.1f}s.")
+    return total
+
+# --- Queries ------------------------------------------------------------------------------------
+
+_TERM = re.compile(r'"([^"]*)"|(\S+)')
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+def parse_query(query, prefix_last=False):
+    """Splits user input into [(words, is_prefix)]: bare words, "quoted phrases" and word* prefixes.
+
+    Punctuation never reaches the backend's query syntax. With prefix_last, the final term
+    matches as a prefix (search-as-you-type).
+    """
+    terms = []
+    for phrase, bare in _TERM.findall(query or ""):
+        words = _WORD.findall((phrase or bare).lower())
+        if words:
+            terms.append((words, bool(bare) and bare.endswith("*")))
+    if prefix_last and terms and len(terms[-1][0]) == 1:
+        terms[-1] = (terms[-1][0], True)
+    return terms
+
+def _fts5_query(user_id, terms, codes):
+    # Words are \w+ only, so quoting them is enough to keep FTS5 operators out of user input.
+    parts = [f'{{title body}} : "{" ".join(words)}"{"*" if prefix else ""}' for words, prefix in terms]
+    owner = f"owner : u{user_id}"
+    if codes:
+        owner += f" AND owner : ({' OR '.join(f'k{code}' for code in codes)})"
+    return f"{owner} AND " + " AND ".join(parts)
+
+def _tsquery(terms):
+    parts = []
+    for words, prefix in terms:
+        lexemes = [f"'{word}'" for word in words]
+        if prefix:
+            lexemes[-1] += ":*"
+        parts.append(lexemes[0] if len(lexemes) == 1 else "(" + " <-> ".join(lexemes) + ")")
+    return " & ".join(parts)
+
+def search(user_id, query, limit=20, types=None, prefix_last=False, session=None):
+    """Ranked full-text search over a user's emails, cards, events and coaching responses.
+
+    Supports bare words (all must match), "exact phrases" and prefix* terms. Returns
+    [{"type", "pk", "title", "snippet", "timestamp", "score"}], best match first; matched
+    words are wrapped in [ ].
+    """
+    session = session or db.session
+    limit = max(1, min(int(limit), MAX_RESULTS))
+    unknown = set(types or ()) - set(SOURCES)
+    if unknown:
+        raise ValueError(f"Unknown search type(s): {sorted(unknown)}")
+    codes = sorted(SOURCES[name].code for name in types) if types else []
+    terms = parse_query(query, prefix_last=prefix_last)
+    if not terms:
+        return []
+    dialect_name = _dialect_name(session)
+    if dialect_name == "sqlite":
+        rows = session.execute(text(
+            f"SELECT doc_type, doc_pk, occurred_at, highlight({SEARCH_TABLE}, 1, '[', ']') AS title, "
+            f"snippet({SEARCH_TABLE}, 2, '[', ']', '…', 16) AS snippet, bm25({SEARCH_TABLE}, 0.0, 4.0, 1.0) AS score "
+            f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :match ORDER BY score LIMIT :limit"
+        ), {"match": _fts5_query(user_id, terms, codes), "limit": limit}).all()
+        # bm25() is lower-is-better; report higher-is-better like ts_rank_cd.
+        return [_result(row, -row.score) for row in rows]
+    if dialect_name == "postgresql":
+        type_filter = f"AND doc_type IN ({', '.join(str(code) for code in codes)})" if codes else ""
+        rows = session.execute(text(
+            f"SELECT doc_type, doc_pk, occurred_at, score, "
+            f"ts_headline('{PG_TEXT_SEARCH_CONFIG}', title, q, 'HighlightAll=true, StartSel=[, StopSel=]') AS title, "
+            f"ts_headline('{PG_TEXT_SEARCH_CONFIG}', body, q, 'StartSel=[, StopSel=], MaxWords=16, MinWords=6, MaxFragments=1') AS snippet "
+            f"FROM (SELECT doc_type, doc_pk, occurred_at, title, body, q, ts_rank_cd(document, q) AS score "
+            f"      FROM {SEARCH_TABLE}, to_tsquery('{PG_TEXT_SEARCH_CONFIG}', :tsquery) AS q "
+            f"      WHERE user_id = :user_id {type_filter} AND document @@ q ORDER BY score DESC LIMIT :limit) AS top"
+            f" ORDER BY score DESC"
+        ), {"tsquery": _tsquery(terms), "user_id": user_id, "limit": limit}).all()
+        return [_result(row, row.score) for row in rows]
+    return _like_search(session, user_id, terms, codes, limit)
+
+def _like_search(session, user_id, terms, codes, limit):
+    """Fallback for backends without a full-text engine: every term must appear in title or body."""
+    conditions, parameters = ["user_id = :user_id"], {"user_id": user_id, "limit": limit}
+    if codes:
+        conditions.append(f"doc_type IN ({', '.join(str(code) for code in codes)})")
+    for index, (words, _) in enumerate(terms):
+        parameters[f"term{index}"] = f"%{' '.join(words)}%"
+        conditions.append(f"(LOWER(title) LIKE :term{index} OR LOWER(body) LIKE :term{index})")
+    rows = session.execute(text(
+        f"SELECT doc_type, doc_pk, occurred_at, title, body AS snippet, 0.0 AS score FROM {SEARCH_TABLE} "
+        f"WHERE {' AND '.join(conditions)} ORDER BY occurred_at DESC LIMIT :limit"
+    ), parameters).all()
+    return [_result(row, 0.0) for row in rows]
+
+def _result(row, score):
+    timestamp = row.occurred_at
+    if isinstance(timestamp, str): # FTS5 UNINDEXED columns come back as stored text
+        timestamp = timestamp.replace(" ", "T")
+    elif timestamp is not None:
+        timestamp = timestamp.isoformat()
+    return {
+        "type": SOURCES_BY_CODE[int(row.doc_type)].name, "pk": int(row.doc_pk), "title": row.title, "snippet": row.snippet,
+        "timestamp": timestamp, "score": round(float(score), 4),
+    }
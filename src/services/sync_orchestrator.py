@@ -0,0 +1,210 @@
+# This is /home/ubuntu/copri_app/src/services/sync_orchestrator.py
+import datetime
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from flask import current_app
+
+from src.database import db
+from src.integrations.github_integration import GitHubIntegration
+from src.integrations.gmail_integration import GmailIntegration
+from src.integrations.google_calendar_integration import GoogleCalendarIntegration
+from src.integrations.linkedin_integration import LinkedInIntegration
+from src.integrations.trello_integration import TrelloIntegration
+from src.integrations.x_integration import XIntegration
+from src.models.copri_models import PlatformConnection
+from src.services.calendar_sync_service import CalendarSyncService
+from src.services.gmail_sync_service import GmailSyncService
+from src.services.trello_sync_service import TrelloSyncService
+
+# How many connections of one platform may sync at the same time (protects per-platform quotas).
+PLATFORM_CONCURRENCY = {
+    "Trello": 4,
+    "Gmail": 4,
+    "GoogleCalendar": 4,
+    "GitHub": 4,
+    "X": 2,
+    "LinkedIn": 2,
+}
+DEFAULT_PLATFORM_CONCURRENCY = 2
+DEFAULT_MAX_WORKERS = 12
+
+def _build_client(platform_name, connection, base_url=None):
+    """Creates the integration client for a connection; base_url overrides the public API host."""
+    extra = {"base_url": base_url} if base_url else {}
+    if platform_name == "Trello":
+        return TrelloIntegration(api_key=os.getenv("TRELLO_API_KEY"), token=connection.access_token, **extra)
+    if platform_name == "Gmail":
+        return GmailIntegration(credentials_info={"token": connection.access_token}, **extra)
+    if platform_name == "GoogleCalendar":
+        return GoogleCalendarIntegration(credentials_info={"token": connection.access_token}, **extra)
+    if platform_name == "GitHub":
+        return GitHubIntegration(token=connection.access_token, **extra)
+    if platform_name == "X":
+        return XIntegration(bearer_token=connection.access_token, **extra)
+    if platform_name == "LinkedIn":
+        return LinkedInIntegration(access_token=connection.access_token, **extra)
+    raise ValueError(f"Unsupported platform '{platform_name}'.")
+
+def _sync_trello(connection, client):
+    return TrelloSyncService(connection, trello_client=client).sync()
+
+def _sync_gmail(connection, client):
+    return GmailSyncService(connection, gmail_client=client).sync()
+
+def _sync_google_calendar(connection, client):
+    return CalendarSyncService(connection, calendar_client=client).sync()
+
+def _sync_github(connection, client):
+    return {"repos_seen": sum(1 for _ in client.iter_user_repos())} # Counted while streaming; no page is kept
+
+def _sync_x(connection, client):
+    # platform_user_id is the numeric X user ID, so look it up by ID rather than by username.
+    profile = client.get_user_profile_by_id(connection.platform_user_id) if connection.platform_user_id else None
+    return {"profile_fetched": profile is not None}
+
+def _sync_linkedin(connection, client):
+    return {"profile_fetched": client.get_user_profile() is not None}
+
+# Platform name -> callable(connection, client) returning a stats dict.
+SYNC_HANDLERS = {
+    "Trello": _sync_trello,
+    "Gmail": _sync_gmail,
+    "GoogleCalendar": _sync_google_calendar,
+    "GitHub": _sync_github,
+    "X": _sync_x,
+    "LinkedIn": _sync_linkedin,
+}
+
+# Handlers that manage last_sync_time themselves (inside their own write transaction).
+SELF_CHECKPOINTING = {"Trello", "Gmail", "GoogleCalendar"}
+
+class PlatformLimiter:
+    """One semaphore per platform, capping how many connections of it sync at once."""
+
+    def __init__(self, limits=None):
+        self.limits = {**PLATFORM_CONCURRENCY, **(limits or {})}
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def semaphore(self, platform_name):
+        with self._lock:
+            if platform_name not in self._semaphores:
+                self._semaphores[platform_name] = threading.BoundedSemaphore(self.limits.get(platform_name, DEFAULT_PLATFORM_CONCURRENCY))
+            return self._semaphores[platform_name]
+
+_shared_limiter = None
+_shared_limiter_lock = threading.Lock()
+
+def get_shared_limiter():
+    """The process-wide PlatformLimiter, so concurrent sync_user() calls share the per-platform caps."""
+    global _shared_limiter
+    if _shared_limiter is None:
+        with _shared_limiter_lock:
+            if _shared_limiter is None:
+                _shared_limiter = PlatformLimiter()
+    return _shared_limiter
+
+class SyncOrchestrator:
+    """Syncs every active PlatformConnection of a user concurrently.
+
+    Connections run on a thread pool, limited per platform by PLATFORM_CONCURRENCY. The limits
+    come from the process-wide limiter, so they hold across every orchestrator; pass
+    platform_concurrency (private limits) or limiter to override. Each connection runs in its
+    own app context and session, so one failing platform never affects the others. cancel()
+    stops connections of the current call that have not started yet.
+    """
+
+    def __init__(self, app=None, max_workers=DEFAULT_MAX_WORKERS, platform_concurrency=None, base_urls=None, limiter=None):
+        self.app = app or current_app._get_current_object()
+        self.max_workers = max_workers
+        if limiter is None:
+            limiter = PlatformLimiter(platform_concurrency) if platform_concurrency else get_shared_limiter()
+        self.limiter = limiter
+        self.base_urls = base_urls or {} # Platform name -> API base URL (used for local fakes)
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def sync_user(self, user_id, timeout=None):
+        """Syncs all active connections of a user. Returns {connection_id: result dict}."""
+        connections = (
+            PlatformConnection.query
+            .with_entities(PlatformConnection.connection_id, PlatformConnection.platform_name)
+            .filter_by(user_id=user_id, is_active=True)
+            .all()
+        )
+        return self.sync_connections(connections, timeout=timeout)
+
+    def sync_connections(self, connections, timeout=None):
+        """connections: iterable of (connection_id, platform_name) pairs.
+
+        Returns within timeout (plus scheduling slack). Connections that had not started are
+        reported as "cancelled"; ones still running are reported as "timed_out" with running=True.
+        They finish in the background and may still commit their changes.
+        """
+        started = time.perf_counter()
+        results = {}
+        cancelled = threading.Event() # Fresh per call, so a timeout never leaks into later calls
+        self._cancelled = cancelled
+        run_state = (cancelled, threading.Lock(), set()) # (flag, lock, IDs of connections that got past the flag)
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="copri-sync")
+        try:
+            futures = {
+                executor.submit(self._run_one, connection_id, platform_name, run_state): (connection_id, platform_name)
+                for connection_id, platform_name in connections
+            }
+            done, not_done = wait(futures, timeout=timeout)
+            with run_state[1]:
+                if not_done:
+                    cancelled.set()
+                running = set(run_state[2])
+            for future, (connection_id, platform_name) in futures.items():
+                if future in done:
+                    results[connection_id] = future.result()
+                elif future.cancel() or connection_id not in running: # Never started, or still queued for its platform slot
+                    results[connection_id] = {"platform": platform_name, "status": "cancelled"}
+                else:
+                    results[connection_id] = {"platform": platform_name, "status": "timed_out", "running": True}
+        finally:
+            # Don't block on syncs that overran the timeout; queued ones are dropped.
+            executor.shutdown(wait=False, cancel_futures=True)
+        elapsed = time.perf_counter() - started
+        print(f"[SyncOrchestrator] Synced {len(results)} connection(s) in {elapsed:.2f}s.")
+        return results
+
+    def _run_one(self, connection_id, platform_name, run_state):
+        cancelled, lock, running = run_state
+        result = {"platform": platform_name}
+        semaphore = self.limiter.semaphore(platform_name)
+        with semaphore:
+            with lock:
+                if cancelled.is_set():
+                    return {**result, "status": "cancelled"}
+                running.add(connection_id)
+            started = time.perf_counter()
+            with self.app.app_context():
+                try:
+                    connection = db.session.get(PlatformConnection, connection_id)
+                    handler = SYNC_HANDLERS.get(platform_name)
+                    if handler is None:
+                        raise ValueError(f"No sync handler for platform '{platform_name}'.")
+                    client = _build_client(platform_name, connection, self.base_urls.get(platform_name))
+                    result["stats"] = handler(connection, client)
+                    if platform_name not in SELF_CHECKPOINTING:
+                        connection.last_sync_time = datetime.datetime.utcnow()
+                        db.session.commit()
+                    # Self-checkpointing syncs report complete=False when some fetches failed and the checkpoint was kept.
+                    result["status"] = "partial" if isinstance(result["stats"], dict) and result["stats"].get("complete") is False else "ok"
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"[SyncOrchestrator] Sync failed for connection {connection_id} ({platform_name}): {e}")
+                    result["status"] = "error"
+                    result["error"] = str(e)
+                finally:
+                    db.session.remove()
+            result["duration_s"] = round(time.perf_counter() - started, 4)
+        return result
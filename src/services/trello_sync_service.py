@@ -0,0 +1,126 @@
+# This is /home/ubuntu/copri_app/src/services/trello_sync_service.py
+import datetime
+import os
+
+from src.database import db
+from src.integrations.trello_integration import TrelloIntegration, normalize_card, parse_trello_datetime
+from src.models.copri_models import TrelloCard
+from src.services.bulk_upsert import bulk_upsert
+from src.services.prioritization_engine import TRELLO_CARD
+from src.services.priority_cache import priority_scores
+from src.services import search_index
+
+# Re-read a small window before the checkpoint so clock skew between us and Trello can't drop changes.
+CHECKPOINT_OVERLAP = datetime.timedelta(minutes=2)
+ID_QUERY_CHUNK_SIZE = 500 # Keeps IN (...) lists under SQLite's bound-parameter limit
+
+class TrelloSyncError(Exception):
+    """Raised when Trello could not be read at all; the checkpoint is left where it was."""
+
+class TrelloSyncService:
+    """Incremental Trello -> trello_cards sync driven by PlatformConnection.last_sync_time.
+
+    The first sync imports a full board snapshot. Later syncs list boards once, skip any board
+    whose dateLastActivity predates the checkpoint, read the action feeds of the remaining
+    boards and only re-fetch the cards those actions mention. Card changes and the new
+    checkpoint are committed in the same transaction. If any fetch failed, the cards that did
+    arrive are still written but the checkpoint stays put (stats["complete"] is False), so the
+    next sync re-reads the same window.
+    """
+
+    def __init__(self, connection, trello_client=None):
+        self.connection = connection
+        self.trello = trello_client or TrelloIntegration(api_key=os.getenv("TRELLO_API_KEY"), token=connection.access_token)
+
+    def sync(self):
+        """Runs one sync pass and returns a dict of counts. Raises TrelloSyncError if the board list failed."""
+        started_at = datetime.datetime.utcnow()
+        checkpoint = self.connection.last_sync_time
+        if checkpoint is None:
+            return self._full_sync(started_at)
+
+        since = checkpoint - CHECKPOINT_OVERLAP
+        boards = self.trello.get_boards()
+        if boards is None:
+            raise TrelloSyncError(f"Could not list Trello boards for connection {self.connection.connection_id}; checkpoint kept at {checkpoint}.")
+        changed_board_ids = [
+            board["id"] for board in boards
+            if parse_trello_datetime(board.get("dateLastActivity")) is None or parse_trello_datetime(board["dateLastActivity"]) > since
+        ]
+        if not changed_board_ids:
+            print(f"[TrelloSyncService] No board activity since {checkpoint} for connection {self.connection.connection_id}.")
+            return self._apply_changes({}, set(), started_at, True, boards_checked=len(boards))
+
+        changed_card_ids, overflow_board_ids = self.trello.get_changed_card_ids_since(changed_board_ids, since)
+        upserts, deleted_ids = {}, set()
+        complete = True
+        for board_id in overflow_board_ids:
+            # Too many actions (or the feed failed): fall back to re-reading this one board.
+            cards = self.trello.get_open_cards_for_board(board_id)
+            if cards is None:
+                complete = False
+                continue
+            for card in cards:
+                upserts[card["id"]] = normalize_card(card)
+            stored_ids = {row.trello_card_id for row in TrelloCard.query.with_entities(TrelloCard.trello_card_id).filter_by(connection_id=self.connection.connection_id, trello_board_id=board_id)}
+            deleted_ids |= stored_ids - upserts.keys()
+
+        pending_ids = changed_card_ids - upserts.keys()
+        cards, missing_ids = self.trello.get_cards_by_id(pending_ids)
+        if len(cards) + len(missing_ids) < len(pending_ids):
+            complete = False
+        for card_id, card in cards.items():
+            if card.get("closed"):
+                deleted_ids.add(card_id) # Archived cards are dropped like deleted ones
+            else:
+                upserts[card_id] = normalize_card(card)
+        deleted_ids |= missing_ids
+
+        # Only advance the checkpoint if every changed card was accounted for; otherwise the
+        # next sync re-reads the same window.
+        new_checkpoint = started_at if complete else checkpoint
+        return self._apply_changes(upserts, deleted_ids, new_checkpoint, complete, boards_checked=len(boards))
+
+    def _full_sync(self, started_at):
+        snapshot = self.trello.get_board_snapshot()
+        if snapshot is None:
+            raise TrelloSyncError(f"Could not list Trello boards for connection {self.connection.connection_id}; nothing imported.")
+        synced_board_ids = list(snapshot["boards"].keys())
+        deleted_ids = set()
+        for start in range(0, len(synced_board_ids), ID_QUERY_CHUNK_SIZE):
+            board_chunk = synced_board_ids[start:start + ID_QUERY_CHUNK_SIZE]
+            rows = TrelloCard.query.with_entities(TrelloCard.trello_card_id).filter(
+                TrelloCard.connection_id == self.connection.connection_id,
+                TrelloCard.trello_board_id.in_(board_chunk),
+            )
+            deleted_ids |= {row.trello_card_id for row in rows} - snapshot["cards"].keys()
+        # Failed boards are missing from the snapshot: keep no checkpoint so the next sync is a full one again.
+        complete = not snapshot["failed_board_ids"]
+        new_checkpoint = started_at if complete else None
+        return self._apply_changes(snapshot["cards"], deleted_ids, new_checkpoint, complete, boards_checked=len(synced_board_ids))
+
+    def _apply_changes(self, upserts, deleted_ids, new_checkpoint, complete, boards_checked=0):
+        """Writes card changes and sets last_sync_time to new_checkpoint in a single transaction."""
+        connection_id = self.connection.connection_id
+        changed_ids = set()
+        try:
+            stats = bulk_upsert(TrelloCard, ({**values, "connection_id": connection_id} for values in upserts.values()), commit=False, changed_keys=changed_ids)
+            stats["boards_checked"] = boards_checked
+            stats["complete"] = complete
+            stats["deleted"] = 0
+            deleted = list(deleted_ids)
+            search_index.index_keys("trello_card", changed_ids, connection_id)
+            search_index.remove_keys("trello_card", deleted, connection_id) # Before the rows (and their pks) are gone
+            for start in range(0, len(deleted), ID_QUERY_CHUNK_SIZE):
+                stats["deleted"] += TrelloCard.query.filter(
+                    TrelloCard.connection_id == connection_id,
+                    TrelloCard.trello_card_id.in_(deleted[start:start + ID_QUERY_CHUNK_SIZE]),
+                ).delete(synchronize_session=False)
+            self.connection.last_sync_time = new_checkpoint
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        priority_scores.mark_dirty(self.connection.user_id, TRELLO_CARD, changed_ids | set(deleted_ids))
+        print(f"[TrelloSyncService] Connection {connection_id} synced: {stats}")
+        return stats
@@ -0,0 +1,120 @@
+# Query-count regression tests for the coaching context: loading it must cost CONTEXT_QUERY_COUNT queries, however much data a user has.
+import datetime
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from flask import Flask
+
+from src.database import db, QueryCounter, assert_max_queries
+from src.models.copri_models import (
+    User, PlatformConnection, TrelloCard, Email, CalendarEvent, Project, FinancialNote, ApplicationTracking, CoachingInteraction,
+)
+from src.services.coaching_context import load_coaching_context, load_coaching_contexts, CONTEXT_QUERY_COUNT, RECENT_INTERACTIONS
+from src.services.coaching_service import CoachingService
+from src.services.interaction_log import InteractionLog
+
+NOW = datetime.datetime(2025, 6, 1, 9, 0)
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'test.db'}"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def seed(username, size):
+    """A user with `size` rows of every kind the coaching pass can touch. Returns the user_id."""
+    user = User(username=username, hashed_password="x")
+    db.session.add(user)
+    db.session.flush()
+    connections = {}
+    for platform in ("Trello", "Gmail", "GoogleCalendar"):
+        connection = PlatformConnection(user_id=user.user_id, platform_name=platform, access_token="token")
+        db.session.add(connection)
+        db.session.flush()
+        connections[platform] = connection.connection_id
+    add_rows(user.user_id, connections, size)
+    return user.user_id
+
+
+def add_rows(user_id, connections, size, offset=0):
+    """Adds `size` more cards, emails, events, projects (with notes), applications and interactions."""
+    for i in range(offset, offset + size):
+        db.session.add(TrelloCard(trello_card_id=f"card-{user_id}-{i}", connection_id=connections["Trello"], trello_board_id="board",
+                                  trello_list_id="list", name=f"Card {i}", due_date=NOW + datetime.timedelta(days=i % 10)))
+        db.session.add(Email(gmail_message_id=f"msg-{user_id}-{i}", gmail_thread_id=f"thr-{i}", connection_id=connections["Gmail"],
+                             subject=f"Email {i}", received_date=NOW - datetime.timedelta(hours=i)))
+        db.session.add(CalendarEvent(gcal_event_id=f"evt-{user_id}-{i}", gcal_calendar_id="primary", connection_id=connections["GoogleCalendar"],
+                                     summary=f"Event {i}", start_time=NOW + datetime.timedelta(hours=i), end_time=NOW + datetime.timedelta(hours=i, minutes=30)))
+        project = Project(user_id=user_id, name=f"Project {i}", priority_copri=i % 5 + 1)
+        db.session.add(project)
+        db.session.flush()
+        db.session.add(FinancialNote(user_id=user_id, project_id=project.project_id, description=f"Note {i}", amount=100 + i))
+        db.session.add(ApplicationTracking(user_id=user_id, name_of_program=f"Program {i}"))
+        db.session.add(CoachingInteraction(user_id=user_id, interaction_type="ask_priority", question_asked=f"Question {i}?",
+                                           timestamp=NOW - datetime.timedelta(minutes=i)))
+    db.session.commit()
+
+
+def count_queries(fn, *args):
+    db.session.expunge_all() # Start from an empty identity map, like a fresh request
+    with QueryCounter() as counter:
+        fn(*args)
+    return counter.count
+
+
+def walk(context):
+    """Touches everything coaching code reads, so a lazy load would show up as an extra query."""
+    assert context.active_platforms == ["Gmail", "GoogleCalendar", "Trello"]
+    for project in context.projects:
+        context.notes_for_project(project.project_id)
+    return [application.name_of_program for application in context.applications], len(context.recent_interactions)
+
+
+def test_load_coaching_context_stays_within_query_budget(app):
+    user_id = seed("coach", 5)
+    db.session.expunge_all()
+    with assert_max_queries(CONTEXT_QUERY_COUNT, label="load_coaching_context"):
+        context = load_coaching_context(user_id)
+        applications, recent = walk(context)
+    assert len(context.projects) == 5 and len(context.financial_notes) == 5
+    assert len(applications) == 5 and recent == 5
+
+
+def test_coaching_service_construction_stays_within_query_budget(app):
+    user_id = seed("coach", 5)
+    interaction_log = InteractionLog(app=app, flush_interval=3600)
+    try:
+        db.session.expunge_all()
+        with assert_max_queries(CONTEXT_QUERY_COUNT, label="CoachingService()"):
+            service = CoachingService(user_id, interaction_log=interaction_log)
+            walk(service.context)
+    finally:
+        interaction_log.close()
+
+
+def test_query_count_does_not_grow_with_data(app):
+    user_id = seed("coach", 2)
+    connections = {row.platform_name: row.connection_id for row in PlatformConnection.query.filter_by(user_id=user_id)}
+    small = count_queries(lambda: walk(load_coaching_context(user_id)))
+    add_rows(user_id, connections, RECENT_INTERACTIONS + 30, offset=2)
+    large = count_queries(lambda: walk(load_coaching_context(user_id)))
+    assert large == small <= CONTEXT_QUERY_COUNT
+    assert len(load_coaching_context(user_id).recent_interactions) == RECENT_INTERACTIONS
+
+
+def test_batch_query_count_does_not_grow_with_users(app):
+    user_ids = [seed(f"digest-{i}", 2) for i in range(2)]
+    few = count_queries(lambda: [walk(context) for context in load_coaching_contexts(user_ids).values()])
+    user_ids += [seed(f"digest-{i}", 2) for i in range(2, 12)]
+    many = count_queries(lambda: [walk(context) for context in load_coaching_contexts(user_ids).values()])
+    assert many == few <= CONTEXT_QUERY_COUNT